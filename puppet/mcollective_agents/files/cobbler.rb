@@ -1,4 +1,6 @@
 require 'syslog'
+require 'json'
+require 'xmlrpc/client'
 
 module MCollective
   module Agent
@@ -10,6 +12,55 @@ module MCollective
         raise "Cannot load logaction util: %s" % [e.to_s]
       end
 
+      COBBLER_API_URL = 'http://127.0.0.1/cobbler_api'
+      COBBLER_SHARED_SECRET = '/var/lib/cobbler/web.ss'
+      SYSTEM_KEYS = [:profile, :hostname, :kickstart, :power_type,
+                     :virt_cpus, :virt_file_size, :virt_path, :virt_ram,
+                     :virt_type]
+      INTERFACE_KEYS = {'mac_address' => 'macaddress',
+                        'ip_address' => 'ipaddress',
+                        'dns_name' => 'dnsname',
+                        'virt_bridge' => 'virtbridge'}
+
+      # the same formats the DDL validates the single fields of the other
+      # actions with, for the fields of the JSON encoded inputs
+      SYSTEM_NAME_FORMAT = /\A(\.[a-zA-Z0-9]|[a-zA-Z0-9][a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])\z/
+      PROFILE_FORMAT = /\A[a-zA-Z0-9._-]+\z/
+      INTERFACE_FORMAT = /\A[a-z][a-z0-9]+\z/
+      INTERFACE_FORMATS = {
+        'mac_address' => /\A([0-9A-Fa-f][0-9A-Fa-f]:){5}[0-9A-Fa-f][0-9A-Fa-f]\z/,
+        'ip_address' => /\A[0-9.]+\z/}
+
+      def validate_system(name, spec)
+        unless name.to_s =~ SYSTEM_NAME_FORMAT
+          raise ArgumentError, "invalid system name \"#{name}\""
+        end
+        if spec.has_key?('profile') && spec['profile'].to_s !~ PROFILE_FORMAT
+          raise ArgumentError, "invalid profile \"#{spec['profile']}\""
+        end
+        unless (spec['interfaces'] || {}).is_a?(Hash)
+          raise ArgumentError, "invalid interfaces of system #{name}"
+        end
+        (spec['interfaces'] || {}).each do |iface, settings|
+          unless iface.to_s =~ INTERFACE_FORMAT && settings.is_a?(Hash)
+            raise ArgumentError, "invalid interface \"#{iface}\""
+          end
+          INTERFACE_FORMATS.each do |key, format|
+            if settings.has_key?(key) && settings[key].to_s !~ format
+              raise ArgumentError,
+                    "invalid #{key} \"#{settings[key]}\" of interface #{iface}"
+            end
+          end
+        end
+      end
+
+      def cobbler_session
+        server = XMLRPC::Client.new2(COBBLER_API_URL)
+        token = server.call('login', '',
+                            File.read(COBBLER_SHARED_SECRET).chomp)
+        return server, token
+      end
+
       action "sync" do
         cmd = "cobbler sync"
         reply[:status] = run("#{cmd}",
@@ -18,6 +69,25 @@ module MCollective
                               :chomp => true)
       end
 
+      # Only rewrites the PXE/grub files of the given systems. The pre-sync
+      # trigger starting or stopping xinetd only runs on a full sync, so
+      # fall back to one when xinetd is not in the state it needs to be.
+      action "sync_systems" do
+        listed = ""
+        run("cobbler system list", :stdout => listed, :chomp => true)
+        xinetd_running = run("service xinetd status") == 0
+        if listed.strip.empty? == xinetd_running
+          cmd = "cobbler sync"
+        else
+          cmd = "cobbler sync --systems=#{request[:systems]}"
+        end
+        log_action.debug(cmd, request)
+        reply[:status] = run("#{cmd}",
+                              :stdout => :out,
+                              :stderr => :err,
+                              :chomp => true)
+      end
+
       action "remove_system" do
         cmd = "cobbler system remove --name=#{request[:system]}"
         log_action.debug(cmd, request)
@@ -76,6 +146,83 @@ module MCollective
         reply[:err] = reply[:err] + reply[:out]
       end
 
+      # Replaces the system with the given spec, whose keys are SYSTEM_KEYS
+      # names and "interfaces", mapping each interface to its settings
+      def replace_system(server, token, name, spec)
+        unless server.call('find_system', {'name' => name}).empty?
+          server.call('remove_system', name, token)
+        end
+        handle = server.call('new_system', token)
+        server.call('modify_system', handle, 'name', name, token)
+        SYSTEM_KEYS.each do |key|
+          if spec.has_key?(key.to_s)
+            server.call('modify_system', handle, key.to_s,
+                        spec[key.to_s], token)
+          end
+        end
+        (spec['interfaces'] || {}).each do |iface, settings|
+          iface_data = {}
+          settings.each do |key, val|
+            iface_data["#{INTERFACE_KEYS.fetch(key, key)}-#{iface}"] = val
+          end
+          server.call('modify_system', handle, 'modify_interface',
+                      iface_data, token)
+        end
+        server.call('save_system', handle, token)
+      end
+
+      # Replaces the system with the full spec in the request within a
+      # single cobbler API session rather than a CLI call per step
+      action "register_system" do
+        name = request[:system]
+        log_action.debug("register system #{name}", request)
+        begin
+          spec = {'interfaces' => JSON.parse(request[:interfaces] || '{}')}
+          SYSTEM_KEYS.each do |key|
+            spec[key.to_s] = request[key] if request.data.has_key?(key)
+          end
+          validate_system(name, spec)
+          server, token = cobbler_session
+          replace_system(server, token, name, spec)
+          server.call('sync', token) if request[:sync] == 'true'
+          reply[:status] = 0
+          reply[:out] = "system #{name} registered"
+          reply[:err] = ""
+        rescue => e
+          reply[:status] = 1
+          reply[:err] = "Failed to register system #{name}: #{e.message}"
+        end
+        log_action.debug("Outcome: #{reply[:status]}", request)
+      end
+
+      # Replaces every system of the JSON list in the request, each a spec
+      # with its "system" name, within one cobbler API session and with at
+      # most one sync once they are all saved
+      action "register_systems" do
+        names = []
+        log_action.debug("register systems", request)
+        begin
+          specs = JSON.parse(request[:systems])
+          # nothing is replaced unless every system is valid
+          specs.each { |spec| validate_system(spec['system'], spec) }
+          server, token = cobbler_session
+          specs.each do |spec|
+            name = spec['system']
+            replace_system(server, token, name, spec)
+            names << name
+          end
+          server.call('sync', token) if request[:sync] == 'true'
+          reply[:status] = 0
+          reply[:out] = "systems #{names.join(',')} registered"
+          reply[:err] = ""
+        rescue => e
+          reply[:status] = 1
+          reply[:err] = "Failed to register systems, #{names.length} " +
+                        "registered: #{e.message}"
+        end
+        log_action.debug("Outcome: #{reply[:status]}", request)
+      end
+
       action "create_directory" do
          cmd = "mkdir -p #{request[:directory]}"
          reply[:status] = run("#{cmd}",
@@ -0,0 +1,186 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2026
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from litp.core.litp_logging import LitpLogger
+
+# set to "true" to have the per-disk and per-NIC messages of a plan
+# logged as one summary record per node
+LOG_SUMMARY_ENV = 'LITP_BOOTMGR_LOG_SUMMARY'
+# the number of distinct arguments of a message kept in a summary
+SUMMARY_MAX_ARGS = 10
+
+_LEVELS = {'debug': logging.DEBUG,
+           'info': logging.INFO,
+           'warning': logging.WARNING,
+           'error': logging.ERROR}
+
+
+class Lazy(object):
+    """
+    A log message argument computed only if the message is formatted, i.e.
+    if its level is enabled.
+    """
+
+    def __init__(self, function, *args):
+        self._function = function
+        self._args = args
+
+    def __str__(self):
+        return str(self._function(*self._args))
+
+    def __repr__(self):
+        return repr(self._function(*self._args))
+
+
+def lazy(function, *args):
+    return Lazy(function, *args)
+
+
+def _is_enabled(channel, level):
+    is_enabled = getattr(channel, 'isEnabledFor', None)
+    return not callable(is_enabled) or bool(is_enabled(level))
+
+
+class _Summary(object):
+    """
+    The detail messages of a plan, counted per subject (node), channel and
+    level rather than formatted. The first distinct arguments of each
+    message are kept and only formatted when the summary is.
+    """
+
+    def __init__(self):
+        self.subject = None
+        self._counts = OrderedDict()
+
+    def add(self, channel, method, msg, args):
+        key = (self.subject, channel, method)
+        counts = self._counts.setdefault(key, OrderedDict())
+        entry = counts.setdefault(msg, [0, []])
+        entry[0] += 1
+        # keep one more than is shown, to tell that some were left out
+        if args and args not in entry[1] and \
+                len(entry[1]) <= SUMMARY_MAX_ARGS:
+            entry[1].append(args)
+
+    @staticmethod
+    def _describe_message(msg, count, distinct_args):
+        description = '%d x "%s"' % (count, msg)
+        if distinct_args:
+            values = [str(args[0]) if len(args) == 1 else
+                      '(%s)' % ', '.join(str(arg) for arg in args)
+                      for args in distinct_args[:SUMMARY_MAX_ARGS]]
+            if len(distinct_args) > SUMMARY_MAX_ARGS:
+                values.append('...')
+            description += ' [%s]' % ', '.join(values)
+        return description
+
+    @staticmethod
+    def _describe(counts):
+        return ', '.join(_Summary._describe_message(msg, count, distinct_args)
+                         for msg, (count, distinct_args)
+                         in counts.iteritems())
+
+    def emit(self):
+        for (subject, channel, method), counts in self._counts.iteritems():
+            getattr(channel, method)('Summary for %s: %s',
+                                     subject or 'plan',
+                                     lazy(self._describe, counts))
+
+
+class _DetailChannel(object):
+    """
+    A channel for the messages logged per disk or per NIC. They go straight
+    to the underlying channel, unless a plan summary is being collected.
+    """
+
+    def __init__(self, owner, channel):
+        self._owner = owner
+        self._channel = channel
+
+    def _log(self, method, msg, args):
+        summary = self._owner.active_summary()
+        if summary is None:
+            getattr(self._channel, method)(msg, *args)
+        elif _is_enabled(self._channel, _LEVELS[method]):
+            summary.add(self._channel, method, msg, args)
+
+    def debug(self, msg, *args):
+        self._log('debug', msg, args)
+
+    def info(self, msg, *args):
+        self._log('info', msg, args)
+
+    def warning(self, msg, *args):
+        self._log('warning', msg, args)
+
+    def error(self, msg, *args):
+        self._log('error', msg, args)
+
+
+class BootMgrLogger(object):
+    """
+    Logging facade of the plugin over the LitpLogger channels. Messages
+    must be passed with their arguments, as in ``trace.debug("Node %s",
+    node)``, so they are only formatted when their level is enabled; an
+    argument that is itself costly to compute is wrapped in ``lazy()``.
+
+    The ``trace_detail`` and ``event_detail`` channels are for the
+    messages logged per disk or per NIC. In summary mode they are counted
+    within a ``plan_summary()`` block, labelled with the node passed to
+    ``summarize_as()``, and logged as one record per node when the block
+    ends.
+    """
+
+    def __init__(self, logger=None, summary_mode=None):
+        logger = logger or LitpLogger()
+        self.trace = logger.trace
+        self.event = logger.event
+        self.trace_detail = _DetailChannel(self, logger.trace)
+        self.event_detail = _DetailChannel(self, logger.event)
+        if summary_mode is None:
+            summary_mode = os.environ.get(LOG_SUMMARY_ENV, '').lower() == \
+                'true'
+        self.summary_mode = summary_mode
+        self._local = threading.local()
+
+    def active_summary(self):
+        return getattr(self._local, 'summary', None)
+
+    @contextmanager
+    def plan_summary(self):
+        """
+        Collects the detail messages logged in the block, in summary mode,
+        and logs their summary at the end of the block. Nested blocks are
+        part of the outermost one.
+        """
+        if not self.summary_mode or self.active_summary() is not None:
+            yield
+            return
+        summary = _Summary()
+        self._local.summary = summary
+        try:
+            yield
+        finally:
+            self._local.summary = None
+            summary.emit()
+
+    def summarize_as(self, subject):
+        """
+        Labels the detail messages that follow with ``subject``, within the
+        current plan summary.
+        """
+        summary = self.active_summary()
+        if summary is not None:
+            summary.subject = subject
@@ -7,6 +7,7 @@
 # conditions stipulated in the agreement/contract under which the
 # program(s) have been supplied.
 ##############################################################################
+import json
 import math
 import os
 import re
@@ -15,91 +16,58 @@ import xmlrpclib
 
 from netaddr.ip import IPNetwork
 
-from bootmgr_extension.bootmgr_extension import BootManagerExtension
 from litp.core.execution_manager import (ConfigTask,
                                          CallbackTask,
                                          CallbackExecutionException,
                                          PlanStoppedException)
 from litp.core.extension import ViewError
-from litp.core.litp_logging import LitpLogger
 from litp.core.plugin import Plugin
 from litp.core.rpc_commands import run_rpc_application, \
+    run_rpc_command, \
     RpcCommandProcessorBase, \
     RpcExecutionException, \
     reduce_errs
 from litp.core.validators import ValidationError
-from .bootmgr_utils import BootMgrUtils
-
-_log = LitpLogger()
+from .bootmgr_logging import BootMgrLogger, lazy
+from .bootmgr_utils import BootMgrUtils, DiskUuidIndex
+from .cobbler_client import (COBBLER_API_URL,
+                             LocalCobblerClient,
+                             LocalCobblerError)
+from .cobbler_sync import CobblerSyncCoalescer
+from .install_timings import InstallTimings
+from .ms_locale import MsLocaleCache
+from .node_liveness import NodeLivenessMonitor, ProbeBackoff
+from .planning_context import PlanningContext
+from .profiling import Profiler, ProfilingSettings, profiled
+from .snippet_writer import write_snippet, write_snippets
+from . import snippet_templates as templates
+from .pxe_events import (PxeEventLog,
+                         PxeStatusPoller,
+                         PXE_BOOTED_COMMENT)
+
+_log = BootMgrLogger()
 
 UUIDLESSDISK = 'kgb'
-COBBLER_API_URL = 'http://127.0.0.1/cobbler_api'
-PXE_BOOTED_COMMENT = 'PXE_BOOTED'
+# how often the local PXE event file and, as a fallback for lost events,
+# Cobbler itself are checked while waiting for a node to PXE boot
+PXE_EVENT_POLL_INTERVAL = 0.5
+PXE_COBBLER_POLL_INTERVAL = 30
+# defaults for the cobbler-service properties tuning the wait for a node
+# to come up after it has PXE booted, all in seconds
+NODE_MIN_INSTALL_TIME = 300
+NODE_PROBE_MIN_INTERVAL = 5
+NODE_PROBE_MAX_INTERVAL = 60
+# the nodes waiting to come up are pinged together at most this often
+NODE_LIVENESS_PING_INTERVAL = 5
+NODE_LIVENESS_PING_TIMEOUT = 10
+# default of the cobbler-service property giving how many disks the
+# partition snippet wipes at the same time, 1 wipes them one at a time
+DISK_WIPE_JOBS = 1
+# default of the cobbler-service property registering all the new systems
+# of a plan in one request to the MS rather than one request per system
+BULK_REGISTRATION = False
 COBBLER_MCO_AGENT_TIMEOUT = 55  # this should be the same as cobbler.ddl
 COBBLER_RPC_MCO_TIMEOUT = COBBLER_MCO_AGENT_TIMEOUT + 15
-# the kickstart keyboard options for the MNs. See here
-# https://access.redhat.com/documentation/en-US/Red_Hat_Enterprise_Linux/6/
-# html/Installation_Guide/s1-kickstart2-options.html
-KEYMAPS = set(['be-latin1',
-               'bg_bds-utf8',
-               'bg_pho-utf8',
-               'br-abnt2',
-               'cf',
-               'croat',
-               'cz-us-qwertz',
-               'cz-lat2',
-               'de',
-               'de-latin1',
-               'de-latin1-nodeadkeys',
-               'dvorak',
-               'dk',
-               'dk-latin1',
-               'es',
-               'et',
-               'fi',
-               'fi-latin1',
-               'fr',
-               'fr-latin9',
-               'fr-latin1',
-               'fr-pc',
-               'fr_CH',
-               'fr_CH-latin1',
-               'gr',
-               'hu',
-               'hu101',
-               'is-latin1',
-               'it',
-               'it-ibm',
-               'it2',
-               'jp106',
-               'ko',
-               'la-latin1',
-               'mk-utf',
-               'nl',
-               'no',
-               'pl2',
-               'pt-latin1',
-               'ro',
-               'ru',
-               'sr-cy',
-               'sr-latin',
-               'sv-latin1',
-               'sg',
-               'sg-latin1',
-               'sk-qwerty',
-               'slovene',
-               'trq',
-               'uk',
-               'ua-utf',
-               'us-acentos',
-               'us'])
-
-UUID_ERR_MESSAGE = """
-if [[ ! -b \\${disk_list["%s"]} ]]; then
-echo "ERROR: Could not find disk of UUID '%s'" >> /dev/tty1;
-read;
-exit 1;
-fi"""
 
 
 class Timeout(object):
@@ -144,8 +112,19 @@ class BootManagerPlugin(Plugin):
     def __init__(self):
         super(BootManagerPlugin, self).__init__()
         self._client = None
-        self.token = None
-
+        self._local_cobbler = LocalCobblerClient(
+            lambda: self._create_cobbler_client())
+        self._pxe_poller = PxeStatusPoller(
+            lambda: self._create_cobbler_client(), PXE_COBBLER_POLL_INTERVAL)
+        self._sync_coalescer = CobblerSyncCoalescer()
+        self._liveness_monitor = NodeLivenessMonitor(
+            lambda hostnames: self._ping_nodes(hostnames),
+            NODE_LIVENESS_PING_INTERVAL)
+        self._install_timings = InstallTimings()
+        self._ms_locale = MsLocaleCache()
+        self._profiler = Profiler(ProfilingSettings.load())
+
+    @profiled('create_configuration')
     def create_configuration(self, plugin_api_context):
         """
         Provides support for the addition, update and removal \
@@ -164,12 +143,16 @@ class BootManagerPlugin(Plugin):
         /infrastructure and should have the property litp_management set \
         to true. Take a look at the network plugin for further information.
         """
+        with _log.plan_summary():
+            return self._create_configuration(plugin_api_context)
 
+    def _create_configuration(self, plugin_api_context):
         _log.trace.debug('Creating tasks for cobbler')
 
         tasks = []
 
-        service = BootManagerExtension._get_cobbler_service(plugin_api_context)
+        context = PlanningContext(self, plugin_api_context)
+        service = context.service
 
         if service:
             _log.trace.debug(
@@ -178,18 +161,19 @@ class BootManagerPlugin(Plugin):
                 service.get_state()
             )
 
-        profiles = plugin_api_context.query("os-profile")
-        _log.trace.debug('Found %d os-profiles: %s' % (len(profiles),
-                                                       profiles))
-        nodes = self._get_new_node_systems(plugin_api_context)
-        _log.trace.debug('Got %d "new" nodes : %s' % (len(nodes), nodes))
+        profiles = context.os_profiles
+        _log.trace.debug('Found %d os-profiles: %s', len(profiles),
+                         profiles)
+        nodes = context.new_nodes
+        _log.trace.debug('Got %d "new" nodes : %s', len(nodes), nodes)
 
-        ms = plugin_api_context.query("ms")[0]
+        ms = context.ms
 
         self._add_udev_network_tasks(ms, tasks, nodes,
-                                     plugin_api_context, service)
+                                     context, service)
 
         reconfigure_cobbler = False
+        kickstart_nodes = []
 
         for node in nodes:
             if not node.system or not node.storage_profile or \
@@ -211,7 +195,9 @@ class BootManagerPlugin(Plugin):
                 reconfigure_cobbler = True
 
             if generate_lvm_kickstart == True:
-                self._generate_lvm_kickstart(tasks, node, service)
+                kickstart_nodes.append(node)
+
+        self._generate_lvm_kickstarts(tasks, kickstart_nodes, service)
 
         if service:
             cobbler_tasks = []
@@ -219,20 +205,16 @@ class BootManagerPlugin(Plugin):
                                              nodes, service)
             tasks.extend(cobbler_tasks)
             self._generate_bootloader_fragments(
-                plugin_api_context, ms, tasks, nodes, service
+                context, ms, tasks, nodes, service
             )
 
-            reconfigure = False
-
-            if self._new_ms_network_status(plugin_api_context, ms):
-                reconfigure = True
+            reconfigure = context.new_ms_network_status
 
             if service.get_state() in self._new_states or \
-                    self._new_ms_network_status(plugin_api_context, ms) or \
-                    reconfigure_cobbler:
+                    reconfigure or reconfigure_cobbler:
                 self._generate_cobbler_configure(
                     service,
-                    plugin_api_context,
+                    context,
                     tasks,
                     reconfigure
                 )
@@ -241,26 +223,41 @@ class BootManagerPlugin(Plugin):
 
             self._generate_cobbler_records(
                 service,
-                plugin_api_context,
+                context,
                 add_node_tasks
             )
 
-            if len(add_node_tasks) == len(cobbler_tasks):
-                for i, at in enumerate(add_node_tasks):
-                    at.requires.add(cobbler_tasks[i])
+            kickstart_tasks = dict((task.call_id, task)
+                                   for task in cobbler_tasks)
+            for at in add_node_tasks:
+                if not isinstance(at, CallbackTask):
+                    continue
+                for system_name in self._registered_systems(at):
+                    if system_name in kickstart_tasks:
+                        at.requires.add(kickstart_tasks[system_name])
             tasks.extend(add_node_tasks)
 
+            sync_task = self._generate_cobbler_sync(
+                service,
+                context,
+                add_node_tasks
+            )
+            if sync_task:
+                tasks.append(sync_task)
+
             self._add_node_wait(
                 nodes,
                 tasks,
-                plugin_api_context,
-                service
+                context,
+                service,
+                sync_task
             )
 
-            _log.trace.debug('Returning %d tasks' % len(tasks))
+            _log.trace.debug('Returning %d tasks', len(tasks))
 
         return tasks
 
+    @profiled('validate_model')
     def validate_model(self, plugin_api_context):
         """
         Validates cobbler service integrity. Validation rules used in
@@ -327,35 +324,95 @@ class BootManagerPlugin(Plugin):
         return errors
 
     def _remove_from_cobbler(self, cb_api, nodes, hostname):
-        self._do_cobbler_remove_system(cb_api, nodes, hostname)
-        self._do_cobbler_mco(cb_api, nodes, 'sync', [])
+        with self._install_timings.phase([hostname], 'deregister'):
+            self._do_cobbler_remove_system(cb_api, nodes, hostname)
+            self._sync_cobbler(cb_api, nodes, [hostname],
+                               self._needs_full_sync(cb_api))
 
-    def _create_cobbler_client(self):
-        return xmlrpclib.Server(COBBLER_API_URL)
+    def _needs_full_sync(self, cb_api):
+        """
+        Adding or removing a system only changes its own PXE/grub files,
+        unless cobbler also manages DHCP or DNS, in which case dhcpd.conf
+        or the DNS zone files must be regenerated by a full sync.
+        """
+        service = self._get_cobbler_service(cb_api)
+        return not service or service.manage_dhcp == "true" or \
+            service.manage_dns == "true"
 
-    def _has_pxe_completed(self, node_name, cobbler):
+    def _sync_cobbler(self, cb_api, nodes, system_names, full_sync=True):
         """
-        A cobbler pre-install trigger running on MS will set this comment
-        as soon as the installation of the node is going to start and
-        definitely after PXE boot has finished.
-        https://confluence-oss.seli.wh.rnd.internal.ericsson.com/display/ELITP/
-        Spike+on+PXE+boot
+        Syncs cobbler after ``system_names`` changed. Concurrent requests
+        are collapsed into a single sync by the sync coalescer.
         """
-        try:
-            return cobbler.find_system(
-                {'name': node_name, 'comment': PXE_BOOTED_COMMENT}
-            ) != []
-        except xmlrpclib.ProtocolError as err:
-            _log.trace.debug('_has_pxe_completed: ' + str(err))
+        self._sync_coalescer.sync(
+            lambda systems, full: self._do_cobbler_sync(cb_api, nodes,
+                                                        systems, full),
+            system_names, full_sync)
+
+    def _do_cobbler_sync(self, cb_api, nodes, system_names, full_sync):
+        if full_sync or not system_names:
+            self._do_cobbler_mco(cb_api, nodes, 'sync', [])
+        else:
+            self._do_cobbler_mco(cb_api, nodes, 'sync_systems',
+                                 {'systems': ','.join(system_names)})
+
+    def _sync_cobbler_callback(self, cb_api, nodes, system_names):
+        # the systems of the plan are registered and none is waiting to
+        # PXE boot yet, so the events of the previous plans can go
+        self._reset_pxe_event_log()
+        with self._install_timings.phase(system_names, 'cobbler_sync'):
+            self._sync_cobbler(cb_api, nodes, system_names,
+                               self._needs_full_sync(cb_api))
+
+    def _create_cobbler_client(self):
+        return xmlrpclib.Server(COBBLER_API_URL)
 
+    def _create_pxe_event_log(self):
+        return PxeEventLog()
+
+    def _reset_pxe_event_log(self):
+        PxeEventLog.truncate()
+
+    @profiled('wait_for_pxe_boot')
     def _wait_for_pxe_boot(self, callback_api, node_name, system_name,
                            pxe_boot_timeout):
+        """
+        Waits for the install_pre_pxe trigger to report that the node has
+        PXE booted. The trigger appends an event to a local file, so the
+        wait only reads that file. As a fallback for lost events, Cobbler
+        is also checked through the PXE status poller shared by all the
+        nodes waiting to PXE boot.
+        """
 
         success = False
 
         timeout = Timeout(pxe_boot_timeout)
 
-        cobbler_server = self._create_cobbler_client()
+        pxe_events = self._create_pxe_event_log()
+        self._pxe_poller.register(node_name)
+        try:
+            with self._install_timings.phase([node_name], 'pxe_wait'):
+                success = self._wait_for_pxe_event(callback_api, node_name,
+                                                   system_name, timeout,
+                                                   pxe_events)
+        finally:
+            self._pxe_poller.unregister(node_name)
+
+        if not success:
+            elapsed_time = int(timeout.get_elapsed_time())
+
+            error_message = ("Node '%s', system '%s', has not PXE booted "
+                             "within the specified timeout of %d seconds") % \
+                            (node_name, system_name, elapsed_time)
+
+            raise CallbackExecutionException(error_message)
+
+        return success
+
+    def _wait_for_pxe_event(self, callback_api, node_name, system_name,
+                            timeout, pxe_events):
+        success = False
+        last_report = None
 
         while not success and not timeout.has_elapsed():
 
@@ -364,45 +421,37 @@ class BootManagerPlugin(Plugin):
                     "Plan execution has been stopped on node '%s'." %
                     node_name)
 
-            if int(timeout.get_elapsed_time()) % 60 == 0:
+            elapsed_time = int(timeout.get_elapsed_time())
+            if elapsed_time % 60 == 0 and elapsed_time != last_report:
+                last_report = elapsed_time
                 remaining_time = int(timeout.get_remaining_time())
 
                 _log.trace.debug(
                     "Waiting for node '%s', system '%s', "
-                    "to PXE boot (%d sec left)" %
-                    (node_name, system_name, remaining_time)
+                    "to PXE boot (%d sec left)",
+                    node_name, system_name, remaining_time
                 )
 
-            if self._has_pxe_completed(node_name, cobbler_server):
-
+            if pxe_events.has_booted(node_name) or \
+                    self._pxe_poller.has_booted(node_name):
+                success = True
                 elapsed_time = int(timeout.get_elapsed_time())
 
                 _log.trace.debug(
                     "PXE boot successful for node '%s', "
-                    "system '%s'. (elapsed time %d sec)" %
-                    (node_name, system_name, elapsed_time)
+                    "system '%s'. (elapsed time %d sec)",
+                    node_name, system_name, elapsed_time
                 )
-
-                success = True
             else:
-                timeout.sleep(1)
-
-        if not success:
-            elapsed_time = int(timeout.get_elapsed_time())
-
-            error_message = ("Node '%s', system '%s', has not PXE booted "
-                             "within the specified timeout of %d seconds") % \
-                            (node_name, system_name, elapsed_time)
-
-            raise CallbackExecutionException(error_message)
+                timeout.sleep(PXE_EVENT_POLL_INTERVAL)
 
         return success
 
     def _add_node_wait(self, nodes, tasks, plugin_api_context,
-                       cobbler_service):
-        boot_network = self._get_boot_network(plugin_api_context)
-        # the ms item is mandatory in the model, the [0] should be safe
-        ms_hostname = plugin_api_context.query('ms')[0].hostname
+                       cobbler_service, sync_task=None):
+        context = PlanningContext.of(self, plugin_api_context)
+        boot_network = context.boot_network
+        ms_hostname = context.ms.hostname
         for node in nodes:
             wait_for_pxe_task = CallbackTask(
                 node.system,
@@ -414,46 +463,50 @@ class BootManagerPlugin(Plugin):
             )
 
             wait_for_pxe_task.model_items.add(cobbler_service)
+            if sync_task:
+                wait_for_pxe_task.requires.add(sync_task)
 
             wait_for_node_task = CallbackTask(
                 node.system,
                 'Wait for node "%s" to install and deregister node "%s" ' \
                 'from Cobbler' % (node.hostname, node.hostname),
                 self._wait_for_node,
-                self._find_ip_for_node(node, boot_network),
+                context.nic_topology(node).ip_address(boot_network.name),
                 node.hostname,
                 [ms_hostname],
             )
             wait_for_node_task.requires.add(wait_for_pxe_task)
             tasks.extend([wait_for_node_task, wait_for_pxe_task])
 
+    @profiled('wait_for_node')
     def _wait_for_node(self, callback_api, node_ip, hostname, nodes):
         self._install_node(callback_api, node_ip, hostname)
         self._remove_from_cobbler(callback_api, nodes, hostname)
 
     def _add_udev_network_tasks(self, ms, tasks, nodes, plugin_api_context,
                                 service):
+        context = PlanningContext.of(self, plugin_api_context)
+        boot_network = context.boot_network
         for node in nodes:
-            _log.trace.debug("Processing node: '%s'" % node)
+            _log.trace.debug("Processing node: '%s'", node)
+            _log.summarize_as(node.hostname)
             net_cards = []
+            topology = context.nic_topology(node)
 
-            pxe_boot_only_nic_name = self. \
-                _get_dedicated_pxe_boot_only_nic(node)
+            pxe_boot_only_nic_name = topology.pxe_boot_only_nic
             if pxe_boot_only_nic_name:
-                _log.trace.debug('pxe_boot_only device name "%s"' %
-                                 pxe_boot_only_nic_name)
-                pxe_boot_only_macaddress = self._find_mac(
-                    node,
+                _log.trace_detail.debug('pxe_boot_only device name "%s"',
+                                        pxe_boot_only_nic_name)
+                pxe_boot_only_macaddress = topology.mac(
                     pxe_boot_only_nic_name)
                 card = {}
                 card['dev'] = pxe_boot_only_nic_name
                 card['mac'] = pxe_boot_only_macaddress.lower()
                 net_cards.append(card)
 
-            boot_network = self._get_boot_network(plugin_api_context)
-            device_name = self._get_matching_nic_name(node, boot_network)
-            macaddress = self._find_mac(node, device_name)
-            _log.trace.debug(
+            device_name = topology.nic_name_for_network(boot_network.name)
+            macaddress = topology.mac(device_name)
+            _log.trace_detail.debug(
                 'node: "%s" device name: "%s" MAC: "%s"',
                 node, device_name, macaddress
             )
@@ -466,7 +519,7 @@ class BootManagerPlugin(Plugin):
                 net_cards.append(card)
 
             if net_cards:
-                _log.trace.debug("Got MAC cards: '%s'" % net_cards)
+                _log.trace_detail.debug("Got MAC cards: '%s'", net_cards)
 
             snippet_name = node.hostname + ".ks.udev_network.snippet"
             tasks.append(
@@ -490,7 +543,7 @@ class BootManagerPlugin(Plugin):
         try:
             the_root_vg = node.storage_profile.view_root_vg
         except ViewError as e:
-            _log.trace.debug('_get_root_vg_disks' + str(e))
+            _log.trace.debug('_get_root_vg_disks%s', e)
 
         root_disks = []
 
@@ -529,23 +582,20 @@ class BootManagerPlugin(Plugin):
             return disk
         return None
 
-    def _get_all_disk_uuids(self, api):
-        all_uuids = []
-        for node in iter(self._get_all_node_systems(api)):
-            for disk in node.system.disks:
-                all_uuids.append(disk.uuid)
-        return all_uuids
+    def _get_disk_uuid_index(self, api):
+        return DiskUuidIndex.from_nodes(PlanningContext.of(self,
+                                                           api).all_nodes)
 
     def _generate_bootloader_fragments(self, api, ms, tasks, nodes, service):
-        _log.trace.debug("_generate_bootloader_fragments.  Nodes: %s" % \
-                         str(nodes))
+        _log.trace.debug("_generate_bootloader_fragments.  Nodes: %s",
+                         nodes)
 
-        all_uuids = self._get_all_disk_uuids(api)
+        disk_index = self._get_disk_uuid_index(api)
         for node in nodes:
             hostname = node.hostname
 
             if not len(node.system.disks):
-                _log.trace.debug("No disks found on node %s" % hostname)
+                _log.trace.debug("No disks found on node %s", hostname)
                 continue
             # We know which one of the disks in the node's system's collection
             # is marked as bootable. We'll trust that this information is
@@ -562,8 +612,8 @@ class BootManagerPlugin(Plugin):
             boot_disk = [disk for disk in node.system.disks \
                          if 'true' == disk.bootable][0]
 
-            shared_disks = [d.uuid for d in node.system.disks if \
-                            all_uuids.count(d.uuid) > 1]
+            shared_disks = BootManagerPlugin._get_shared_uuids(node,
+                                                               disk_index)
 
             if self._is_os_reinstall(node):
                 shared_disks.extend(
@@ -576,21 +626,16 @@ class BootManagerPlugin(Plugin):
             # fencing disks uuids to the shared_disks parameter to prevent
             # wiping disk on pxe boot
             all_clusters = node.get_cluster().parent
-            for cluster in all_clusters:
-                if cluster.item_type.item_type_id == 'vcs-cluster':
-                    shared_disks.extend([fen_disk.uuid for fen_disk
-                                         in cluster.fencing_disks])
+            shared_disks.extend(disk_index.fencing_uuids(all_clusters))
 
             if (BootManagerPlugin._is_uuid_plugin_updatable(boot_disk) or
                     BootManagerPlugin._uuid_on_disk(boot_disk)):
-                _log.trace.debug("Boot disk for node {name} is identified by "
-                                 "uuid {id}".format(
-                    name=hostname, id=disk.uuid))
+                _log.trace.debug("Boot disk for node %s is identified by "
+                                 "uuid %s", hostname, disk.uuid)
                 uuid_prop = BootMgrUtils.get_disk_uuid(boot_disk)
 
                 _log.trace.debug('Passing shared_disks argument: '
-                                 '"{shared_disks}" to ConfigTask'.format(
-                    shared_disks=shared_disks))
+                                 '"%s" to ConfigTask', shared_disks)
                 task = ConfigTask(
                     ms,
                     service,
@@ -608,12 +653,8 @@ class BootManagerPlugin(Plugin):
                 task.replaces.add(("cobbler::bootloader_name", node.hostname))
                 tasks.append(task)
             else:
-                _log.trace.debug("Boot disk for node {name} is identified by "
-                                 "device name {disk_name}".format(
-                    name=hostname,
-                    disk_name=disk.name
-                )
-                )
+                _log.trace.debug("Boot disk for node %s is identified by "
+                                 "device name %s", hostname, disk.name)
                 tasks.append(
                     ConfigTask(
                         ms,
@@ -631,9 +672,9 @@ class BootManagerPlugin(Plugin):
                 )
 
     @staticmethod
-    def _get_shared_uuids(node, all_uuids):
+    def _get_shared_uuids(node, disk_index):
         return [d.uuid for d in node.system.disks if \
-                all_uuids.count(d.uuid) > 1]
+                disk_index.is_shared(d.uuid)]
 
     @staticmethod
     def _is_uuid_plugin_updatable(disk):
@@ -672,10 +713,10 @@ class BootManagerPlugin(Plugin):
         in ``nodes``.
         """
 
-        _log.trace.debug("_generate_lvm_kickstart. Node: %s" % node.hostname)
+        _log.trace.debug("_generate_lvm_kickstart. Node: %s", node.hostname)
 
         if not len(node.system.disks):
-            _log.trace.debug("No disks found on node %s" % node.hostname)
+            _log.trace.debug("No disks found on node %s", node.hostname)
             return
 
         # Create CallbackTask to create the snippet for each node
@@ -683,7 +724,7 @@ class BootManagerPlugin(Plugin):
                node.hostname
 
         # Associate task with 'cobbler-service' on ms
-        _log.trace.debug("Adding callback task, node %s" % node.hostname)
+        _log.trace.debug("Adding callback task, node %s", node.hostname)
         task = CallbackTask(service,
                             ('Create "%s" partition kickstart snippet for '
                              'node "%s"') % (node.os.version.upper(),
@@ -692,75 +733,74 @@ class BootManagerPlugin(Plugin):
                             path=path,
                             node_hostname=node.hostname,
                             os_version=node.os.version,
-                            boot_mode=service.boot_mode)
+                            boot_mode=service.boot_mode,
+                            disk_wipe_jobs=self._get_disk_wipe_jobs(service))
         tasks.append(task)
 
-    def _get_disk_list_item_config(self, disk, all_disk_uuids):
+    def _generate_lvm_kickstarts(self, tasks, nodes, service):
+        """
+        Generates the partition snippet tasks of ``nodes``. The snippets of
+        more than one node are all rendered by a single CallbackTask from
+        one snapshot of the model, rather than each task deriving the same
+        model data again.
+        """
+        nodes = [node for node in nodes if len(node.system.disks)]
+        if len(nodes) < 2:
+            for node in nodes:
+                self._generate_lvm_kickstart(tasks, node, service)
+            return
+
+        snippets = [{'path': "/var/lib/cobbler/snippets/%s.ks.partition"
+                             ".snippet" % node.hostname,
+                     'node_hostname': node.hostname,
+                     'os_version': node.os.version}
+                    for node in nodes]
+        _log.trace.debug("Adding callback task, nodes %s",
+                         lazy(lambda: [node.hostname for node in nodes]))
+        task = CallbackTask(service,
+                            'Create partition kickstart snippets for '
+                            'nodes %s' % BootManagerPlugin.format_list(
+                                [node.hostname for node in nodes],
+                                quotes_char='double'),
+                            self.cb__write_snippets,
+                            snippets=snippets,
+                            boot_mode=service.boot_mode,
+                            disk_wipe_jobs=self._get_disk_wipe_jobs(service))
+        tasks.append(task)
+
+    def _get_disk_list_item_config(self, disk, disk_index):
         config = []
-        _log.event.info("Get disk list item for {0} "
-                        "with all_disk_uuids {1}".format(
-            disk.item_id, all_disk_uuids))
+        _log.event_detail.info("Get disk list item for %s used by %s "
+                               "system(s)",
+                        disk.item_id, disk_index.count(disk.uuid))
         if BootManagerPlugin._uuid_on_disk(disk):
             # Add all disks that aren't shared across systems to the set
             # passed to Anaconda's clearpart command (the order doesn't
             # matter).
             # It is assumed UUID-less disks are never shared.
-            if all_disk_uuids.count(disk.uuid) != 1:
+            if not disk_index.is_unique(disk.uuid):
                 return config
-
-            # Fallback for HP SmartArray (LITPCDS-8098). Assumes that if
-            # there is a mix of scsi and cciss block devices, the disks
-            # themselves are only pointed to by one of them.
-
-            diskstr = """\
-disk_list_item=\\$(shopt -s nocaseglob; \
-ls /dev/disk/by-id/dm-uuid-mpath*{uuid})
-if [ ! -n "$disk_list_item" ]; then
-disk_list_item=\\$(shopt -s nocaseglob; ls /dev/disk/by-id/cciss*{uuid})
-fi
-if [ ! -n "$disk_list_item" ]; then
-disk_list_item=\\$(shopt -s nocaseglob; ls /dev/disk/by-id/scsi*{uuid})
-fi
-disk_list["{disk_id}"]=\\$disk_list_item"""
-            config.append(diskstr.format(uuid=disk.uuid, disk_id=disk.item_id))
-            test = UUID_ERR_MESSAGE % (disk.item_id, disk.uuid)
-            config.append(test)
+            config.append(templates.DISK_LIST_ITEM.render(
+                uuid=disk.uuid, disk_id=disk.item_id))
+            config.append(templates.UUID_CHECK.render(
+                disk_id=disk.item_id, uuid=disk.uuid))
         else:
-            _log.event.info("Disk {0} has no uuid".format(disk.item_id))
-            # We don't want to set the key's value to /dev/<disk.name>
-            # since we want to handle the case where there is no device
-            # by that name on the node
-            config.append('disk_list["{disk_id}"]=\\$(shopt -s '
-                          'nocaseglob; ls /dev/{name})'.format(
-                disk_id=disk.item_id,
-                name=disk.name
-            ))
+            _log.event_detail.info("Disk %s has no uuid", disk.item_id)
+            config.append(templates.DISK_LIST_ITEM_BY_NAME.render(
+                disk_id=disk.item_id, name=disk.name))
         return config
 
     def _get_clearpart_config(self, disk):
-        _log.event.info("Generate clearpart config for disk {0}".format(
-                        disk.item_id))
+        _log.event_detail.info("Generate clearpart config for disk %s",
+                               disk.item_id)
         if BootManagerPlugin._uuid_on_disk(disk):
-            _log.event.info("Generate three-try drive_dev")
-            devstr = """\
-#### clear parts first ####
-parts_to_clear=\\$(find /dev/disk/by-id \
--iname dm-uuid-part*-mpath\\*{uuid} -printf "disk/by-id/%f,")
-drive_dev=\\$(find /dev/disk/by-id \
--iname dm-uuid-mpath\\*{uuid} -printf "disk/by-id/%f")
-if [ ! -n "$drive_dev" ] || [ "$drive_dev" == "disk/by-id/" ]; then
-drive_dev=\\$(basename \
-\\$(find /dev/disk/by-id -iname cciss\\*{uuid} -printf "%l"))
-fi
-if [ ! -n "$drive_dev" ] || [ "$drive_dev" == "disk/by-id/" ]; then
-drive_dev=\\$(basename \
-\\$(find /dev/disk/by-id -iname scsi\\*{uuid} -printf "%l"))
-fi"""
-            config = devstr.format(uuid=disk.uuid)
+            _log.event_detail.info("Generate three-try drive_dev")
+            config = templates.CLEARPART_DRIVE_DEV.render(uuid=disk.uuid)
         else:
-            _log.event.info("Generate drive_dev for disk {0}".format(
-                disk.item_id))
-            config = "drive_dev={0}\n".format(disk.name)
+            _log.event_detail.info("Generate drive_dev for disk %s",
+                                   disk.item_id)
+            config = templates.CLEARPART_DRIVE_DEV_BY_NAME.render(
+                name=disk.name)
         return config
 
     def _is_bootable_unshared_and_os_reinstall(self, node, disk, shared_uuids):
@@ -768,15 +808,16 @@ fi"""
                  (self._is_os_reinstall(node) and
                   'true' == disk.bootable)
 
-    def _get_disks_to_clear(self, node, all_disk_uuids, boot_mode):
+    def _get_disks_to_clear(self, node, disk_index, boot_mode,
+                            wipe_jobs=DISK_WIPE_JOBS):
         config = []
         shared_uuids = BootManagerPlugin._get_shared_uuids(
-            node, all_disk_uuids)
+            node, disk_index)
         for disk in node.system.disks:
-            _log.event.info("Getting configs for disk"
-                            " {0} on {1}".format(disk.item_id, node))
+            _log.event_detail.info("Getting configs for disk %s on %s",
+                                   disk.item_id, node)
             config.extend(self._get_disk_list_item_config(
-                disk, all_disk_uuids))
+                disk, disk_index))
             if 'true' == disk.bootable or \
                     self._is_bootable_unshared_and_os_reinstall(
                         node, disk, shared_uuids):
@@ -785,11 +826,11 @@ fi"""
                     '\nclearpart_devs=\\${clearpart_devs},\\${drive_dev}'
                 )
             else:
-                _log.event.info("No clearpart for disk_list_item_config for"
-                                " disk {0} uuid={1} and bootable={2} "
-                                "and os_reinstall={3}".format(
+                _log.event_detail.info(
+                    "No clearpart for disk_list_item_config for disk %s "
+                    "uuid=%s and bootable=%s and os_reinstall=%s",
                     disk.item_id, disk.uuid, disk.bootable,
-                    self._is_os_reinstall(node)))
+                    lazy(self._is_os_reinstall, node))
         _log.event.info("Add drive drive_dev to clearpart_devs ")
         if self._is_os_reinstall(node):
             config.append(
@@ -815,71 +856,37 @@ fi"""
         # Kickstart at runtime
         # TORF-512209 - but only if the disk is bootable
         part_table_type = "gpt" if boot_mode == "uefi" else "msdos"
-        config.append(
-            'if [ "\\${{#parts_to_clear}}" -gt 2 ]; then\n'
-            'IFS=\',\' read -r -a wipedisks <<< '
-            '"$clearpart_devs,$parts_to_clear"\n'
-            'else\n'
-            'IFS=\',\' read -r -a wipedisks <<< '
-            '"$clearpart_devs"\n'
-            'fi\n'
-            'for wipedisk in \\${{wipedisks[@]}}; do\n'
-            'partprobe /dev/"$wipedisk"\n'
-            'wipefs -qfa /dev/"$wipedisk"\n'
-            'udevadm settle\n'
-            'sleep 2s\n'
-            'partprobe /dev/"$wipedisk"\n'
-            'udevadm settle\n'
-            'sleep 2s\n'
-            'parted /dev/"$wipedisk" '
-            '--script -- mklabel {0}\n'
-            'done\n'.format(part_table_type))
+        if wipe_jobs > 1:
+            config.append(templates.WIPE_DISKS_PARALLEL.render(
+                part_table_type=part_table_type, jobs=wipe_jobs))
+        else:
+            config.append(templates.WIPE_DISKS.render(
+                part_table_type=part_table_type))
         return config
 
     def _get_optional_partitions(self, disk, boot_mode):
         opt_part_commands = []
         if boot_mode == 'uefi':
-            opt_part_commands.append(
-                "echo \"part /boot/efi --fstype=efi --size=%s "
-                "--ondisk=${disk_list[\"%s\"]}\" >>"
-                " /tmp/partitioninfo" % (
-                    self._uefi_size,
-                    disk.item_id
-                )
-            )
+            opt_part_commands.append(templates.EFI_PARTITION.render(
+                size=self._uefi_size, disk_id=disk.item_id))
         else:
-            # TORF-495707: Add a 1MB biosboot partition in the case the
-            # underlying phsical disk is >= 2TB. See grub2/gpt
-            # partitioning in RHEL7.
-            # TORF-544812: In all other cases, add a mock 1MB biosboot
-            # partition to keep discovery of the correct partition to
-            # write on simple.
-            opt_part_commands.append(
-                'dev_path=\\$(realpath "/dev/"\\${drive_dev})\n'
-                'dev_name=\\$(basename "${dev_path}")\n'
-                'dev_size=\\$(cat "/sys/block/${dev_name}/size")\n'
-                'disk_size=\\$(( 512 * $dev_size / 1024**4 ))\n'
-                'if [[ "${disk_size}" -ge 2 ]]; then\n'
-                'echo "part biosboot --fstype=biosboot'
-                ' --size=1 --ondisk=${disk_list["%s"]}\" >> '
-                '/tmp/partitioninfo\nelse\n'
-                'echo "part extra --fstype=ext4 --size=1'
-                ' --ondisk=${disk_list["%s"]}\" >> '
-                '/tmp/partitioninfo\n'
-                'fi' % (disk.item_id, disk.item_id))
+            opt_part_commands.append(templates.BIOSBOOT_PARTITION.render(
+                disk_id=disk.item_id))
 
         return opt_part_commands
 
-    def _get_node_boot_parts(self, node, all_disk_uuids, boot_mode):
+    def _get_node_boot_parts(self, node, disk_index, boot_mode):
         boot_part_commands = list()
         for disk in node.system.disks:
             # Add all disks that aren't shared across systems to the set
             # passed to Anaconda's clearpart command (the order doesn't
             # matter).
             # It is assumed UUID-less disks are never shared.
-            _log.event.info("Skip disk {0} uuid={1} uuid_on_disk={2}".format(
-                disk, disk.uuid, BootManagerPlugin._uuid_on_disk(disk)))
-            if all_disk_uuids.count(disk.uuid) != 1 and \
+            _log.event_detail.info("Skip disk %s uuid=%s uuid_on_disk=%s",
+                                   disk, disk.uuid,
+                                   lazy(BootManagerPlugin._uuid_on_disk,
+                                        disk))
+            if not disk_index.is_unique(disk.uuid) and \
                 BootManagerPlugin._uuid_on_disk(disk):
                 continue
 
@@ -887,14 +894,8 @@ fi"""
                 boot_part_commands.extend(
                     self._get_optional_partitions(disk, boot_mode))
 
-                boot_part_commands.append(
-                    "echo \"part /boot --fstype=xfs --size=%s " \
-                    "--ondisk=${disk_list[\"%s\"]}\" >> " \
-                    "/tmp/partitioninfo" % (
-                        self._boot_size,
-                        disk.item_id,
-                    )
-                )
+                boot_part_commands.append(templates.BOOT_PARTITION.render(
+                    size=self._boot_size, disk_id=disk.item_id))
 
         return boot_part_commands
 
@@ -949,37 +950,45 @@ fi"""
 
         return config
 
-    def _get_lvm_kickstart_config(self, api, node_hostname, boot_mode):
-        all_disk_uuids = self._get_all_disk_uuids(api)
-        node = api.query("node", hostname=node_hostname)[0]
-        _log.event.info("Generate {0} LVM Kickstart config".format(
-            node.os.version))
-
-        config = ["# Hash map",
-                  "declare -A disk_list",
-                  "# Loop through the data structure we have been" + \
-                  " passed in and build up a bash",
-                  "# hash of device paths based on uuid. " + \
-                  "Clear all disks in the model",
-                  "declare -a clearpart_devs",
-                  "declare -a parts_to_clear"]
+    def _iter_lvm_kickstart_config(self, node, disk_index, boot_mode,
+                                   wipe_jobs=DISK_WIPE_JOBS):
+        _log.event.info("Generate %s LVM Kickstart config", node.os.version)
+
         root_disks, root_vg = self._get_root_vg_disks(node)
 
         if root_disks == []:
-            return
-
-        config.extend(self._get_disks_to_clear(node, all_disk_uuids,
-                                               boot_mode))
-
-        config.append('echo "clearpart --all --drives='
-                      '\\${clearpart_devs/#,/}">/tmp/partitioninfo')
-        config.append('echo "ignoredisk --only-use='
-                      '\\${clearpart_devs/#,/}">>/tmp/partitioninfo')
-        config.append('echo "zerombr">>/tmp/partitioninfo')
+            return None
 
-        config.append('# Second loop to generate the partition '
-                      'tables - NB. must be after the clearpart '
-                      'command - hence 2 loops')
+        return self._emit_lvm_kickstart_config(node, disk_index, boot_mode,
+                                               root_disks, root_vg, wipe_jobs)
+
+    def _emit_lvm_kickstart_config(self, node, disk_index, boot_mode,
+                                   root_disks, root_vg,
+                                   wipe_jobs=DISK_WIPE_JOBS):
+        _log.summarize_as(node.hostname)
+        yield "# Hash map"
+        yield "declare -A disk_list"
+        yield ("# Loop through the data structure we have been"
+               " passed in and build up a bash")
+        yield ("# hash of device paths based on uuid. "
+               "Clear all disks in the model")
+        yield "declare -a clearpart_devs"
+        yield "declare -a parts_to_clear"
+        yield templates.BY_ID_INDEX
+
+        for fragment in self._get_disks_to_clear(node, disk_index,
+                                                 boot_mode, wipe_jobs):
+            yield fragment
+
+        yield ('echo "clearpart --all --drives='
+               '\\${clearpart_devs/#,/}">/tmp/partitioninfo')
+        yield ('echo "ignoredisk --only-use='
+               '\\${clearpart_devs/#,/}">>/tmp/partitioninfo')
+        yield 'echo "zerombr">>/tmp/partitioninfo'
+
+        yield ('# Second loop to generate the partition '
+               'tables - NB. must be after the clearpart '
+               'command - hence 2 loops')
 
         # FIXME So what if the root VG is *NOT* backed by the one bootable
         # disk? What happens then?
@@ -990,11 +999,12 @@ fi"""
         # from stage1 if it's not local.
         # TODO Maybe we should *always* write the Grub root (== /boot) on
         # the boot drive where the stage1 will live
-        config.extend(self._get_node_boot_parts(node, all_disk_uuids,
-                                                boot_mode))
-        config.extend(self._get_node_volume_parts(node, root_disks, root_vg))
-
-        return config
+        for fragment in self._get_node_boot_parts(node, disk_index,
+                                                  boot_mode):
+            yield fragment
+        for fragment in self._get_node_volume_parts(node, root_disks,
+                                                    root_vg):
+            yield fragment
 
     @staticmethod
     def _is_os_reinstall(node):
@@ -1002,9 +1012,8 @@ fi"""
                hasattr(node.upgrade, "os_reinstall") and \
                node.upgrade.os_reinstall == 'true'
 
-    def _get_rhel6_disk_config(self, api, disk, config, boot_part_commands):
-        all_disk_uuids = self._get_all_disk_uuids(api)
-
+    def _get_rhel6_disk_config(self, disk_index, disk, config,
+                               boot_part_commands):
         # Build a hash mapping disk uuids to their symlinks in
         # /dev/disk/by-id
         if BootManagerPlugin._uuid_on_disk(disk):
@@ -1012,104 +1021,66 @@ fi"""
             # passed to Anaconda's clearpart command (the order doesn't
             # matter).
             # It is assumed UUID-less disks are never shared.
-            if all_disk_uuids.count(disk.uuid) != 1:
+            if not disk_index.is_unique(disk.uuid):
                 return config, boot_part_commands
-            config.append('disk_list_item=\\$(shopt -s '
-                          'nocaseglob; ls /dev/disk/by-id/scsi*{uuid}'
-                          ')'.format(
-                uuid=disk.uuid
-            )
-            )
-            # Fallback for HP SmartArray (LITPCDS-8098). Assumes that if
-            # there is a mix of scsi and cciss block devices, the disks
-            # themselves are only pointed to by one of them.
-            config.append(
-                'if [ ! -n "$disk_list_item" ]; then\n'
-                'disk_list_item=\\$(shopt -s nocaseglob; '
-                'ls /dev/disk/by-id/cciss*{uuid}'
-                ')\nfi'.format(
-                    uuid=disk.uuid
-                )
-            )
-            config.append(
-                'disk_list["{disk_id}"]=\\$disk_list_item'.format(
-                    disk_id=disk.item_id
-                )
-            )
-            test = """
-if [[ ! -b \\${disk_list["%s"]} ]]; then
-echo "ERROR: Could not find disk of UUID '%s'" >> /dev/tty1;
-read;
-exit 1;
-fi""" % (disk.item_id, disk.uuid)
-            config.append(test)
+            config.append(templates.RHEL6_DISK_LIST_ITEM.render(
+                uuid=disk.uuid, disk_id=disk.item_id))
+            config.append(templates.UUID_CHECK.render(
+                disk_id=disk.item_id, uuid=disk.uuid))
         else:
-            # We don't want to set the key's value to /dev/<disk.name>
-            # since we want to handle the case where there is no device
-            # by that name on the node
-            config.append('disk_list["{disk_id}"]=\\$(shopt -s '
-                          'nocaseglob; ls /dev/{name})'.format(
-                disk_id=disk.item_id,
-                name=disk.name
-            ))
+            config.append(templates.DISK_LIST_ITEM_BY_NAME.render(
+                disk_id=disk.item_id, name=disk.name))
 
         if BootManagerPlugin._uuid_on_disk(disk):
-            config.append('drive_dev=\\$(basename \\$(find '
-                          '/dev/disk/by-id -iname scsi\\*%s -printf "%%l"))'
-                          % (disk.uuid)
-                          )
-            # Fallback for HP SmartArray (LITPCDS-8098).
-            config.append(
-                'if [ ! -n "$drive_dev" ]; then\n'
-                'drive_dev=\\$(basename \\$(find '
-                '/dev/disk/by-id -iname cciss\\*%s -printf "%%l"))\n'
-                'fi'
-                % (disk.uuid)
-            )
+            config.append(templates.RHEL6_DRIVE_DEV.render(uuid=disk.uuid))
         else:
-            config.append('drive_dev={0}'.format(disk.name))
+            config.append(templates.RHEL6_DRIVE_DEV_BY_NAME.render(
+                name=disk.name))
 
         config.append('clearpart_devs=\\${clearpart_devs},'
                       '\\${drive_dev}')
 
         if 'true' == disk.bootable:
             boot_part_commands.append(
-                "echo \"part /boot --fstype=ext4 --size=%s " \
-                "--ondisk=${disk_list[\"%s\"]}\" >>" \
-                "/tmp/partitioninfo" % (
-                    self._boot_size_rhel6,
-                    disk.item_id,
-                )
-            )
+                templates.RHEL6_BOOT_PARTITION.render(
+                    size=self._boot_size_rhel6, disk_id=disk.item_id))
         return config, boot_part_commands
 
-    def _get_lvm_kickstart_config_rhel6(self, api, node_hostname):
-        node = api.query("node", hostname=node_hostname)[0]
-        config = ["# Hash map",
-                  "declare -A disk_list",
-                  "# Loop through the data structure we have been" + \
-                  " passed in and build up a bash",
-                  "# hash of device paths based on uuid. " + \
-                  "Clear all disks in the model"]
-
+    def _iter_lvm_kickstart_config_rhel6(self, node, disk_index):
         root_disks, root_vg = self._get_root_vg_disks(node)
 
         if root_disks == []:
-            return
+            return None
+
+        return self._emit_lvm_kickstart_config_rhel6(node, disk_index,
+                                                     root_disks, root_vg)
+
+    def _emit_lvm_kickstart_config_rhel6(self, node, disk_index, root_disks,
+                                         root_vg):
+        _log.summarize_as(node.hostname)
+        yield "# Hash map"
+        yield "declare -A disk_list"
+        yield ("# Loop through the data structure we have been"
+               " passed in and build up a bash")
+        yield ("# hash of device paths based on uuid. "
+               "Clear all disks in the model")
+        yield templates.BY_ID_INDEX
 
         boot_part_commands = list()
         for disk in node.system.disks:
             config, boot_part_commands = self._get_rhel6_disk_config(
-                api, disk, config, boot_part_commands)
+                disk_index, disk, [], boot_part_commands)
+            for fragment in config:
+                yield fragment
 
         # Write the clearpart invocation to the file %included from the
         # Kickstart at runtime
-        config.append('echo "clearpart --initlabel --all --drives=' +
-                      '\\${clearpart_devs/#,/}">/tmp/partitioninfo')
+        yield ('echo "clearpart --initlabel --all --drives='
+               '\\${clearpart_devs/#,/}">/tmp/partitioninfo')
 
-        config.append("# Second loop to generate the partition " +
-                      "tables - NB. must be after the clearpart " +
-                      "command - hence 2 loops")
+        yield ("# Second loop to generate the partition "
+               "tables - NB. must be after the clearpart "
+               "command - hence 2 loops")
 
         # So what if the root VG is *NOT* backed by the one bootable
         # disk? What happens then?
@@ -1120,7 +1091,8 @@ fi""" % (disk.item_id, disk.uuid)
         # from stage1 if it's not local.
         # TODO Maybe we should *always* write the Grub root (== /boot) on
         # the boot drive where the stage1 will live
-        config.extend(boot_part_commands)
+        for fragment in boot_part_commands:
+            yield fragment
 
         for vg in node.storage_profile.volume_groups:
             if vg.volume_group_name != root_vg:
@@ -1131,7 +1103,7 @@ fi""" % (disk.item_id, disk.uuid)
             # runtime
             root_vg_part_index = 1
             part_ids = []
-            config.append('# Create PV(s) for Root VG')
+            yield '# Create PV(s) for Root VG'
             for root_disk in root_disks:
                 part_size = self._convert_to_mb(root_disk.size)
                 if 'true' == root_disk.bootable:
@@ -1146,18 +1118,18 @@ fi""" % (disk.item_id, disk.uuid)
                        (" --ondisk=${disk_list[\"%s\"]}\"" % \
                         root_disk.item_id) + \
                        " >> /tmp/partitioninfo"
-                config.append(line)
+                yield line
                 root_vg_part_index += 1
 
-            config.append('# Create Root VG')
+            yield '# Create Root VG'
             # Write the 'volgroup' invocation for the Root VG to the file
             # %included from the Kickstart at runtime
             line = ("echo \"volgroup %s" % vg.volume_group_name) + \
                    (" --pesize=4096 %s\" >> /tmp/partitioninfo" % \
                     ' '.join(part_ids))
-            config.append(line)
+            yield line
 
-            config.append('# Create Root VG Logical Volumes')
+            yield '# Create Root VG Logical Volumes'
             for file_system in vg.file_systems:
                 if file_system.mount_point:
                     line = "echo \"logvol %s --fstype=%s" % (
@@ -1167,8 +1139,7 @@ fi""" % (disk.item_id, disk.uuid)
                         vg.volume_group_name,
                         self._convert_to_mb(file_system.size))
                     line += "\" >> /tmp/partitioninfo"
-                    config.append(line)
-        return config
+                    yield line
 
     @staticmethod
     def _convert_to_mb(size):
@@ -1180,33 +1151,7 @@ fi""" % (disk.item_id, disk.uuid)
         """
         @summary: Picks up the keyboard layout from the MS
         """
-        localectl_out = '/opt/ericsson/nms/litp/share/kickstart/localectl.out'
-        default_layout = 'uk'
-        kb_layout = None
-        try:
-            with open(localectl_out, 'r') as f:
-                output = f.readlines()
-            for line in output:
-                if "VC Keymap:" in line:
-                    kb_layout = line.split(":", 1)[-1]
-                    kb_layout = kb_layout.strip(" ")
-                    kb_layout = kb_layout.strip("\n")
-                    break
-            if kb_layout not in KEYMAPS:
-                _log.trace.error(
-                    "Keyboard layout {0} is not supported by "
-                    "kickstart. Using default {1} instead".
-                        format(kb_layout, default_layout)
-                )
-                return default_layout
-            return kb_layout
-        except (IndexError, IOError) as err:
-            _log.trace.error(
-                "{0}. "
-                "Using default {1} instead".
-                    format(err, default_layout)
-            )
-            return default_layout
+        return self._ms_locale.keyboard()
 
     def _get_lvm_disk_uuids_for_node(self, node):
         lvm_disk_uuids = []
@@ -1229,6 +1174,8 @@ fi""" % (disk.item_id, disk.uuid)
         openstack_env = BootManagerPlugin._is_openstack_env(ms)
 
         ms_hostname = ms.hostname
+        timezone = self._get_timezone()
+        keyboard = self._get_keyboard()
         for node in nodes:
             cluster_type = ""
             cluster = node.get_cluster()
@@ -1263,8 +1210,8 @@ fi""" % (disk.item_id, disk.uuid)
                     selinux_mode=selinux_mode,
                     path=service.ksm_path,
                     ksname=node.hostname + '.ks',
-                    timezone=self._get_timezone(),
-                    keyboard=self._get_keyboard(),
+                    timezone=timezone,
+                    keyboard=keyboard,
                     partitioninfo=str(include_statement),
                     cluster_type=cluster_type,
                     ms_hostname=ms_hostname,
@@ -1286,8 +1233,9 @@ fi""" % (disk.item_id, disk.uuid)
 
     def _generate_cobbler_configure(self, service, plugin_api_context,
                                     tasks, reconfigure):
-        boot_net = self._get_boot_network(plugin_api_context)
-        ms = plugin_api_context.query("ms")[0]
+        context = PlanningContext.of(self, plugin_api_context)
+        boot_net = context.boot_network
+        ms = context.ms
         networks = []
         networks.append(self._network_dict(boot_net))
         rem_old_pup = 1 if \
@@ -1299,14 +1247,12 @@ fi""" % (disk.item_id, disk.uuid)
         rsync_disabled = 'yes' if \
             service.rsync_disabled == "true" else 'no'
 
-        self._find_ip_for_node(ms, boot_net)
-
         if reconfigure:
             task_description = 'Reconfigure Cobbler server on node'
         else:
             task_description = 'Create Cobbler server on node'
 
-        os_profile = plugin_api_context.query("os-profile")[0]
+        os_profile = context.os_profiles[0]
         distro_name = "%s-%s" % (os_profile.name, os_profile.arch)
 
         config_task = ConfigTask(
@@ -1378,13 +1324,15 @@ fi""" % (disk.item_id, disk.uuid)
                               kopts=opts,
                               repos=[])
 
-        profiles = plugin_api_context.query("os-profile", is_initial=True)
+        context = PlanningContext.of(self, plugin_api_context)
+        profiles = [profile for profile in context.os_profiles
+                    if profile.is_initial()]
 
-        ms = plugin_api_context.query("ms")[0]
-        providers = self._get_providers(plugin_api_context)
-        new_node_systems = self._get_new_node_systems(plugin_api_context)
-        _log.trace.debug('Profiles to be set up: %s' % profiles)
-        _log.trace.debug('New systems to be set up: %s' % new_node_systems)
+        ms = context.ms
+        providers = context.providers
+        new_node_systems = context.new_nodes
+        _log.trace.debug('Profiles to be set up: %s', profiles)
+        _log.trace.debug('New systems to be set up: %s', new_node_systems)
 
         WEB_ROOT = '/var/www/html/'
         profile_tasks = {}
@@ -1435,10 +1383,15 @@ fi""" % (disk.item_id, disk.uuid)
 
         if new_node_systems:
             for node in new_node_systems:
-                _log.trace.debug('Call create_sys_parms for node "%s"' % node)
+                _log.trace.debug('Call create_sys_parms for node "%s"', node)
             new_systems = [self._create_system_params(
                 node, service, providers,
-                plugin_api_context) for node in new_node_systems]
+                context) for node in new_node_systems]
+            if len(new_systems) > 1 and \
+                    self._get_bulk_registration(service):
+                tasks.append(self._create_bulk_register_task(
+                    service, ms, new_systems, profile_tasks))
+                return
             for system_params in new_systems:
                 add_system_task = CallbackTask(
                     service,
@@ -1462,8 +1415,78 @@ fi""" % (disk.item_id, disk.uuid)
                     add_system_task.requires.add(system_profile_task)
                 tasks.append(add_system_task)
 
+    def _create_bulk_register_task(self, service, ms, new_systems,
+                                   profile_tasks):
+        """
+        Returns a single CallbackTask registering all the given systems
+        in one request to the MS, which applies them in one cobbler API
+        session.
+        """
+        system_names = [system_params['name']
+                        for system_params in new_systems]
+        systems = [{'name': system_params['name'],
+                    'profile': system_params['profile'],
+                    'interfaces': system_params['interfaces'],
+                    'hostname': system_params['name'],
+                    'kickstart': "/var/lib/cobbler/kickstarts/%s.ks"
+                                 % system_params['name'],
+                    'virt_data': system_params['virt_data']}
+                   for system_params in new_systems]
+        add_systems_task = CallbackTask(
+            service,
+            'Register systems %s for install' %
+            BootManagerPlugin.format_list(system_names, quotes_char='double'),
+            self._add_systems_callback,
+            [ms.hostname],
+            system_names,
+            systems=systems
+        )
+        for system_params in new_systems:
+            system_profile_task = profile_tasks.get(system_params['profile'])
+            if system_profile_task:
+                add_systems_task.requires.add(system_profile_task)
+        return add_systems_task
+
+    @staticmethod
+    def _registered_systems(add_system_task):
+        """
+        The names of the systems a register task registers, one for a
+        "Register system" task and all of them for a bulk one.
+        """
+        system_names = add_system_task.args[1]
+        if isinstance(system_names, (list, tuple)):
+            return list(system_names)
+        return [system_names]
+
+    def _generate_cobbler_sync(self, service, plugin_api_context,
+                               add_system_tasks):
+        """
+        Returns a single CallbackTask syncing cobbler once every system of
+        the plan has been registered, or None if no system is registered.
+        The distro and profile ConfigTasks generated along with the
+        register tasks are ignored.
+        """
+        add_system_tasks = [task for task in add_system_tasks
+                            if isinstance(task, CallbackTask)]
+        if not add_system_tasks:
+            return None
+        ms = PlanningContext.of(self, plugin_api_context).ms
+        system_names = [name for task in add_system_tasks
+                        for name in self._registered_systems(task)]
+        sync_task = CallbackTask(
+            service,
+            'Sync Cobbler for system(s) %s' %
+            BootManagerPlugin.format_list(system_names, quotes_char='double'),
+            self._sync_cobbler_callback,
+            [ms.hostname],
+            system_names
+        )
+        for add_system_task in add_system_tasks:
+            sync_task.requires.add(add_system_task)
+        return sync_task
+
     def _get_kernel_options(self, os_version):
-        _log.event.debug("Add {0} kernel options".format(os_version))
+        _log.event.debug("Add %s kernel options", os_version)
 
         if os_version == "rhel6":
             # RHEL 6 kernel options
@@ -1505,7 +1528,12 @@ fi""" % (disk.item_id, disk.uuid)
         self._do_cobbler_mco(cb_api, nodes, 'remove_system',
                              {'system': system_name})
 
+    @profiled('add_system_callback')
     def _add_system_callback(self, cb_api, nodes, system_name, **kwargs):
+        with self._install_timings.phase([system_name], 'register'):
+            self._register_system(cb_api, nodes, system_name, **kwargs)
+
+    def _register_system(self, cb_api, nodes, system_name, **kwargs):
         self._backup_anamon_logs(cb_api, nodes, kwargs['hostname'])
 
         command_args = {
@@ -1516,65 +1544,121 @@ fi""" % (disk.item_id, disk.uuid)
             if not command_args[k]:
                 del command_args[k]
 
-        copy_keys = lambda orig_dict, keys: \
-            dict([(k, v) for k, v in orig_dict.items() \
-                  if k in keys])
-
-        command_args_add = copy_keys(command_args, ["system", "profile"])
-
-        edit_keys = ["system", "profile", "hostname", "kickstart"]
-        command_args_edit = copy_keys(command_args, edit_keys)
-
         _log.trace.debug(
             '%s _add_system_callback '
-            '%s, interfaces=%s, profile=%s, virt_data=%s)'
-            % (cb_api.is_running(), system_name,
-               command_args.get("interfaces"),
-               command_args.get("profile"),
-               command_args.get("virt_data")))
-
-        virt_data = command_args.get("virt_data")
+            '%s, interfaces=%s, profile=%s, virt_data=%s)',
+            cb_api.is_running(), system_name,
+            command_args.get("interfaces"),
+            command_args.get("profile"),
+            command_args.get("virt_data"))
+
+        if not self._register_locally(
+                [self._register_system_spec(command_args)]):
+            self._do_cobbler_mco(cb_api, nodes, 'register_system',
+                                 self._register_system_args(command_args))
+
+    @profiled('add_systems_callback')
+    def _add_systems_callback(self, cb_api, nodes, system_names, systems):
+        with self._install_timings.phase(system_names, 'register'):
+            self._register_systems(cb_api, nodes, systems)
+
+    def _register_systems(self, cb_api, nodes, systems):
+        specs = []
+        for system in systems:
+            self._backup_anamon_logs(cb_api, nodes, system['hostname'])
+            command_args = dict([(k, v) for k, v in system.items()
+                                 if k != 'name' and v])
+            command_args['system'] = system['name']
+            spec = self._register_system_spec(command_args)
+            specs.append(spec)
+
+        _log.trace.debug('%s _add_systems_callback %s', cb_api.is_running(),
+                         lazy(lambda: [spec['system'] for spec in specs]))
+
+        if not self._register_locally(specs):
+            self._do_cobbler_mco(cb_api, nodes, 'register_systems',
+                                 {'systems': json.dumps(specs, sort_keys=True),
+                                  # synced together by the trailing sync task
+                                  'sync': 'false'})
+
+    def _register_locally(self, specs):
+        """
+        Registers the systems through the local Cobbler API, returning
+        False if it is not available or fails, for the caller to fall back
+        to the cobbler mco agent.
+        """
+        if not self._local_cobbler.available():
+            return False
+        try:
+            self._local_cobbler.register_systems(specs)
+        except LocalCobblerError as ex:
+            _log.trace.warning('%s. Registering through MCollective', ex)
+            return False
+        return True
 
-        all_ifaces = []
+    @staticmethod
+    def _register_system_spec(command_args):
+        """
+        Flattens the system params into the system spec the cobbler agent
+        registers, dropping the empty interface settings.
+        """
+        register_keys = ["system", "profile", "hostname", "kickstart"]
+        spec = dict([(k, v) for k, v in command_args.items()
+                     if k in register_keys])
+        spec.update(command_args.get("virt_data") or {})
         interfaces = command_args.get("interfaces")
-        for i in interfaces:
-            iface = interfaces[i]
-            iface['interface'] = i
-            iface['system'] = system_name
-            all_ifaces.append(iface)
-
         if interfaces:
-            # following keys are per iface:
-            # "ip_address", "mac_address", "dns_name"
-            command_args_edit.update(all_ifaces.pop(0))
+            spec["interfaces"] = dict(
+                [(iface, dict([(k, v) for k, v in data.items() if v]))
+                 for iface, data in interfaces.items()])
+        return spec
 
-        if virt_data:
-            command_args_edit.update(virt_data)
-
-        self._do_cobbler_remove_system(cb_api, nodes, system_name)
-        self._do_cobbler_mco(cb_api, nodes, 'add_system', command_args_add)
-        self._do_cobbler_mco(cb_api, nodes, 'edit_system', command_args_edit)
-        # add other iface data
-        for iface in all_ifaces:
-            self._do_cobbler_mco(cb_api, nodes, 'edit_system', iface)
-
-        self._do_cobbler_mco(cb_api, nodes, 'sync', [])
+    @staticmethod
+    def _register_system_args(command_args):
+        """
+        Flattens the system params into the arguments of the cobbler agent
+        "register_system" action, which removes, adds and edits the system
+        in one request. The interfaces are passed as a JSON object.
+        """
+        register_args = BootManagerPlugin._register_system_spec(command_args)
+        if "interfaces" in register_args:
+            register_args["interfaces"] = json.dumps(
+                register_args["interfaces"], sort_keys=True)
+        # the systems of a plan are synced together by a trailing task
+        register_args["sync"] = "false"
+        return register_args
 
     # Mocking time.time() directly is a nightmare..
     def _get_current_time(self):
         return int(time.time())
 
-    def _wait_for_callback(self, callback_api, waiting_msg, callback,
-                           *args, **kwargs):
+    def _wait_with_backoff(self, callback_api, waiting_msg, backoff,
+                           callback, *args, **kwargs):
+        """
+        Calls ``callback`` at the delays given by ``backoff`` until it
+        returns True. The plan state and the timeout are still checked
+        every second between the probes.
+        """
+        delays = iter(backoff)
         epoch = self._get_current_time()
-        while not callback(*args, **kwargs):
+        probe_at = epoch + next(delays)
+        now = epoch
+        while True:
+            if now >= probe_at:
+                if callback(*args, **kwargs):
+                    return
+                probe_at = now + next(delays)
             if not callback_api.is_running():
                 raise PlanStoppedException(
                     "Plan execution has been stopped.")
-            counter = self._get_current_time() - epoch
+            now = self._get_current_time()
+            counter = now - epoch
             if counter % 60 == 0:
                 _log.trace.info(waiting_msg)
             if counter >= self._max_waiting_time_for_node:
+                # the backoff may have left the last moments unprobed
+                if callback(*args, **kwargs):
+                    return
                 raise CallbackExecutionException(
                     "Node has not come up within {0} seconds".format(
                         self._max_waiting_time_for_node)
@@ -1589,8 +1673,7 @@ fi""" % (disk.item_id, disk.uuid)
         if os.path.isdir(anamon_node_logs) and os.listdir(anamon_node_logs):
             backup_dir = os.path.join(cobbler_log_dir, 'anamon.backup/')
             if not os.path.isdir(backup_dir):
-                _log.trace.debug("Creating backup dir '{0}'".format(
-                    backup_dir))
+                _log.trace.debug("Creating backup dir '%s'", backup_dir)
                 self._do_cobbler_mco(callback_api, nodes,
                                      'create_directory',
                                      {'directory': backup_dir})
@@ -1609,31 +1692,86 @@ fi""" % (disk.item_id, disk.uuid)
                 backup_paths.remove(newest_file)
 
                 for path in backup_paths:
-                    _log.trace.debug("Number of backups greater than {0} "
-                                     "removing '{1}'".format(num_backups,
-                                                             path))
+                    _log.trace.debug("Number of backups greater than %s "
+                                     "removing '%s'", num_backups, path)
                     self._do_cobbler_mco(callback_api, nodes,
                                          'remove_directory',
                                          {'directory': path})
-                    _log.trace.debug("Backup removed - {0}".format(path))
+                    _log.trace.debug("Backup removed - %s", path)
+
+    @staticmethod
+    def _get_disk_wipe_jobs(service):
+        """
+        The number of disks the partition snippet wipes at the same time,
+        from the "disk_wipe_jobs" cobbler-service property defined by the
+        bootmgr extension. Older models without it wipe one at a time.
+        """
+        value = getattr(service, 'disk_wipe_jobs', None)
+        try:
+            return max(1, int(value)) if value is not None \
+                else DISK_WIPE_JOBS
+        except (TypeError, ValueError):
+            return DISK_WIPE_JOBS
+
+    @staticmethod
+    def _get_bulk_registration(service):
+        """
+        Whether the new systems of a plan are registered by one task, from
+        the "bulk_registration" cobbler-service property defined by the
+        bootmgr extension. Older models without it register one system
+        per task.
+        """
+        value = getattr(service, 'bulk_registration', None)
+        if value is None:
+            return BULK_REGISTRATION
+        return str(value).lower() == 'true'
+
+    def _get_node_probe_backoff(self, callback_api):
+        """
+        The intervals are cobbler-service properties, defined by the
+        bootmgr extension. Older models without them use the defaults.
+        """
+        service = self._get_cobbler_service(callback_api)
+
+        def _interval(name, default):
+            value = getattr(service, name, None) if service else None
+            try:
+                return int(value) if value is not None else default
+            except (TypeError, ValueError):
+                return default
+
+        return ProbeBackoff(
+            _interval('node_min_install_time', NODE_MIN_INSTALL_TIME),
+            _interval('node_probe_min_interval', NODE_PROBE_MIN_INTERVAL),
+            _interval('node_probe_max_interval', NODE_PROBE_MAX_INTERVAL))
 
     def _install_node(self, callback_api, node_ip, hostname):
-        self._wait_for_callback(
-            callback_api,
-            ("Waiting for node to come up: %s (%s)" % (hostname, node_ip)),
-            self._check_node,
-            hostname
-        )
+        backoff = self._get_node_probe_backoff(callback_api)
+        _log.trace.debug("Probing node %s with %s", hostname, backoff)
+        self._liveness_monitor.register(hostname)
+        try:
+            with self._install_timings.phase([hostname], 'first_ping'):
+                self._wait_with_backoff(
+                    callback_api,
+                    ("Waiting for node to come up: %s (%s)" % (hostname,
+                                                               node_ip)),
+                    backoff,
+                    self._liveness_monitor.is_alive,
+                    hostname
+                )
+        finally:
+            self._liveness_monitor.unregister(hostname)
         _log.event.info("Node %s (%s) has come up.", hostname, node_ip)
 
     def _find_ip_for_node(self, node, network):
 
-        _log.trace.debug("node net %s %s" % (node, network))
+        _log.trace.debug("node net %s %s", node, network)
         for node_interface in node.network_interfaces:
             if node_interface.network_name:
-                _log.trace.debug("Found net %s " % node_interface.network_name)
+                _log.trace_detail.debug("Found net %s ",
+                                        node_interface.network_name)
                 if network.name == node_interface.network_name:
-                    _log.trace.debug("Found ip %s " % node_interface.ipaddress)
+                    _log.trace.debug("Found ip %s ", node_interface.ipaddress)
                     return node_interface.ipaddress
         return None
 
@@ -1643,60 +1781,119 @@ fi""" % (disk.item_id, disk.uuid)
         # https://tickets.puppetlabs.com/browse/MCO-199
         return exit_code in (0, 1)
 
-    @staticmethod
-    def _get_timezone():
+    def _ping_nodes(self, hostnames):
         """
-        @summary: Grabs the timezone from the timedatectl output on the MS
+        Returns the hostnames that answer a single rpcutil ping sent to
+        all of them.
         """
-        time_out = '/opt/ericsson/nms/litp/share/kickstart/timedatectl.out'
-        timezone = None
+        if len(hostnames) == 1:
+            return set(hostnames) if self._check_node(hostnames[0]) \
+                else set()
         try:
-            with open(time_out, 'r') as f:
-                output = f.readlines()
-            for line in output:
-                if "Time zone:" in line:
-                    timezone = line.split(":", 1)[-1]
-                    timezone = timezone.strip(" ")
-                    timezone = timezone.split(" ", 1)[0]
-                    break
-            if not timezone:
-                raise IndexError("No timezone found in timedatectl output")
-            return '--utc {0}'.format(timezone)
-        except (IOError, IndexError) as err:
-            timezone = "Europe/Dublin"
-            _log.event.error("{0}. " \
-                             "Using default timezone".format(err))
-            return '--utc {0}'.format(timezone)
+            results = run_rpc_command(hostnames, "rpcutil", "ping",
+                                      timeout=NODE_LIVENESS_PING_TIMEOUT)
+        except RpcExecutionException as ex:
+            _log.trace.debug("Pinging nodes %s failed: %s",
+                             lazy(', '.join, hostnames), ex)
+            return set()
+        return set(hostname for hostname, result in results.iteritems()
+                   if not result.get('errors'))
 
-    def cb__write_snippet(self, callback_api, path, node_hostname, os_version,
-                          boot_mode):
-        """@summary write Kickstart snippet to the filesystem on the MS"""
+    def _get_timezone(self):
+        """
+        @summary: Grabs the timezone from the timedatectl output on the MS
+        """
+        return self._ms_locale.timezone()
+
+    def _iter_partition_snippet(self, api, node_hostname, os_version,
+                                boot_mode, wipe_jobs=DISK_WIPE_JOBS):
+        """
+        Takes a single snapshot of the model (the node and the disk UUID
+        index) and renders the partition snippet config from it, so the
+        number of model queries does not depend on the number of disks.
+        """
+        disk_index = self._get_disk_uuid_index(api)
+        node = api.query("node", hostname=node_hostname)[0]
+        return self._render_partition_snippet(node, disk_index, os_version,
+                                              boot_mode, wipe_jobs)
+
+    def _render_partition_snippet(self, node, disk_index, os_version,
+                                  boot_mode, wipe_jobs=DISK_WIPE_JOBS):
+        """
+        Returns a generator of the fragments of the partition snippet, or
+        None if the node has no disks backing its root VG.
+        """
         if os_version == "rhel6":
-            config = self._get_lvm_kickstart_config_rhel6(
-                callback_api, node_hostname)
-        else:
-            config = self._get_lvm_kickstart_config(
-                callback_api, node_hostname, boot_mode)
+            return self._iter_lvm_kickstart_config_rhel6(node, disk_index)
+        return self._iter_lvm_kickstart_config(node, disk_index, boot_mode,
+                                               wipe_jobs)
+
+    def _get_partition_snippet_configs(self, api, snippets, boot_mode,
+                                       wipe_jobs=DISK_WIPE_JOBS):
+        """
+        Renders the partition snippet config of every node in ``snippets``
+        from a single snapshot of the model, taken with one disk UUID index
+        and one node query whatever the number of nodes. Raises
+        CallbackExecutionException, before any snippet is written, if a
+        node has no disks backing its root VG.
+        """
+        disk_index = self._get_disk_uuid_index(api)
+        nodes = dict((node.hostname, node) for node in api.query("node"))
+        configs = []
+        for snippet in snippets:
+            config = self._render_partition_snippet(
+                nodes[snippet['node_hostname']], disk_index,
+                snippet['os_version'], boot_mode, wipe_jobs)
+            if config is None:
+                raise CallbackExecutionException(
+                    'Cannot generate the partition snippet of node "%s": '
+                    'no disks back its root volume group' %
+                    snippet['node_hostname'])
+            configs.append((snippet['path'], config))
+        return configs
+
+    @staticmethod
+    def _write_snippet(path, config):
         try:
-            with os.fdopen(os.open(path,
-                                   os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
-                                   0644), 'w') as f:
-                f.writelines('\n'.join(config))
+            write_snippet(path, config)
         except IOError:
             # The error-reporting mechanism only supports raising exceptions
             raise
 
+    @profiled('write_snippet')
+    def cb__write_snippet(self, callback_api, path, node_hostname, os_version,
+                          boot_mode, disk_wipe_jobs=DISK_WIPE_JOBS):
+        """@summary write Kickstart snippet to the filesystem on the MS"""
+        with _log.plan_summary():
+            config = self._iter_partition_snippet(
+                callback_api, node_hostname, os_version, boot_mode,
+                disk_wipe_jobs)
+            self._write_snippet(path, config)
+
+    @profiled('write_snippets')
+    def cb__write_snippets(self, callback_api, snippets, boot_mode,
+                           disk_wipe_jobs=DISK_WIPE_JOBS):
+        """@summary write the Kickstart snippets of several nodes to the
+        filesystem on the MS"""
+        # no snippet replaces its file before every snippet has been
+        # rendered, so a failure does not leave a plan half updated
+        with _log.plan_summary():
+            write_snippets(self._get_partition_snippet_configs(
+                callback_api, snippets, boot_mode, disk_wipe_jobs))
+
     def _create_system_params(self, node, service, providers, plugin_context):
 
-        boot_network = self._get_boot_network(plugin_context)
-        boot_ipaddress = self._find_ip_for_node(node, boot_network)
+        context = PlanningContext.of(self, plugin_context)
+        boot_network = context.boot_network
+        topology = context.nic_topology(node)
+        boot_ipaddress = topology.ip_address(boot_network.name)
         hostname = node.hostname
         ks_file = os.path.join(service.ksm_path,
                                hostname + '.ks')
         profile = node.os
         profile_name = "%s-%s" % (profile.name, profile.arch)
-        _log.trace.debug('Using cobbler profile "%s" for node "%s"' % \
-                         (profile_name, hostname))
+        _log.trace.debug('Using cobbler profile "%s" for node "%s"',
+                         profile_name, hostname)
 
         # gather params for new system
         system_params = {}
@@ -1707,11 +1904,9 @@ fi""" % (disk.item_id, disk.uuid)
         system_params['mgmt_classes'] = "mgmt-nodes"
 
         # gather networking interface config
-        device_name = self._get_dedicated_pxe_boot_only_nic(node)
-        device_name = device_name or \
-                      self._get_matching_nic_name(node, boot_network)
-        _log.trace.debug('Device name "%s"' % device_name)
-        macaddress = self._find_mac(node, device_name)
+        device_name, macaddress = topology.pxe_nic(boot_network.name)
+        _log.summarize_as(hostname)
+        _log.trace_detail.debug('Device name "%s"', device_name)
         device_name_values = {'mac_address': macaddress,
                               'ip_address': boot_ipaddress,
                               'dns_name': hostname}
@@ -1732,171 +1927,6 @@ fi""" % (disk.item_id, disk.uuid)
 
         return system_params
 
-    def _get_bridge_matching_nic(self, node, bridge_interface):
-        """
-        Looks for a network with the given name under node and returns the
-        name of its associated NIC
-        """
-        br_ifaces = [nic for nic in node.network_interfaces if \
-                     nic.item_type_id in \
-                     ['eth', 'vlan', 'bond'] and \
-                     hasattr(nic, 'bridge') and \
-                     nic.bridge == bridge_interface.device_name]
-        if not br_ifaces:
-            return None
-        br_iface = br_ifaces[0]
-        if br_iface.item_type_id == 'eth':
-            return br_iface
-        elif br_iface.item_type_id == 'bond':
-            slave = self._get_bond_eth_slaves(node, br_iface)[0]
-            return slave
-        if br_iface.item_type_id == 'vlan':
-            dev_name = br_iface.device_name.split('.')[0]
-            iface = self._get_interface_by_name(node, dev_name)
-            if iface.item_type_id == 'eth':
-                return iface
-            if iface.item_type_id == 'bond':
-                slave = self._get_bond_eth_slaves(node, iface)[0]
-                return slave
-        return None
-
-    def _get_dedicated_pxe_boot_only_nic(self, node):
-        """
-        Looks for a NIC with pxe_boot_only set to true and get its device name.
-        """
-        # It's not needed to check whether the interface is is_initial
-        # or is_for_removal, as it can not happen by validations.
-        for interface in node.network_interfaces:
-            if hasattr(interface, 'pxe_boot_only'):
-                if interface.pxe_boot_only == 'true':
-                    _log.trace.debug(
-                        'pxe_boot_only device for {0} is {1}'.format(
-                            node.hostname, interface.device_name))
-                    return interface.device_name
-        return None
-
-    def _get_matching_nic_name(self, node, expected_network):
-        """
-        Looks for a network with the given name under node and returns the
-        name of its associated NIC
-        """
-        if not node.network_interfaces:
-            return
-        for interface in node.network_interfaces:
-            _log.trace.debug(
-                'interface details "%s" "%s" "%s"',
-                interface.device_name,
-                interface.network_name,
-                expected_network.name
-            )
-            if hasattr(interface, 'network_name') and \
-                    interface.network_name == expected_network.name:
-                if interface.item_type_id == 'bridge':
-                    iface = self._get_bridge_matching_nic(node, interface)
-                    return iface.device_name
-                elif interface.item_type_id == 'vlan':
-                    # split the device_name to get the real tagged interface
-                    dev_name = interface.device_name.split('.')[0]
-                    iface = self._get_interface_by_name(node, dev_name)
-                    if iface.item_type_id == 'bond':
-                        slave = self._get_bond_eth_slaves(node, iface)[0]
-                        return slave.device_name
-                    return iface.device_name
-                elif interface.item_type_id == 'bond':
-                    slave = self._get_bond_eth_slaves(node, interface)[0]
-                    return slave.device_name
-                return interface.device_name
-
-    def _find_mac(self, node, interface):
-        """ Given an interface name, returns the MAC address of the NIC within
-        system that has that name.
-        NOTE: for bond interfaces, if there is no MAC address associated the
-        MAC address will be retrieved through the its eth slaves, in this
-        case the first one.
-        """
-        for nic in node.network_interfaces:
-            if nic.device_name == interface:
-                _log.trace.debug("nic.item_type_id is %s " % nic.item_type_id)
-                if nic.item_type_id == 'vlan':
-                    # split the device_name to get the real tagged interface
-                    dev_name = nic.device_name.split('.')[0]
-                    # the nic variable is re-assigned to get the real tagged
-                    # interface
-                    nic = self._get_interface_by_name(node, dev_name)
-
-                # here we test whether 'nic' is a bond, bridge  or eth (nic
-                # could have been reassigned above in the 'vlan' condition)
-                if nic.item_type_id == 'bond':
-                    return self._get_bond_macaddress(node, nic)
-                elif nic.item_type_id == 'bridge':
-                    return self._get_bridge_macaddress(node, nic)
-                elif nic.item_type_id == 'eth':
-                    return nic.macaddress
-
-    def _get_interfaces_by_type(self, node, type_name):
-        """ Returns a list of interfaces by type_name.
-        """
-        return [item for item in node.query(type_name)
-                if not item.is_removed() and not item.is_for_removal()]
-
-    def _get_interface_by_name(self, node, name):
-        """ Gets the interface object by name looking at all network
-        interfaces.
-        """
-        interfaces = [i for i in node.network_interfaces
-                      if i.device_name == name]
-        return interfaces[0] if interfaces else None
-
-    def _get_bond_eth_slaves(self, node, bond_interface):
-        """ Returns a list of interfaces which are eth slaves for a given bond.
-        The list is ordered by device_name ascending.
-        """
-        if bond_interface.item_type_id != 'bond':
-            raise BootManagerException("The interface %s must be a bond type "
-                                       "to get its slaves." % bond_interface)
-        interfaces = self._get_interfaces_by_type(node, 'eth')
-        name = bond_interface.device_name
-        slaves = [e for e in interfaces if hasattr(e, 'master') and
-                  e.master == name]
-        slaves.sort(lambda a, b: cmp(a.device_name, b.device_name))
-        _log.trace.debug("Found slaves: %s" % slaves)
-        return slaves
-
-    def _get_bond_macaddress(self, node, bond_interface):
-        """ Gets the performing bond's MAC address. We assume that a bond
-        interface has no MAC address associated so we get a single MAC address
-        from the first item of the collection of the eth interfaces slaves.
-        """
-        slaves = self._get_bond_eth_slaves(node, bond_interface)
-        return slaves[0].macaddress if slaves else None
-
-    def _get_bridge_macaddress(self, node, bridge_interface):
-        """ Gets the performing bridge's MAC address. We assume that a bridge
-        interface has no MAC address associated so we get a single MAC address
-        from the first item of the collection of the underlying interfaces.
-        """
-        _log.trace.debug("get_bridge MAC %s " % bridge_interface.device_name)
-
-        br_ifaces = [nic for nic in node.network_interfaces if \
-                     nic.item_type_id in \
-                     ['eth', 'vlan', 'bond'] and \
-                     hasattr(nic, 'bridge') and \
-                     nic.bridge == bridge_interface.device_name]
-        if not br_ifaces:
-            return None
-        br_iface = br_ifaces[0]
-        if br_iface.item_type_id == 'eth':
-            return br_iface.macaddress
-        if br_iface.item_type_id == 'bond':
-            return self._get_bond_macaddress(node, br_iface)
-        if br_iface.item_type_id == 'vlan':
-            dev_name = br_iface.device_name.split('.')[0]
-            iface = self._get_interface_by_name(node, dev_name)
-            if iface.item_type_id == 'eth':
-                return iface.macaddress
-            if iface.item_type_id == 'bond':
-                return self._get_bond_macaddress(node, iface)
-
     def _get_bridge(self, providers, system):
         for provider in providers:
             for sys in provider.systems:
@@ -1912,8 +1942,7 @@ fi""" % (disk.item_id, disk.uuid)
         return services[0]
 
     def _get_providers(self, plugin_api_context):
-        ms = plugin_api_context.query("ms")[0]
-        return [ms.libvirt] if ms.libvirt else []
+        return PlanningContext.of(self, plugin_api_context).providers
 
     def _nodes_in_the_deployment(self, plugin_api_context):
         return plugin_api_context.query("node", is_for_removal=False)
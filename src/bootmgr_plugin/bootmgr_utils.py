@@ -47,3 +47,57 @@ class BootMgrUtils(object):
                 if disk.name and (disk.name == pd.device_name):
                     disks.append(BootMgrUtils.get_disk_uuid(disk))
         return disks
+
+
+class DiskUuidIndex(object):
+    """
+    Index of disk UUIDs across all the node systems in the model, built
+    once per plan or callback so that shared-disk checks are dictionary
+    lookups rather than list scans.
+    """
+
+    def __init__(self):
+        self._counts = {}
+        self._fencing = {}
+
+    @classmethod
+    def from_nodes(cls, nodes):
+        index = cls()
+        for node in nodes:
+            for disk in node.system.disks:
+                index.add(disk.uuid)
+        return index
+
+    def add(self, uuid):
+        self._counts[uuid] = self._counts.get(uuid, 0) + 1
+
+    def count(self, uuid):
+        return self._counts.get(uuid, 0)
+
+    def is_shared(self, uuid):
+        return self.count(uuid) > 1
+
+    def is_unique(self, uuid):
+        return self.count(uuid) == 1
+
+    def fencing_uuids(self, clusters):
+        """
+        Returns the UUIDs of the fencing disks of every vcs-cluster in
+        ``clusters``, reading each cluster's fencing disks only once.
+        """
+        uuids = []
+        for cluster in clusters:
+            if cluster.item_type.item_type_id != 'vcs-cluster':
+                continue
+            key = cluster.get_vpath()
+            if key not in self._fencing:
+                self._fencing[key] = [fen_disk.uuid for fen_disk
+                                      in cluster.fencing_disks]
+            uuids.extend(self._fencing[key])
+        return uuids
+
+    def __len__(self):
+        return len(self._counts)
+
+    def __repr__(self):
+        return '<DiskUuidIndex: %d uuids>' % len(self._counts)
@@ -0,0 +1,124 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2026
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+import os
+import socket
+import threading
+import xmlrpclib
+
+from litp.core.litp_logging import LitpLogger
+
+log = LitpLogger()
+
+COBBLER_API_URL = 'http://127.0.0.1/cobbler_api'
+COBBLER_SHARED_SECRET = '/var/lib/cobbler/web.ss'
+# these should be the same as in the cobbler mco agent
+SYSTEM_KEYS = ('profile', 'hostname', 'kickstart', 'power_type',
+               'virt_cpus', 'virt_file_size', 'virt_path', 'virt_ram',
+               'virt_type')
+INTERFACE_KEYS = {'mac_address': 'macaddress',
+                  'ip_address': 'ipaddress',
+                  'dns_name': 'dnsname',
+                  'virt_bridge': 'virtbridge'}
+# words in the faultString of the faults Cobbler raises for a bad token
+AUTH_FAULT_WORDS = ('token', 'login', 'auth')
+
+
+class LocalCobblerError(Exception):
+    pass
+
+
+class LocalCobblerClient(object):
+    """
+    Registers systems straight through the XML-RPC API of the Cobbler
+    running on the MS, the same way the "register_system(s)" actions of
+    the cobbler mco agent do, without a round trip through MCollective.
+
+    It logs in with the shared secret of the Cobbler web UI and keeps the
+    connection and token for the following registrations, logging in
+    again only when Cobbler no longer accepts the token. It is only
+    available when the shared secret can be read, otherwise the caller
+    falls back to the mco agent.
+    """
+
+    def __init__(self, server_factory=None, secret_file=COBBLER_SHARED_SECRET):
+        self._server_factory = server_factory or \
+            (lambda: xmlrpclib.Server(COBBLER_API_URL))
+        self._secret_file = secret_file
+        self._server = None
+        self._token = None
+        self._lock = threading.Lock()
+
+    def available(self):
+        return os.access(self._secret_file, os.R_OK)
+
+    def _login(self):
+        with open(self._secret_file, 'r') as f:
+            secret = f.read().strip()
+        if self._server is None:
+            self._server = self._server_factory()
+        self._token = self._server.login('', secret)
+        log.trace.debug('Logged in to the local Cobbler API')
+
+    @staticmethod
+    def _is_auth_fault(fault):
+        message = (fault.faultString or '').lower()
+        return any(word in message for word in AUTH_FAULT_WORDS)
+
+    def _reset(self):
+        self._server = None
+        self._token = None
+
+    def _replace_system(self, spec):
+        server, token = self._server, self._token
+        name = spec['system']
+        if server.find_system({'name': name}):
+            server.remove_system(name, token)
+        handle = server.new_system(token)
+        server.modify_system(handle, 'name', name, token)
+        for key in SYSTEM_KEYS:
+            if key in spec:
+                server.modify_system(handle, key, spec[key], token)
+        for iface, settings in sorted((spec.get('interfaces') or
+                                       {}).items()):
+            iface_data = dict([('%s-%s' % (INTERFACE_KEYS.get(key, key),
+                                           iface), value)
+                               for key, value in settings.items()])
+            server.modify_system(handle, 'modify_interface', iface_data,
+                                 token)
+        server.save_system(handle, token)
+
+    def register_systems(self, specs):
+        """
+        Replaces each system with its spec, as sent to the "register_systems"
+        mco action, in one session. Logs in again once if Cobbler rejects
+        the token. Raises LocalCobblerError if Cobbler cannot be reached or
+        refuses a system; replacing is idempotent so the caller can then
+        retry the whole list another way.
+        """
+        with self._lock:
+            try:
+                if self._token is None:
+                    self._login()
+                try:
+                    for spec in specs:
+                        self._replace_system(spec)
+                except xmlrpclib.Fault as fault:
+                    if not self._is_auth_fault(fault):
+                        raise
+                    # the token has expired, try once more with a fresh one
+                    self._login()
+                    for spec in specs:
+                        self._replace_system(spec)
+            except (xmlrpclib.Error, socket.error, IOError) as ex:
+                self._reset()
+                raise LocalCobblerError(
+                    'Failed to register system(s) %s with the local Cobbler '
+                    'API: %s' % (', '.join(spec['system'] for spec in specs),
+                                 ex))
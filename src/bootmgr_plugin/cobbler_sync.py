@@ -0,0 +1,66 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2026
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+import threading
+
+
+class CobblerSyncCoalescer(object):
+    """
+    Collapses concurrent cobbler sync requests. A caller that asks for a
+    sync while one is already running waits for it to finish and then
+    either returns, if a later sync already covered its request, or runs
+    one sync on behalf of every request that arrived in the meantime.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._requested = 0
+        self._completed = 0
+        self._running = False
+        self._pending_systems = set()
+        self._pending_full_sync = False
+
+    def sync(self, do_sync, system_names, full_sync=True):
+        """
+        Makes sure a sync of ``system_names`` starts after this call and
+        has completed before it returns. ``do_sync`` is called with the
+        names of all the systems the sync covers and whether any of the
+        collapsed requests asked for a full sync.
+        """
+        with self._cond:
+            self._requested += 1
+            ticket = self._requested
+            self._pending_systems.update(system_names)
+            self._pending_full_sync = self._pending_full_sync or full_sync
+            while self._running:
+                self._cond.wait()
+            if self._completed >= ticket:
+                return
+            self._running = True
+            covered = self._requested
+            systems = sorted(self._pending_systems)
+            full = self._pending_full_sync
+            self._pending_systems = set()
+            self._pending_full_sync = False
+
+        synced = False
+        try:
+            do_sync(systems, full)
+            synced = True
+        finally:
+            with self._cond:
+                self._running = False
+                if synced:
+                    self._completed = covered
+                else:
+                    # let a waiting caller retry the systems of this sync
+                    self._pending_systems.update(systems)
+                    self._pending_full_sync = \
+                        self._pending_full_sync or full
+                self._cond.notify_all()
@@ -0,0 +1,75 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2026
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from litp.core.litp_logging import LitpLogger
+
+log = LitpLogger()
+
+# this should be the same as in the install_pre_pxe cobbler trigger, which
+# with the install_post_timing one stamps the start and end of the "install"
+# phase
+INSTALL_TIMINGS_FILE = '/var/lib/cobbler/litp_install_timings.jsonl'
+
+
+class InstallTimings(object):
+    """
+    Append-only JSON-lines log of the phases a node goes through while it
+    is installed. Every line is an object with the "time" (epoch seconds),
+    "node", "phase" and "event" ("start" or "end") of a phase. The "end"
+    of a phase timed by the plugin also has its "seconds" and "status".
+    The phases recorded by the plugin are "register", "cobbler_sync",
+    "pxe_wait", "first_ping" and "deregister". The Cobbler triggers add
+    the "install" phase, from the kickstart %pre to its %post.
+    """
+
+    def __init__(self, path=INSTALL_TIMINGS_FILE):
+        self._path = path
+
+    def record(self, node, phase, event, **fields):
+        record = {'time': round(time.time(), 3), 'node': node,
+                  'phase': phase, 'event': event}
+        record.update(fields)
+        line = json.dumps(record, sort_keys=True) + '\n'
+        # a single append of a short line is not interleaved with the lines
+        # of the other callbacks or of the Cobbler triggers
+        try:
+            fd = os.open(self._path,
+                         os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+        except (IOError, OSError) as err:
+            # the timings are only diagnostics, they never fail a plan
+            log.trace.debug('Cannot record install timing of node %s: %s',
+                            node, err)
+
+    @contextmanager
+    def phase(self, nodes, phase):
+        """
+        Records the start and end of ``phase`` for each of ``nodes`` around
+        the body of the with statement.
+        """
+        start = time.time()
+        for node in nodes:
+            self.record(node, phase, 'start')
+        status = 'failed'
+        try:
+            yield
+            status = 'success'
+        finally:
+            seconds = round(time.time() - start, 3)
+            for node in nodes:
+                self.record(node, phase, 'end', seconds=seconds,
+                            status=status)
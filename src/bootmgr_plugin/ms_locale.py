@@ -0,0 +1,176 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2026
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+import os
+
+from litp.core.litp_logging import LitpLogger
+
+log = LitpLogger()
+
+TIMEDATECTL_OUT = '/opt/ericsson/nms/litp/share/kickstart/timedatectl.out'
+LOCALECTL_OUT = '/opt/ericsson/nms/litp/share/kickstart/localectl.out'
+DEFAULT_TIMEZONE = 'Europe/Dublin'
+DEFAULT_KEYBOARD = 'uk'
+# the kickstart keyboard options for the MNs. See here
+# https://access.redhat.com/documentation/en-US/Red_Hat_Enterprise_Linux/6/
+# html/Installation_Guide/s1-kickstart2-options.html
+KEYMAPS = set(['be-latin1',
+               'bg_bds-utf8',
+               'bg_pho-utf8',
+               'br-abnt2',
+               'cf',
+               'croat',
+               'cz-us-qwertz',
+               'cz-lat2',
+               'de',
+               'de-latin1',
+               'de-latin1-nodeadkeys',
+               'dvorak',
+               'dk',
+               'dk-latin1',
+               'es',
+               'et',
+               'fi',
+               'fi-latin1',
+               'fr',
+               'fr-latin9',
+               'fr-latin1',
+               'fr-pc',
+               'fr_CH',
+               'fr_CH-latin1',
+               'gr',
+               'hu',
+               'hu101',
+               'is-latin1',
+               'it',
+               'it-ibm',
+               'it2',
+               'jp106',
+               'ko',
+               'la-latin1',
+               'mk-utf',
+               'nl',
+               'no',
+               'pl2',
+               'pt-latin1',
+               'ro',
+               'ru',
+               'sr-cy',
+               'sr-latin',
+               'sv-latin1',
+               'sg',
+               'sg-latin1',
+               'sk-qwerty',
+               'slovene',
+               'trq',
+               'uk',
+               'ua-utf',
+               'us-acentos',
+               'us'])
+
+
+def read_timezone(path=TIMEDATECTL_OUT):
+    """
+    @summary: Grabs the timezone from the timedatectl output on the MS
+    """
+    timezone = None
+    try:
+        with open(path, 'r') as f:
+            output = f.readlines()
+        for line in output:
+            if "Time zone:" in line:
+                timezone = line.split(":", 1)[-1]
+                timezone = timezone.strip(" ")
+                timezone = timezone.split(" ", 1)[0]
+                break
+        if not timezone:
+            raise IndexError("No timezone found in timedatectl output")
+        return '--utc {0}'.format(timezone)
+    except (IOError, IndexError) as err:
+        log.event.error("%s. Using default timezone", err)
+        return '--utc {0}'.format(DEFAULT_TIMEZONE)
+
+
+def read_keyboard(path=LOCALECTL_OUT):
+    """
+    @summary: Picks up the keyboard layout from the localectl output on
+    the MS
+    """
+    kb_layout = None
+    try:
+        with open(path, 'r') as f:
+            output = f.readlines()
+        for line in output:
+            if "VC Keymap:" in line:
+                kb_layout = line.split(":", 1)[-1]
+                kb_layout = kb_layout.strip(" ")
+                kb_layout = kb_layout.strip("\n")
+                break
+        if kb_layout not in KEYMAPS:
+            log.trace.error(
+                "Keyboard layout %s is not supported by "
+                "kickstart. Using default %s instead",
+                kb_layout, DEFAULT_KEYBOARD
+            )
+            return DEFAULT_KEYBOARD
+        return kb_layout
+    except (IndexError, IOError) as err:
+        log.trace.error("%s. Using default %s instead", err,
+                        DEFAULT_KEYBOARD)
+        return DEFAULT_KEYBOARD
+
+
+class _ParsedFile(object):
+    """
+    The result of parsing a file, kept until the mtime or size of the file
+    changes. A missing file is parsed once, and again once it appears.
+    """
+
+    _UNREAD = object()
+
+    def __init__(self, path, parse):
+        self.path = path
+        self._parse = parse
+        self._stamp = self._UNREAD
+        self._value = None
+
+    def _current_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime, stat.st_size)
+
+    def get(self):
+        stamp = self._current_stamp()
+        if stamp != self._stamp:
+            self._value = self._parse(self.path)
+            self._stamp = stamp
+        return self._value
+
+
+class MsLocaleCache(object):
+    """
+    The timezone and keyboard layout the MS passes on to the kickstarts of
+    the nodes, parsed from the timedatectl and localectl outputs saved on
+    the MS. Each file is parsed once and again only after it changes, so
+    the kickstarts of a plan share one result, and one error log when the
+    file is missing or not understood.
+    """
+
+    def __init__(self, timedatectl_out=TIMEDATECTL_OUT,
+                 localectl_out=LOCALECTL_OUT):
+        self._timezone = _ParsedFile(timedatectl_out, read_timezone)
+        self._keyboard = _ParsedFile(localectl_out, read_keyboard)
+
+    def timezone(self):
+        return self._timezone.get()
+
+    def keyboard(self):
+        return self._keyboard.get()
@@ -0,0 +1,139 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2026
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+
+class NicTopology(object):
+    """
+    The network interfaces of a node, indexed once by device name and
+    network name along with the eth -> bond -> vlan -> bridge edges between
+    them. Resolves the physical NIC and MAC address used to PXE boot over a
+    network without rescanning the node's interfaces.
+    """
+
+    def __init__(self, node):
+        self.hostname = node.hostname
+        self.pxe_boot_only_nic = None
+        self._by_name = {}
+        self._by_network = {}
+        # bridge device name -> first eth, vlan or bond enslaved to it
+        self._bridged = {}
+        # bond device name -> eth slaves ordered by device name
+        self._slaves = {}
+
+        for nic in node.network_interfaces:
+            self._by_name.setdefault(nic.device_name, nic)
+            network_name = getattr(nic, 'network_name', None)
+            if network_name:
+                self._by_network.setdefault(network_name, nic)
+            bridge = getattr(nic, 'bridge', None)
+            if bridge and nic.item_type_id in ('eth', 'vlan', 'bond'):
+                self._bridged.setdefault(bridge, nic)
+            if self.pxe_boot_only_nic is None and \
+                    getattr(nic, 'pxe_boot_only', None) == 'true':
+                self.pxe_boot_only_nic = nic.device_name
+
+        for eth in node.query('eth'):
+            if eth.is_removed() or eth.is_for_removal():
+                continue
+            master = getattr(eth, 'master', None)
+            if master:
+                self._slaves.setdefault(master, []).append(eth)
+        for slaves in self._slaves.itervalues():
+            slaves.sort(key=lambda eth: eth.device_name)
+
+    def interface(self, device_name):
+        return self._by_name.get(device_name)
+
+    def bond_slaves(self, bond_name):
+        return self._slaves.get(bond_name, [])
+
+    def _tagged(self, vlan):
+        # the vlan device name is <tagged interface>.<vlan id>
+        return self.interface(vlan.device_name.split('.')[0])
+
+    def _eth(self, nic):
+        if nic is None:
+            return None
+        if nic.item_type_id == 'eth':
+            return nic
+        if nic.item_type_id == 'bond':
+            return self.bond_slaves(nic.device_name)[0]
+        return None
+
+    def bridged_nic(self, bridge_name):
+        """
+        Returns the eth carrying the traffic of the given bridge.
+        """
+        nic = self._bridged.get(bridge_name)
+        if nic is not None and nic.item_type_id == 'vlan':
+            nic = self._tagged(nic)
+        return self._eth(nic)
+
+    def nic_name_for_network(self, network_name):
+        """
+        Returns the name of the eth on the given network, looking through
+        any bridge, vlan or bond on top of it.
+        """
+        nic = self._by_network.get(network_name)
+        if nic is None:
+            return None
+        if nic.item_type_id == 'bridge':
+            return self.bridged_nic(nic.device_name).device_name
+        if nic.item_type_id == 'vlan':
+            nic = self._tagged(nic)
+            if nic.item_type_id == 'bond':
+                return self._eth(nic).device_name
+            return nic.device_name
+        if nic.item_type_id == 'bond':
+            return self._eth(nic).device_name
+        return nic.device_name
+
+    def ip_address(self, network_name):
+        nic = self._by_network.get(network_name)
+        return nic.ipaddress if nic is not None else None
+
+    def _bond_mac(self, bond):
+        slaves = self.bond_slaves(bond.device_name)
+        return slaves[0].macaddress if slaves else None
+
+    def mac(self, device_name):
+        """
+        Returns the MAC address of the given interface. Bonds and bridges
+        have none of their own, the one of their first eth is used.
+        """
+        nic = self.interface(device_name)
+        if nic is not None and nic.item_type_id == 'vlan':
+            nic = self._tagged(nic)
+        if nic is None:
+            return None
+        if nic.item_type_id == 'bridge':
+            nic = self._bridged.get(nic.device_name)
+            if nic is not None and nic.item_type_id == 'vlan':
+                nic = self._tagged(nic)
+            if nic is None:
+                return None
+        if nic.item_type_id == 'bond':
+            return self._bond_mac(nic)
+        if nic.item_type_id == 'eth':
+            return nic.macaddress
+        return None
+
+    def pxe_nic(self, network_name):
+        """
+        Returns the device name and MAC address a node PXE boots with on
+        the given network.
+        """
+        device_name = self.pxe_boot_only_nic or \
+            self.nic_name_for_network(network_name)
+        return device_name, self.mac(device_name)
+
+    def __repr__(self):
+        return "NicTopology(%s, %d interfaces)" % (self.hostname,
+                                                   len(self._by_name))
@@ -0,0 +1,94 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2026
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+import random
+import threading
+import time
+
+
+class ProbeBackoff(object):
+    """
+    Delays between the probes of a node that is installing. Nothing is
+    probed during the minimum install time, after which the delay starts at
+    ``min_interval`` and doubles up to ``max_interval``. Each delay is
+    spread by +/- ``jitter`` so that nodes installed together do not all
+    probe at the same time.
+    """
+
+    def __init__(self, min_install_time, min_interval, max_interval,
+                 factor=2, jitter=0.1):
+        self.min_install_time = max(0, min_install_time)
+        self.min_interval = max(1, min_interval)
+        self.max_interval = max(self.min_interval, max_interval)
+        self.factor = factor
+        self.jitter = jitter
+
+    def __iter__(self):
+        yield self.min_install_time
+        interval = self.min_interval
+        while True:
+            yield self._spread(interval)
+            interval = min(interval * self.factor, self.max_interval)
+
+    def _spread(self, interval):
+        if not self.jitter:
+            return interval
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def __repr__(self):
+        return "ProbeBackoff(%s, %s, %s)" % (self.min_install_time,
+                                             self.min_interval,
+                                             self.max_interval)
+
+
+class NodeLivenessMonitor(object):
+    """
+    Liveness table shared by all the nodes waiting to come up after PXE
+    boot. Rather than each waiting node pinging itself, a single ping of
+    every node still installing is sent at most once per interval and the
+    per-node result is shared. ``ping`` takes a list of hostnames and
+    returns the ones that answered.
+    """
+
+    def __init__(self, ping, interval):
+        self._ping = ping
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._alive = set()
+        self._last_ping = None
+
+    def register(self, hostname):
+        with self._lock:
+            self._pending[hostname] = self._pending.get(hostname, 0) + 1
+
+    def unregister(self, hostname):
+        with self._lock:
+            self._pending[hostname] -= 1
+            if not self._pending[hostname]:
+                del self._pending[hostname]
+                self._alive.discard(hostname)
+            if not self._pending:
+                self._last_ping = None
+
+    def is_alive(self, hostname):
+        with self._lock:
+            if hostname not in self._alive and \
+                    (self._last_ping is None or
+                     time.time() - self._last_ping >= self._interval):
+                self._ping_pending()
+            return hostname in self._alive
+
+    def _ping_pending(self):
+        self._last_ping = time.time()
+        hostnames = sorted(name for name in self._pending
+                           if name not in self._alive)
+        if hostnames:
+            self._alive.update(name for name in self._ping(hostnames)
+                               if name in self._pending)
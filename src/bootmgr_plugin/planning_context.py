@@ -0,0 +1,93 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2026
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+from bootmgr_extension.bootmgr_extension import BootManagerExtension
+from .nic_topology import NicTopology
+
+
+class PlanningContext(object):
+    """
+    Model lookups shared by the task generators of a single
+    create_configuration call. Each lookup is resolved the first time it
+    is needed and reused afterwards; any other query goes straight to the
+    plugin API context.
+    """
+
+    def __init__(self, plugin, plugin_api_context):
+        self._plugin = plugin
+        self._api = plugin_api_context
+        self._cache = {}
+
+    @classmethod
+    def of(cls, plugin, plugin_api_context):
+        """
+        Returns ``plugin_api_context`` if it already is a planning context,
+        otherwise a new one wrapping it.
+        """
+        if isinstance(plugin_api_context, cls):
+            return plugin_api_context
+        return cls(plugin, plugin_api_context)
+
+    def query(self, *args, **kwargs):
+        return self._api.query(*args, **kwargs)
+
+    def _memoize(self, key, lookup):
+        if key not in self._cache:
+            self._cache[key] = lookup()
+        return self._cache[key]
+
+    @property
+    def ms(self):
+        # the ms item is mandatory in the model, the [0] should be safe
+        return self._memoize('ms', lambda: self._api.query("ms")[0])
+
+    @property
+    def service(self):
+        return self._memoize(
+            'service',
+            lambda: BootManagerExtension._get_cobbler_service(self._api))
+
+    @property
+    def boot_network(self):
+        return self._memoize(
+            'boot_network',
+            lambda: self._plugin._get_boot_network(self._api))
+
+    @property
+    def providers(self):
+        return self._memoize(
+            'providers',
+            lambda: [self.ms.libvirt] if self.ms.libvirt else [])
+
+    @property
+    def os_profiles(self):
+        return self._memoize('os_profiles',
+                             lambda: self._api.query("os-profile"))
+
+    @property
+    def new_nodes(self):
+        return self._memoize(
+            'new_nodes',
+            lambda: self._plugin._get_new_node_systems(self._api))
+
+    @property
+    def all_nodes(self):
+        return self._memoize(
+            'all_nodes',
+            lambda: self._plugin._get_all_node_systems(self._api))
+
+    @property
+    def new_ms_network_status(self):
+        return self._memoize(
+            'new_ms_network_status',
+            lambda: self._plugin._new_ms_network_status(self._api, self.ms))
+
+    def nic_topology(self, node):
+        return self._memoize(('nic_topology', node.get_vpath()),
+                             lambda: NicTopology(node))
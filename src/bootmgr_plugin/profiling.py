@@ -0,0 +1,176 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2026
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+import ConfigParser
+import cProfile
+import functools
+import itertools
+import json
+import os
+import pstats
+import time
+
+from litp.core.litp_logging import LitpLogger
+
+log = LitpLogger()
+
+PLUGIN_CONF = '/opt/ericsson/nms/litp/etc/plugins/bootmgr_plugin.conf'
+PROFILE_DIR = '/var/log/litp/bootmgr_profiles'
+# override the [profiling] section of the plugin conf file
+PROFILE_ENV = 'LITP_BOOTMGR_PROFILE'
+PROFILE_DIR_ENV = 'LITP_BOOTMGR_PROFILE_DIR'
+# "cprofile" also dumps the cProfile stats of each invocation, "wallclock"
+# only its time and model queries
+PROFILE_MODES = ('cprofile', 'wallclock')
+PROFILE_STATS_LINES = 50
+
+
+class ProfilingSettings(object):
+    """
+    Whether and how the plugin entry points are profiled. Read from the
+    [profiling] section of the plugin conf file, "mode" and "directory",
+    which the LITP_BOOTMGR_PROFILE and LITP_BOOTMGR_PROFILE_DIR environment
+    variables override. Profiling is off unless the mode is one of
+    PROFILE_MODES.
+    """
+
+    def __init__(self, mode=None, directory=PROFILE_DIR):
+        self.mode = mode if mode in PROFILE_MODES else None
+        self.directory = directory
+
+    @property
+    def enabled(self):
+        return self.mode is not None
+
+    @classmethod
+    def load(cls, conf_file=PLUGIN_CONF, environ=None):
+        environ = os.environ if environ is None else environ
+        mode = None
+        directory = PROFILE_DIR
+        parser = ConfigParser.RawConfigParser()
+        try:
+            parser.read(conf_file)
+            if parser.has_option('profiling', 'mode'):
+                mode = parser.get('profiling', 'mode')
+            if parser.has_option('profiling', 'directory'):
+                directory = parser.get('profiling', 'directory')
+        except ConfigParser.Error as ex:
+            log.trace.warning('Cannot read the profiling settings from '
+                              '%s: %s', conf_file, ex)
+        mode = environ.get(PROFILE_ENV, mode)
+        directory = environ.get(PROFILE_DIR_ENV, directory)
+        if mode:
+            mode = mode.strip().lower()
+            if mode not in PROFILE_MODES + ('off',):
+                log.trace.warning('Unknown profiling mode "%s", profiling '
+                                  'is off', mode)
+        return cls(mode, directory)
+
+    def __repr__(self):
+        return "ProfilingSettings(%s, %s)" % (self.mode, self.directory)
+
+
+class QueryCountingApi(object):
+    """
+    Passes everything through to the plugin or callback API context it
+    wraps, counting the model queries made per item type.
+    """
+
+    def __init__(self, api):
+        self._api = api
+        self.queries = {}
+
+    def query(self, item_type_id, **properties):
+        self.queries[item_type_id] = self.queries.get(item_type_id, 0) + 1
+        return self._api.query(item_type_id, **properties)
+
+    def __getattr__(self, name):
+        return getattr(self._api, name)
+
+
+class Profiler(object):
+    """
+    Profiles the invocations of the plugin entry points decorated with
+    ``profiled``, dumping for each one a JSON record of its wall-clock
+    time, status and model queries to the profiling directory and, in
+    "cprofile" mode, its cProfile stats both raw (.prof) and as text.
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._sequence = itertools.count(1)
+
+    @property
+    def enabled(self):
+        return self.settings.enabled
+
+    def run(self, entry_point, method, plugin, api, args, kwargs):
+        counting_api = QueryCountingApi(api)
+        profile = cProfile.Profile() \
+            if self.settings.mode == 'cprofile' else None
+        started = time.time()
+        status = 'failed'
+        try:
+            if profile is not None:
+                result = profile.runcall(method, plugin, counting_api,
+                                         *args, **kwargs)
+            else:
+                result = method(plugin, counting_api, *args, **kwargs)
+            status = 'success'
+            return result
+        finally:
+            self._dump(entry_point, started, time.time() - started, status,
+                       counting_api.queries, profile)
+
+    def _dump(self, entry_point, started, seconds, status, queries, profile):
+        name = '%s-%s-%d-%d' % (
+            time.strftime('%Y%m%d%H%M%S', time.localtime(started)),
+            entry_point, os.getpid(), next(self._sequence))
+        base = os.path.join(self.settings.directory, name)
+        record = {'entry_point': entry_point,
+                  'started': round(started, 3),
+                  'seconds': round(seconds, 3),
+                  'status': status,
+                  'queries': sum(queries.itervalues()),
+                  'queries_by_type': queries}
+        try:
+            if not os.path.isdir(self.settings.directory):
+                os.makedirs(self.settings.directory)
+            with open(base + '.json', 'w') as f:
+                json.dump(record, f, indent=2, sort_keys=True,
+                          separators=(',', ': '))
+            if profile is not None:
+                profile.dump_stats(base + '.prof')
+                with open(base + '.txt', 'w') as f:
+                    stats = pstats.Stats(profile, stream=f)
+                    stats.sort_stats('cumulative').print_stats(
+                        PROFILE_STATS_LINES)
+        except (IOError, OSError) as ex:
+            log.trace.debug('Cannot dump the profile of %s to %s: %s',
+                            entry_point, self.settings.directory, ex)
+            return
+        log.trace.info('Profile of %s dumped to %s.json', entry_point, base)
+
+
+def profiled(entry_point):
+    """
+    Decorates a plugin method taking the plugin or callback API context as
+    its first argument, so that it is profiled when the plugin's profiler
+    is enabled.
+    """
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(plugin, api, *args, **kwargs):
+            profiler = getattr(plugin, '_profiler', None)
+            if profiler is None or not profiler.enabled:
+                return method(plugin, api, *args, **kwargs)
+            return profiler.run(entry_point, method, plugin, api, args,
+                                kwargs)
+        return wrapper
+    return decorate
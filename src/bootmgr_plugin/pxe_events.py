@@ -0,0 +1,154 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2026
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+import os
+import socket
+import threading
+import time
+import xmlrpclib
+
+from litp.core.litp_logging import LitpLogger
+
+log = LitpLogger()
+
+# this should be the same as in the install_pre_pxe cobbler trigger
+PXE_EVENTS_FILE = '/var/lib/cobbler/litp_pxe_events'
+PXE_BOOTED_COMMENT = 'PXE_BOOTED'
+# a node joining the wait within this many seconds of the last poll of the
+# PXE status table waits for the next one
+REGISTER_POLL_GRACE = 5
+
+
+class PxeEventLog(object):
+    """
+    Reader for the append-only file the install_pre_pxe Cobbler trigger
+    writes a "<epoch> <system name>" line to whenever a system PXE boots.
+    Only events appended after the reader was created are reported.
+    """
+
+    def __init__(self, path=PXE_EVENTS_FILE):
+        self._path = path
+        self._offset = self._size()
+        self._booted = set()
+
+    def _size(self):
+        try:
+            return os.path.getsize(self._path)
+        except OSError:
+            return 0
+
+    def read(self):
+        """
+        Reads any new complete lines from the event file and returns the
+        names of all the systems that have PXE booted so far.
+        """
+        size = self._size()
+        if size < self._offset:
+            # the file has been truncated or rotated underneath us
+            self._offset = 0
+        if size > self._offset:
+            try:
+                with open(self._path, 'r') as f:
+                    f.seek(self._offset)
+                    data = f.read(size - self._offset)
+            except IOError as err:
+                log.trace.debug('Cannot read PXE events: %s', err)
+                return self._booted
+            # a partially written line is picked up on the next read
+            end = data.rfind('\n') + 1
+            self._offset += end
+            for line in data[:end].splitlines():
+                fields = line.split()
+                if len(fields) >= 2:
+                    self._booted.add(fields[1])
+        return self._booted
+
+    def has_booted(self, system_name):
+        return system_name in self.read()
+
+    @staticmethod
+    def truncate(path=PXE_EVENTS_FILE):
+        """
+        Empties the event file, which the trigger only ever appends to.
+        Done once per plan before any node waits on it; a reader still
+        open on the file starts again from its beginning.
+        """
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_TRUNC)
+        except OSError as err:
+            log.trace.debug('Cannot truncate PXE events: %s', err)
+            return
+        os.close(fd)
+
+
+class PxeStatusPoller(object):
+    """
+    Cobbler PXE status table shared by all the nodes waiting to PXE boot.
+    A cobbler pre-install trigger running on MS sets the PXE_BOOTED comment
+    on a system as soon as its installation is going to start and
+    definitely after PXE boot has finished. Rather than each waiting node
+    asking Cobbler about itself, a single find_system call per interval
+    fetches every system with that comment and the result is shared.
+    https://confluence-oss.seli.wh.rnd.internal.ericsson.com/display/ELITP/
+    Spike+on+PXE+boot
+    """
+
+    def __init__(self, client_factory, interval):
+        self._client_factory = client_factory
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._client = None
+        self._pending = {}
+        self._booted = set()
+        self._last_poll = None
+
+    def register(self, system_name):
+        with self._lock:
+            self._pending[system_name] = \
+                self._pending.get(system_name, 0) + 1
+            # a node joining the wait may have booted already, but nodes
+            # joining together share one poll
+            if self._last_poll is not None and \
+                    time.time() - self._last_poll >= REGISTER_POLL_GRACE:
+                self._last_poll = None
+
+    def unregister(self, system_name):
+        with self._lock:
+            self._pending[system_name] -= 1
+            if not self._pending[system_name]:
+                del self._pending[system_name]
+            if not self._pending:
+                # nothing is waiting any more, start afresh for the next plan
+                self._client = None
+                self._booted = set()
+                self._last_poll = None
+
+    def has_booted(self, system_name):
+        with self._lock:
+            if system_name not in self._booted and \
+                    (self._last_poll is None or
+                     time.time() - self._last_poll >= self._interval):
+                self._poll()
+            return system_name in self._booted
+
+    def _poll(self):
+        self._last_poll = time.time()
+        if self._client is None:
+            self._client = self._client_factory()
+        try:
+            booted = self._client.find_system(
+                {'comment': PXE_BOOTED_COMMENT})
+        except (xmlrpclib.ProtocolError, socket.error) as err:
+            # e.g. cobblerd restarting, retried on the next interval with
+            # a new connection
+            log.trace.debug('PxeStatusPoller: %s', err)
+            self._client = None
+            return
+        self._booted.update(name for name in booted
+                            if name in self._pending)
@@ -0,0 +1,218 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2026
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+import string
+
+
+class ShellTemplate(object):
+    """
+    A str.format() style template of a partition snippet block, split once
+    when it is defined into its literal text and replacement fields.
+    Rendering only joins the pieces, so the blocks repeated for every disk
+    are not parsed again for each one.
+    """
+
+    _formatter = string.Formatter()
+
+    def __init__(self, template):
+        self.template = template
+        self._pieces = []
+        for literal, field, spec, conversion in \
+                self._formatter.parse(template):
+            if spec or conversion:
+                raise ValueError("Unsupported replacement field in "
+                                 "template: %s" % field)
+            self._pieces.append((literal, field))
+
+    def render(self, **values):
+        parts = []
+        for literal, field in self._pieces:
+            parts.append(literal)
+            if field is not None:
+                parts.append(format(values[field]))
+        return ''.join(parts)
+
+    def __repr__(self):
+        return "ShellTemplate(%r)" % self.template
+
+
+# Indexes /dev/disk/by-id once, rather than globbing it for every disk.
+# by_id maps "<type>/<lower-cased UUID>" to the by-id name of a disk, or
+# for "part/<UUID>" to the comma separated multipath partitions of the disk.
+# by_id_lookup sets by_id_match to the entry of the first of the given
+# types whose UUID is, or ends with, the given one, matching any case as
+# the globs it replaces did, and by_id_type to that type.
+BY_ID_INDEX = """\
+udevadm settle
+declare -A by_id
+for by_id_path in /dev/disk/by-id/*; do
+by_id_name=\\${by_id_path#/dev/disk/by-id/}
+by_id_key=\\${by_id_name,,}
+case "\\$by_id_key" in
+dm-uuid-part*-mpath*)
+by_id["part/\\${by_id_key#dm-uuid-part*-mpath-}"]+=\
+"disk/by-id/\\$by_id_name,";;
+dm-uuid-mpath*)
+by_id["mpath/\\${by_id_key#dm-uuid-mpath-}"]=\\$by_id_name;;
+cciss*)
+by_id["cciss/\\${by_id_key#cciss-}"]=\\$by_id_name;;
+scsi*)
+by_id["scsi/\\${by_id_key#scsi-}"]=\\$by_id_name;;
+esac
+done
+by_id_lookup() {
+local uuid=\\${1,,} type key
+shift
+by_id_match=
+by_id_type=
+for type in "\\$@"; do
+by_id_match=\\${by_id["\\$type/\\$uuid"]}
+if [ -z "\\$by_id_match" ]; then
+for key in "\\${!by_id[@]}"; do
+if [[ "\\$key" == "\\$type/"*"\\$uuid" ]]; then
+by_id_match=\\${by_id["\\$key"]}
+break
+fi
+done
+fi
+if [ -n "\\$by_id_match" ]; then
+by_id_type=\\$type
+return
+fi
+done
+}"""
+
+# Fallback for HP SmartArray (LITPCDS-8098). Assumes that if there is a mix
+# of scsi and cciss block devices, the disks themselves are only pointed to
+# by one of them.
+DISK_LIST_ITEM = ShellTemplate("""\
+by_id_lookup {uuid} mpath cciss scsi
+if [ -n "\\$by_id_match" ]; then
+disk_list["{disk_id}"]=/dev/disk/by-id/\\$by_id_match
+fi""")
+
+UUID_CHECK = ShellTemplate("""
+if [[ ! -b \\${{disk_list["{disk_id}"]}} ]]; then
+echo "ERROR: Could not find disk of UUID '{uuid}'" >> /dev/tty1;
+read;
+exit 1;
+fi""")
+
+# We don't want to set the key's value to /dev/<disk.name> since we want to
+# handle the case where there is no device by that name on the node
+DISK_LIST_ITEM_BY_NAME = ShellTemplate(
+    'disk_list["{disk_id}"]=\\$(shopt -s nocaseglob; ls /dev/{name})')
+
+CLEARPART_DRIVE_DEV = ShellTemplate("""\
+#### clear parts first ####
+by_id_lookup {uuid} part
+parts_to_clear=\\$by_id_match
+by_id_lookup {uuid} mpath cciss scsi
+if [ "\\$by_id_type" == "mpath" ]; then
+drive_dev=disk/by-id/\\$by_id_match
+elif [ -n "\\$by_id_match" ]; then
+drive_dev=\\$(basename \\$(readlink /dev/disk/by-id/\\$by_id_match))
+else
+drive_dev=
+fi""")
+
+CLEARPART_DRIVE_DEV_BY_NAME = ShellTemplate("drive_dev={name}\n")
+
+_WIPE_DISK_LIST = (
+    'if [ "\\${{#parts_to_clear}}" -gt 2 ]; then\n'
+    'IFS=\',\' read -r -a wipedisks <<< '
+    '"$clearpart_devs,$parts_to_clear"\n'
+    'else\n'
+    'IFS=\',\' read -r -a wipedisks <<< '
+    '"$clearpart_devs"\n'
+    'fi\n')
+
+# Each step is run on the whole batch of disks, waiting once for udev to
+# settle after it rather than sleeping after every disk.
+WIPE_DISKS = ShellTemplate(
+    _WIPE_DISK_LIST +
+    'for wipedisk in \\${{wipedisks[@]}}; do\n'
+    'partprobe /dev/"$wipedisk"\n'
+    'wipefs -qfa /dev/"$wipedisk"\n'
+    'done\n'
+    'udevadm settle\n'
+    'for wipedisk in \\${{wipedisks[@]}}; do\n'
+    'partprobe /dev/"$wipedisk"\n'
+    'done\n'
+    'udevadm settle\n'
+    'for wipedisk in \\${{wipedisks[@]}}; do\n'
+    'parted /dev/"$wipedisk" '
+    '--script -- mklabel {part_table_type}\n'
+    'done\n'
+    'udevadm settle\n')
+
+# Wipes and relabels up to {jobs} disks at the same time as background
+# jobs, then waits for all of them and for udev to settle once.
+WIPE_DISKS_PARALLEL = ShellTemplate(
+    _WIPE_DISK_LIST +
+    'wipe_disk() {{\n'
+    'partprobe /dev/"\\$1"\n'
+    'wipefs -qfa /dev/"\\$1"\n'
+    'partprobe /dev/"\\$1"\n'
+    'parted /dev/"\\$1" --script -- mklabel {part_table_type}\n'
+    '}}\n'
+    'for wipedisk in \\${{wipedisks[@]}}; do\n'
+    'while [ \\$(jobs -rp | wc -l) -ge {jobs} ]; do\n'
+    'sleep 0.2\n'
+    'done\n'
+    'wipe_disk "$wipedisk" &\n'
+    'done\n'
+    'wait\n'
+    'udevadm settle\n')
+
+EFI_PARTITION = ShellTemplate(
+    'echo "part /boot/efi --fstype=efi --size={size} '
+    '--ondisk=${{disk_list["{disk_id}"]}}" >> /tmp/partitioninfo')
+
+# TORF-495707: Add a 1MB biosboot partition in the case the underlying
+# physical disk is >= 2TB. See grub2/gpt partitioning in RHEL7.
+# TORF-544812: In all other cases, add a mock 1MB biosboot partition to keep
+# discovery of the correct partition to write on simple.
+BIOSBOOT_PARTITION = ShellTemplate(
+    'dev_path=\\$(realpath "/dev/"\\${{drive_dev}})\n'
+    'dev_name=\\$(basename "${{dev_path}}")\n'
+    'dev_size=\\$(cat "/sys/block/${{dev_name}}/size")\n'
+    'disk_size=\\$(( 512 * $dev_size / 1024**4 ))\n'
+    'if [[ "${{disk_size}}" -ge 2 ]]; then\n'
+    'echo "part biosboot --fstype=biosboot'
+    ' --size=1 --ondisk=${{disk_list["{disk_id}"]}}" >> '
+    '/tmp/partitioninfo\nelse\n'
+    'echo "part extra --fstype=ext4 --size=1'
+    ' --ondisk=${{disk_list["{disk_id}"]}}" >> '
+    '/tmp/partitioninfo\n'
+    'fi')
+
+BOOT_PARTITION = ShellTemplate(
+    'echo "part /boot --fstype=xfs --size={size} '
+    '--ondisk=${{disk_list["{disk_id}"]}}" >> /tmp/partitioninfo')
+
+# RHEL6 blocks, one config line each
+RHEL6_DISK_LIST_ITEM = ShellTemplate("""\
+by_id_lookup {uuid} scsi cciss
+if [ -n "\\$by_id_match" ]; then
+disk_list["{disk_id}"]=/dev/disk/by-id/\\$by_id_match
+fi""")
+
+RHEL6_DRIVE_DEV = ShellTemplate("""\
+by_id_lookup {uuid} scsi cciss
+drive_dev=
+if [ -n "\\$by_id_match" ]; then
+drive_dev=\\$(basename \\$(readlink /dev/disk/by-id/\\$by_id_match))
+fi""")
+
+RHEL6_BOOT_PARTITION = ShellTemplate(
+    'echo "part /boot --fstype=ext4 --size={size} '
+    '--ondisk=${{disk_list["{disk_id}"]}}" >>/tmp/partitioninfo')
+
+RHEL6_DRIVE_DEV_BY_NAME = ShellTemplate('drive_dev={name}')
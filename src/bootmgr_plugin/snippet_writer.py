@@ -0,0 +1,116 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2026
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+import hashlib
+import os
+import tempfile
+
+from litp.core.litp_logging import LitpLogger
+
+log = LitpLogger()
+
+
+def _file_digest(path):
+    digest = hashlib.sha1()
+    try:
+        with open(path, 'r') as f:
+            for chunk in iter(lambda: f.read(65536), ''):
+                digest.update(chunk)
+    except IOError:
+        return None
+    return digest.hexdigest()
+
+
+def _fragments(content):
+    if isinstance(content, basestring):
+        return [content]
+    return content
+
+
+def _stage(path, content):
+    """
+    Streams ``content``, a string or an iterable of lines, to a new
+    temporary file next to ``path``. Returns None if that is what ``path``
+    already holds, otherwise the temporary file, synced to disk and ready
+    to be renamed over ``path``.
+    """
+    current_digest = _file_digest(path)
+    digest = hashlib.sha1()
+    fd, tmp_path = tempfile.mkstemp(prefix='.%s.' % os.path.basename(path),
+                                    dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            separator = ''
+            for fragment in _fragments(content):
+                f.write(separator)
+                f.write(fragment)
+                digest.update(separator)
+                digest.update(fragment)
+                separator = '\n'
+            if digest.hexdigest() == current_digest:
+                os.unlink(tmp_path)
+                return None
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0644)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return tmp_path
+
+
+def _sync_directory(directory):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_snippets(snippets):
+    """
+    Writes each ``(path, content)`` snippet whose file does not already
+    hold exactly that content, leaving unchanged files untouched so their
+    mtime does not change. The content is a string or an iterable of lines,
+    which is written out as it is generated. Every snippet is written to a
+    temporary file in the same directory and renamed over its target, so a
+    reader such as cobblerd sees either the old or the new snippet, never a
+    partial one.
+    The renames are made durable with one sync per directory.
+    Returns the paths that were written.
+    """
+    staged = []
+    try:
+        for path, content in snippets:
+            tmp_path = _stage(path, content)
+            if tmp_path is None:
+                log.trace.debug('Snippet "%s" is unchanged, not writing it',
+                                path)
+                continue
+            staged.append((tmp_path, path))
+    except Exception:
+        for tmp_path, _ in staged:
+            os.unlink(tmp_path)
+        raise
+
+    for tmp_path, path in staged:
+        os.rename(tmp_path, path)
+    for directory in set(os.path.dirname(path) or '.'
+                         for _, path in staged):
+        _sync_directory(directory)
+    return [path for _, path in staged]
+
+
+def write_snippet(path, content):
+    """
+    Writes a single snippet, see ``write_snippets``. Returns whether the
+    file was written.
+    """
+    return bool(write_snippets([(path, content)]))
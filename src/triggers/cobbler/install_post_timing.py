@@ -0,0 +1,42 @@
+#!/usr/bin/python
+# installed next to the install_pre_pxe trigger, which owns the path and
+# the format of the install timings file
+from install_pre_pxe import INSTALL_TIMINGS_FILE, record_install_timing
+
+
+def register():
+    # this pure python trigger acts as if it were a legacy shell-trigger,
+    # but is much faster. The return of this method indicates the trigger type
+    return "/var/lib/cobbler/triggers/install/post/*"
+
+
+def record_install_end(name, logger):
+    """
+    Appends the end of the "install" phase of the system to the install
+    timings file of the bootmgr plugin. The kickstart %post of the system
+    fires this trigger through the kickstart_done snippet.
+    :param name: Name of the system that has been installed
+    :param logger: Used for logging
+    """
+    try:
+        record_install_timing(INSTALL_TIMINGS_FILE, name, "end")
+    except OSError as error:
+        logger.debug("Cannot record install end of system {0}: {1}"
+                     .format(name, str(error)))
+
+
+# signature is usually
+#
+# - run(api, args, logger)
+#
+def run(api, args, logger):
+    if not logger:
+        logger = api.logger
+
+    object_type = args[0]
+    name = args[1]
+
+    if object_type == "system" and api.find_system(name):
+        record_install_end(name, logger)
+
+    return 0
@@ -1,4 +1,13 @@
 #!/usr/bin/python
+import json
+import os
+import time
+
+# this should be the same as in the bootmgr plugin's pxe_events module
+PXE_EVENTS_FILE = "/var/lib/cobbler/litp_pxe_events"
+# this should be the same as in the bootmgr plugin's install_timings module,
+# the install_post_timing trigger imports it from here
+INSTALL_TIMINGS_FILE = "/var/lib/cobbler/litp_install_timings.jsonl"
 
 
 def register():
@@ -7,11 +16,71 @@ def register():
     return "/var/lib/cobbler/triggers/install/pre/*"
 
 
+def append_line(path, line):
+    """
+    Appends the line to the file, creating it if needed, in a single write
+    so that it is not interleaved with the lines of the other triggers or
+    of the bootmgr plugin.
+    :param path: Path of the append-only file
+    :param line: The line, with its trailing newline
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def record_install_timing(path, name, event):
+    """
+    Appends the "start" or "end" of the "install" phase of the system to
+    the install timings file of the bootmgr plugin.
+    :param path: Path of the install timings file
+    :param name: Name of the system that is being installed
+    :param event: "start" or "end"
+    """
+    append_line(path, json.dumps({"time": round(time.time(), 3),
+                                  "node": name, "phase": "install",
+                                  "event": event}, sort_keys=True) + "\n")
+
+
+def publish_pxe_event(name, logger):
+    """
+    Appends a "<epoch> <system name>" line to the PXE event file the
+    bootmgr plugin waits on. A failure here must not stop the install, the
+    plugin still falls back to checking the system comment over XML-RPC.
+    :param name: Name of the system that has PXE booted
+    :param logger: Used for logging
+    """
+    try:
+        append_line(PXE_EVENTS_FILE, "%d %s\n" % (int(time.time()), name))
+    except OSError as error:
+        logger.info("Cannot publish PXE event for system {0}: {1}"
+                    .format(name, str(error)))
+
+
+def record_install_start(name, logger):
+    """
+    Appends the start of the "install" phase of the system to the install
+    timings file of the bootmgr plugin. The kickstart %pre of the system
+    fires this trigger through the kickstart_start snippet.
+    :param name: Name of the system that is being installed
+    :param logger: Used for logging
+    """
+    try:
+        record_install_timing(INSTALL_TIMINGS_FILE, name, "start")
+    except OSError as error:
+        logger.debug("Cannot record install start of system {0}: {1}"
+                     .format(name, str(error)))
+
+
 # signature is usually
 #
 # - run(api, args, logger)
 #
-def run(api, args, _):
+def run(api, args, logger):
+    if not logger:
+        logger = api.logger
 
     object_type = args[0]
     name = args[1]
@@ -20,5 +89,7 @@ def run(api, args, _):
 
     if object_type == "system" and system:
         system.set_comment("PXE_BOOTED")
+        publish_pxe_event(name, logger)
+        record_install_start(name, logger)
 
     return 0
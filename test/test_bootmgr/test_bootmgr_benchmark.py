@@ -0,0 +1,432 @@
+##############################################################################
+# COPYRIGHT Ericsson AB 2026
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson AB. The programs may be used and/or copied only with written
+# permission from Ericsson AB. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+"""
+Benchmarks of the plugin on synthetic deployments.
+
+Each scenario builds a model of plain Python items, so the cost of the
+items themselves does not hide the cost of the plugin, and serves it
+through a query counting stand-in for the plugin API context. The time
+taken and the number of model queries made by ``create_configuration``,
+``validate_model``, ``cb__write_snippet`` and ``cb__write_snippets`` are
+compared against ``benchmark_baseline.json``:
+
+- a scenario making more queries than its baseline fails,
+- when ``BOOTMGR_BENCHMARK`` is set, a scenario taking longer than its
+  baseline times ``BOOTMGR_BENCHMARK_TOLERANCE`` (3 by default), plus a
+  small slack to absorb timer noise, fails.
+
+Only the small scenarios run by default, and only their query counts are
+checked as their times are too short to compare on a busy host.
+``BOOTMGR_BENCHMARK=time`` also checks their times and
+``BOOTMGR_BENCHMARK=full`` also runs the large ones, up to 500 nodes with
+64 disks each. ``BOOTMGR_BENCHMARK_UPDATE=1`` rewrites the baseline of the
+scenarios run with the figures measured instead of checking them.
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from bootmgr_plugin import bootmgr_plugin
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'benchmark_baseline.json')
+TIME_SLACK = 0.05
+
+# name, nodes, disks per node, os version, boot mode and the optional
+# parts of the model
+SCENARIOS = [
+    ('1_node_1_disk', 1, 1, 'rhel7', 'bios', ()),
+    ('10_nodes_4_disks', 10, 4, 'rhel7', 'bios', ('bonds',)),
+    ('25_nodes_8_disks_networks', 25, 8, 'rhel7', 'uefi',
+     ('bonds', 'vlans', 'bridges')),
+    ('25_nodes_8_disks_sfha', 25, 8, 'rhel7', 'uefi',
+     ('bonds', 'vlans', 'bridges', 'fencing', 'shared', 'os_reinstall')),
+    ('25_nodes_8_disks_rhel6', 25, 8, 'rhel6', 'bios', ('shared',)),
+]
+
+FULL_SCENARIOS = [
+    ('100_nodes_16_disks', 100, 16, 'rhel7', 'uefi',
+     ('bonds', 'vlans', 'bridges', 'fencing', 'shared')),
+    ('250_nodes_32_disks', 250, 32, 'rhel7', 'uefi',
+     ('bonds', 'vlans', 'bridges', 'fencing', 'shared', 'os_reinstall')),
+    ('500_nodes_1_disk', 500, 1, 'rhel7', 'bios', ('bonds', 'bridges')),
+    ('500_nodes_64_disks', 500, 64, 'rhel7', 'uefi',
+     ('bonds', 'vlans', 'bridges', 'fencing', 'shared', 'os_reinstall')),
+]
+
+
+class ItemType(object):
+
+    def __init__(self, item_type_id):
+        self.item_type_id = item_type_id
+        self.structure = {}
+
+
+class Item(object):
+    """
+    A model item with the plain attributes the plugin reads and the query
+    item methods it calls.
+    """
+
+    def __init__(self, item_type_id, item_id, parent=None, state='Initial',
+                 **properties):
+        self.item_type_id = item_type_id
+        self.item_type = ItemType(item_type_id)
+        self.item_id = item_id
+        self.parent = parent
+        self.children = []
+        self.properties = properties
+        self.applied_properties = {}
+        self._state = state
+        self.__dict__.update(properties)
+        if parent is not None:
+            parent.children.append(self)
+
+    def get_vpath(self):
+        if self.parent is None:
+            return '/' + self.item_id
+        return self.parent.get_vpath() + '/' + self.item_id
+
+    def get_state(self):
+        return self._state
+
+    def get_source(self):
+        return self
+
+    def is_initial(self):
+        return self._state == 'Initial'
+
+    def is_updated(self):
+        return self._state == 'Updated'
+
+    def is_applied(self):
+        return self._state == 'Applied'
+
+    def is_removed(self):
+        return self._state == 'Removed'
+
+    def is_for_removal(self):
+        return self._state == 'ForRemoval'
+
+    def _descendants(self):
+        for child in self.children:
+            yield child
+            for item in child._descendants():
+                yield item
+
+    def __iter__(self):
+        return iter(self.children)
+
+    def query(self, item_type_id, **properties):
+        return [item for item in self._descendants()
+                if item.item_type_id == item_type_id and
+                _matches(item, properties)]
+
+    def __repr__(self):
+        return "<Item %s>" % self.get_vpath()
+
+
+def _matches(item, properties):
+    for name, value in properties.iteritems():
+        attr = getattr(item, name, None)
+        if callable(attr):
+            attr = attr()
+        if attr != value:
+            return False
+    return True
+
+
+class CountingApi(object):
+    """
+    Serves the synthetic model like the plugin API context and counts the
+    queries made through it.
+    """
+
+    def __init__(self, root):
+        self._root = root
+        self._index = {}
+        for item in root._descendants():
+            self._index.setdefault(item.item_type_id, []).append(item)
+        self.queries = 0
+
+    def query(self, item_type_id, **properties):
+        self.queries += 1
+        return [item for item in self._index.get(item_type_id, [])
+                if _matches(item, properties)]
+
+
+def _mac(node_index, nic_index):
+    return '52:54:00:%02x:%02x:%02x' % ((node_index >> 8) & 0xff,
+                                        node_index & 0xff, nic_index)
+
+
+def _add_node_interfaces(node, index, features):
+    """
+    Adds the node's NICs, putting the management network on a bridge over
+    a vlan over a bond of two eths when all three are asked for.
+    """
+    ip = '10.%d.%d.%d' % (index >> 16, (index >> 8) & 0xff, index & 0xff)
+    nics = []
+    mgmt_nic = 'eth0'
+    if 'bonds' in features:
+        nics.extend([
+            dict(item_type_id='eth', device_name='eth0',
+                 macaddress=_mac(index, 0), master='bond0'),
+            dict(item_type_id='eth', device_name='eth1',
+                 macaddress=_mac(index, 1), master='bond0'),
+            dict(item_type_id='bond', device_name='bond0')])
+        mgmt_nic = 'bond0'
+    else:
+        nics.append(dict(item_type_id='eth', device_name='eth0',
+                         macaddress=_mac(index, 0)))
+    if 'vlans' in features:
+        nics.append(dict(item_type_id='vlan',
+                         device_name='%s.835' % mgmt_nic))
+        mgmt_nic = '%s.835' % mgmt_nic
+    if 'bridges' in features:
+        nics.append(dict(item_type_id='bridge', device_name='br0'))
+        for nic in nics:
+            if nic['device_name'] == mgmt_nic:
+                nic['bridge'] = 'br0'
+        mgmt_nic = 'br0'
+    for nic in nics:
+        if nic['device_name'] == mgmt_nic:
+            nic.update(network_name='mgmt', ipaddress=ip)
+    nics.append(dict(item_type_id='eth', device_name='eth2',
+                     macaddress=_mac(index, 2), network_name='data',
+                     ipaddress='192.168.%d.%d' % (index >> 8, index & 0xff)))
+
+    collection = Item('collection-of-network-interface',
+                      'network_interfaces', node)
+    for nic in nics:
+        Item(nic.pop('item_type_id'), 'if%d' % len(collection.children),
+             collection, **nic)
+    node.network_interfaces = collection.children
+
+
+def _add_node_storage(node, disks, features):
+    system = node.system
+    collection = Item('collection-of-disk', 'disks', system)
+    for disk_index in range(disks):
+        shared = 'shared' in features and disk_index == disks - 1 and \
+            disks > 1
+        uuid = 'sharedlun%04d' % disk_index if shared else \
+            '6000c29%s%04d' % (node.hostname.replace('node', ''),
+                               disk_index)
+        Item('disk', 'disk%d' % disk_index, collection,
+             name='hd%d' % disk_index, size='100G', uuid=uuid,
+             bootable='true' if disk_index == 0 else 'false',
+             shared='true' if shared else 'false')
+    system.disks = collection.children
+
+    profile = Item('storage-profile', 'storage_profile', node,
+                   volume_driver='lvm', view_root_vg='vg_root')
+    vgs = Item('collection-of-volume-group', 'volume_groups', profile)
+    root_vg = Item('volume-group', 'vg1', vgs, volume_group_name='vg_root')
+    pds = Item('collection-of-physical-device', 'physical_devices', root_vg)
+    Item('physical-device', 'pd0', pds, device_name='hd0')
+    root_vg.physical_devices = pds.children
+    fss = Item('collection-of-file-system', 'file_systems', root_vg)
+    for fs_id, mount_point, size in (('root', '/', '70G'),
+                                     ('home', '/home', '6G'),
+                                     ('var', '/var', '10G'),
+                                     ('swap', 'swap', '2G')):
+        Item('file-system', fs_id, fss, type='ext4', mount_point=mount_point,
+             size=size)
+    root_vg.file_systems = fss.children
+    profile.volume_groups = vgs.children
+    node.storage_profile = profile
+
+
+def build_deployment(nodes, disks, os_version='rhel7', boot_mode='bios',
+                     features=()):
+    """
+    Builds a deployment of ``nodes`` nodes of ``disks`` disks each, in a
+    single cluster, and returns its root item.
+    """
+    root = Item('root', '', state='Applied')
+    root.get_vpath = lambda: ''
+
+    infrastructure = Item('infrastructure', 'infrastructure', root)
+    networks = Item('collection-of-network', 'networks', infrastructure)
+    Item('network', 'mgmt', networks, state='Applied', name='mgmt',
+         subnet='10.0.0.0/8', litp_management='true')
+    Item('network', 'data', networks, state='Applied', name='data',
+         subnet='192.168.0.0/16', litp_management='false')
+
+    software = Item('software', 'software', root)
+    profiles = Item('collection-of-os-profile', 'profiles', software)
+    os_profile = Item('os-profile', 'os_prof1', profiles,
+                      name='sample-profile', arch='x86_64', breed='redhat',
+                      version=os_version,
+                      path='/var/www/html/%s/os/x86_64/' % os_version[-1],
+                      kopts_post='console=ttyS0,115200')
+
+    ms = Item('ms', 'ms', root, state='Applied', hostname='ms1',
+              libvirt=None)
+    ms_nics = Item('collection-of-network-interface', 'network_interfaces',
+                   ms)
+    Item('eth', 'if0', ms_nics, state='Applied', device_name='eth0',
+         macaddress='52:54:00:ff:ff:00', network_name='mgmt',
+         ipaddress='10.255.255.254')
+    ms.network_interfaces = ms_nics.children
+    services = Item('collection-of-service-base', 'services', ms)
+    Item('cobbler-service', 'cobbler', services, boot_mode=boot_mode,
+         ksm_path='/var/lib/cobbler/kickstarts', ksm_selinux_mode='enforcing',
+         manage_dhcp='true', manage_dns='false', pxe_boot_timeout='1200',
+         authentication='authn_configfile', rsync_disabled='false',
+         remove_old_puppet_certs_automatically='true',
+         sign_puppet_certs_automatically='true', puppet_auto_setup='true')
+
+    deployments = Item('collection-of-deployment', 'deployments', root)
+    deployment = Item('deployment', 'd1', deployments)
+    clusters = Item('collection-of-cluster', 'clusters', deployment)
+    cluster_type = 'vcs-cluster' if 'fencing' in features else 'cluster'
+    cluster = Item(cluster_type, 'c1', clusters)
+    if 'fencing' in features:
+        cluster.cluster_type = 'sfha'
+        fencing = Item('collection-of-disk', 'fencing_disks', cluster)
+        for fen_index in range(3):
+            Item('disk', 'fd%d' % fen_index, fencing, name='fd%d' % fen_index,
+                 size='1G', uuid='fencingdisk%d' % fen_index,
+                 bootable='false')
+        cluster.fencing_disks = fencing.children
+    cluster_nodes = Item('collection-of-node', 'nodes', cluster)
+
+    for index in range(nodes):
+        hostname = 'node%d' % (index + 1)
+        node = Item('node', 'n%d' % (index + 1), cluster_nodes,
+                    hostname=hostname)
+        node.get_cluster = lambda: cluster
+        node.os = os_profile
+        node.system = Item('blade', 'system', node,
+                           system_name='SYS%d' % (index + 1))
+        if 'os_reinstall' in features:
+            node.upgrade = Item('upgrade', 'upgrade', os_reinstall='true')
+        _add_node_interfaces(node, index + 1, features)
+        _add_node_storage(node, disks, features)
+    return root
+
+
+def _load_baseline():
+    try:
+        with open(BASELINE_FILE, 'r') as f:
+            return json.load(f)
+    except IOError:
+        return {}
+
+
+def _save_baseline(baseline):
+    with open(BASELINE_FILE, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True,
+                  separators=(',', ': '))
+        f.write('\n')
+
+
+class BootManagerPluginBenchmark(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.baseline = _load_baseline()
+        cls.update = os.environ.get('BOOTMGR_BENCHMARK_UPDATE') == '1'
+        cls.tolerance = float(os.environ.get('BOOTMGR_BENCHMARK_TOLERANCE',
+                                             3))
+        cls.check_time = bool(os.environ.get('BOOTMGR_BENCHMARK'))
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.update:
+            _save_baseline(cls.baseline)
+
+    def setUp(self):
+        self.plugin = bootmgr_plugin.BootManagerPlugin()
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _measure(self, root, call):
+        api = CountingApi(root)
+        start = time.time()
+        result = call(api)
+        return result, {'seconds': round(time.time() - start, 4),
+                        'queries': api.queries}
+
+    def _run_scenario(self, name, nodes, disks, os_version, boot_mode,
+                      features):
+        root = build_deployment(nodes, disks, os_version, boot_mode,
+                                features)
+        figures = {}
+
+        errors, figures['validate_model'] = self._measure(
+            root, self.plugin.validate_model)
+        self.assertEqual([], errors)
+
+        tasks, figures['create_configuration'] = self._measure(
+            root, self.plugin.create_configuration)
+        # udev, kickstart, bootloader, register, wait for PXE and wait for
+        # node tasks per node, with the partition snippet, configure,
+        # distro, profile and sync tasks of the plan
+        self.assertEqual(6 * nodes + 5, len(tasks))
+
+        path = os.path.join(self.tmpdir, 'node1.ks.partition.snippet')
+        _, figures['cb__write_snippet'] = self._measure(
+            root, lambda api: self.plugin.cb__write_snippet(
+                api, path, 'node1', os_version, boot_mode))
+        self.assertTrue(os.path.getsize(path) > 0)
+
+        snippets = [{'path': os.path.join(self.tmpdir,
+                                          'node%d.ks.partition.snippet' % i),
+                     'node_hostname': 'node%d' % i,
+                     'os_version': os_version}
+                    for i in range(1, nodes + 1)]
+        _, figures['cb__write_snippets'] = self._measure(
+            root, lambda api: self.plugin.cb__write_snippets(
+                api, snippets, boot_mode))
+
+        if self.update:
+            self.baseline[name] = figures
+            return
+        self.assertTrue(name in self.baseline,
+                        'No baseline for benchmark "%s", run it with '
+                        'BOOTMGR_BENCHMARK_UPDATE=1' % name)
+        for call, measured in sorted(figures.iteritems()):
+            expected = self.baseline[name][call]
+            self.assertTrue(
+                measured['queries'] <= expected['queries'],
+                '%s of "%s" made %d model queries, the baseline is %d' %
+                (call, name, measured['queries'], expected['queries']))
+            if not self.check_time:
+                continue
+            limit = expected['seconds'] * self.tolerance + TIME_SLACK
+            self.assertTrue(
+                measured['seconds'] <= limit,
+                '%s of "%s" took %.3fs, the baseline is %.3fs' %
+                (call, name, measured['seconds'], expected['seconds']))
+
+
+def _add_benchmark(scenario, full=False):
+    name = scenario[0]
+
+    def test(self):
+        if full and os.environ.get('BOOTMGR_BENCHMARK') != 'full':
+            self.skipTest('set BOOTMGR_BENCHMARK=full to run it')
+        self._run_scenario(*scenario)
+    test.__name__ = 'test_%s' % name
+    setattr(BootManagerPluginBenchmark, test.__name__, test)
+
+
+for _scenario in SCENARIOS:
+    _add_benchmark(_scenario)
+for _scenario in FULL_SCENARIOS:
+    _add_benchmark(_scenario, full=True)
@@ -1,12 +1,32 @@
 import unittest
 
-from mock import Mock, MagicMock, patch, call
+from mock import Mock, MagicMock, patch, call, ANY
 
+import json
 import re
 import time
 import os
+import shutil
+import tempfile
+import threading
+import socket
+import xmlrpclib
 
 from bootmgr_plugin import bootmgr_plugin
+from bootmgr_plugin import bootmgr_logging
+from bootmgr_plugin.bootmgr_logging import BootMgrLogger, lazy
+from bootmgr_plugin.bootmgr_utils import DiskUuidIndex
+from bootmgr_plugin.cobbler_client import (LocalCobblerClient,
+                                          LocalCobblerError)
+from bootmgr_plugin.install_timings import InstallTimings
+from bootmgr_plugin.ms_locale import MsLocaleCache
+from bootmgr_plugin.nic_topology import NicTopology
+from bootmgr_plugin.node_liveness import NodeLivenessMonitor, ProbeBackoff
+from bootmgr_plugin.profiling import Profiler, ProfilingSettings
+from bootmgr_plugin.pxe_events import PxeEventLog, PxeStatusPoller
+from bootmgr_plugin.snippet_writer import write_snippet, write_snippets
+from bootmgr_plugin import snippet_templates
+from bootmgr_plugin.snippet_templates import ShellTemplate
 from bootmgr_extension.bootmgr_extension import BootManagerExtension
 
 from litp.core.model_manager import ModelManager
@@ -345,7 +365,7 @@ class BootManagerPluginTest(unittest.TestCase):
             hostname="node1", network_interfaces=[n1_bridge, n1_eth]
         )
 
-        nic = self.testClass._get_bridge_matching_nic(node, bridge_interface)
+        nic = NicTopology(node).bridged_nic(bridge_interface.device_name)
         self.assertEqual(nic.device_name, "eth0")
 
     def test_get_bridge_matching_nic_bond(self):
@@ -364,7 +384,7 @@ class BootManagerPluginTest(unittest.TestCase):
             network_interfaces=[n1_bridge, n1_bond, n1_eth]
         )
 
-        nic = self.testClass._get_bridge_matching_nic(node, bridge_interface)
+        nic = NicTopology(node).bridged_nic(bridge_interface.device_name)
         self.assertEqual(nic.device_name, "eth0")
 
     def test_get_bridge_matching_nic_vlan_on_eth(self):
@@ -383,7 +403,7 @@ class BootManagerPluginTest(unittest.TestCase):
             network_interfaces=[n1_bridge, n1_vlan, n1_eth]
         )
 
-        nic = self.testClass._get_bridge_matching_nic(node, bridge_interface)
+        nic = NicTopology(node).bridged_nic(bridge_interface.device_name)
         self.assertEqual(nic.device_name, "eth0")
 
     def test_get_bridge_matching_nic_vlan_on_bridge(self):
@@ -405,7 +425,7 @@ class BootManagerPluginTest(unittest.TestCase):
             network_interfaces=[n1_bridge, n1_vlan, n1_bond, n1_eth]
         )
 
-        nic = self.testClass._get_bridge_matching_nic(node, bridge_interface)
+        nic = NicTopology(node).bridged_nic(bridge_interface.device_name)
         self.assertEqual(nic.device_name, "eth0")
 
     def test_add_udev_network_tasks_management_bond(self):
@@ -575,16 +595,11 @@ class BootManagerPluginTest(unittest.TestCase):
         self.assertTrue(hasattr(tasks[0], 'kwargs'))
         self.assertTrue(tasks[0].kwargs.has_key('node_hostname'))
         self.assertTrue(tasks[0].kwargs.has_key('os_version'))
-        if tasks[0].kwargs['os_version'] == "rhel6":
-            config_list = self.testClass._get_lvm_kickstart_config_rhel6(
-                self.mock_callback_api,
-                tasks[0].kwargs['node_hostname'])
-        else:
-            config_list = self.testClass._get_lvm_kickstart_config(
-                self.mock_callback_api,
-                tasks[0].kwargs['node_hostname'], tasks[0].kwargs['boot_mode'])
-        self.assertTrue(isinstance(config_list, list))
-        return '\n'.join(config_list)
+        config = self.testClass._iter_partition_snippet(
+            self.mock_callback_api, tasks[0].kwargs['node_hostname'],
+            tasks[0].kwargs['os_version'], tasks[0].kwargs['boot_mode'])
+        self.assertTrue(config is not None)
+        return '\n'.join(config)
 
     def _setup_mock_nodes(self, os_version="rhel7"):
         service = Mock(get_state=lambda: 'Initial')
@@ -628,6 +643,13 @@ class BootManagerPluginTest(unittest.TestCase):
         nodes = [node1, node2, node3]
         return nodes, service, self.all_disk_uuids
 
+    @staticmethod
+    def _disk_uuid_index(all_uuids):
+        disk_index = DiskUuidIndex()
+        for uuid in all_uuids:
+            disk_index.add(uuid)
+        return disk_index
+
     def assert_snippet_by_line(self, expected, snippet):
         expected_snippet_by_lines = expected.split("\n")
         snippet_by_lines = snippet.split("\n")
@@ -640,29 +662,28 @@ class BootManagerPluginTest(unittest.TestCase):
         tasks = []
         node = nodes[0]
         self.mock_callback_api.query.return_value = nodes
-        self.testClass._get_all_disk_uuids = MagicMock(return_value=all_uuids)
+        self.testClass._get_disk_uuid_index = MagicMock(
+            return_value=self._disk_uuid_index(all_uuids))
         self.testClass._uuid_on_disk.return_value = True
         self.testClass._generate_lvm_kickstart(tasks, node, service)
         config = ["config starts with this string "]
         boot_part_commands = ["boot_part_commands starts with this string "]
 
         config, boot_part_commands = self.testClass._get_rhel6_disk_config(
-            self.mock_callback_api, node.system.disks[0], config,
+            self._disk_uuid_index(all_uuids), node.system.disks[0], config,
             boot_part_commands)
         expected_config = [
             'config starts with this string ',
-            'disk_list_item=\\$(shopt -s '
-            'nocaseglob; ls /dev/disk/by-id/scsi*DEFEC8EDCAFE)',
-            'if [ ! -n "$disk_list_item" ]; then\ndisk_list_item=\\$(shopt -s '
-            'nocaseglob; ls /dev/disk/by-id/cciss*DEFEC8EDCAFE)\nfi',
-            'disk_list["disk1"]=\\$disk_list_item',
+            'by_id_lookup DEFEC8EDCAFE scsi cciss\n'
+            'if [ -n "\\$by_id_match" ]; then\n'
+            'disk_list["disk1"]=/dev/disk/by-id/\\$by_id_match\nfi',
             '\nif [[ ! -b \\${disk_list["disk1"]} ]]; then\necho "ERROR: '
             'Could not find disk of UUID \'DEFEC8EDCAFE\'" >>'
             ' /dev/tty1;\nread;\nexit 1;\nfi',
-            'drive_dev=\\$(basename \\$(find /dev/disk/by-id -iname '
-            'scsi\\*DEFEC8EDCAFE -printf "%l"))',
-            'if [ ! -n "$drive_dev" ]; then\ndrive_dev=\\$(basename \\$(find '
-            '/dev/disk/by-id -iname cciss\\*DEFEC8EDCAFE -printf "%l"))\nfi',
+            'by_id_lookup DEFEC8EDCAFE scsi cciss\ndrive_dev=\n'
+            'if [ -n "\\$by_id_match" ]; then\n'
+            'drive_dev=\\$(basename \\$(readlink '
+            '/dev/disk/by-id/\\$by_id_match))\nfi',
             'clearpart_devs=\\${clearpart_devs},\\${drive_dev}']
         expected_boot_part_commands = [
             'boot_part_commands starts with this string ',
@@ -672,6 +693,96 @@ class BootManagerPluginTest(unittest.TestCase):
         self.assertEqual(config, expected_config)
         self.assertEqual(boot_part_commands, expected_boot_part_commands)
 
+    def test_rhel6_partition_snippet_model_queries(self):
+        nodes, service, _ = self._setup_mock_nodes(os_version="rhel6")
+        node1 = nodes[0]
+        for i in range(2, 32):
+            node1.system.disks.append(BootMgrMockDisk(
+                'disk1_%d' % i, 'sd%d' % i, '10G', 'CAFE%04d' % i, 'false'))
+        for node in nodes:
+            node.system.is_removed = lambda: False
+            node.system.is_for_removal = lambda: False
+
+        def _query(item_type_id, **kwargs):
+            return [n for n in nodes
+                    if kwargs.get('hostname', n.hostname) == n.hostname]
+        api = MagicMock()
+        api.query.side_effect = _query
+
+        config = list(self.testClass._iter_partition_snippet(
+            api, 'node1', 'rhel6', 'bios'))
+
+        self.assertEqual(31, len([line for line in config
+                                  if line.startswith('by_id_lookup') and
+                                  'disk_list[' in line]))
+        # one query for the disk UUID index and one for the node, however
+        # many disks or nodes there are
+        self.assertEqual(2, api.query.call_count)
+
+    def test_generate_lvm_kickstarts(self):
+        nodes, service, all_uuids = self._setup_mock_nodes()
+        service.boot_mode = 'bios'
+
+        tasks = []
+        self.testClass._generate_lvm_kickstarts(tasks, nodes[:1], service)
+        self.assertEqual(1, len(tasks))
+        self.assertEqual('node1', tasks[0].kwargs['node_hostname'])
+
+        tasks = []
+        self.testClass._generate_lvm_kickstarts(tasks, nodes, service)
+        self.assertEqual(1, len(tasks))
+        self.assertEqual(
+            [('/var/lib/cobbler/snippets/%s.ks.partition.snippet' %
+              node.hostname, node.hostname) for node in nodes],
+            [(snippet['path'], snippet['node_hostname'])
+             for snippet in tasks[0].kwargs['snippets']])
+
+    def test_write_snippets(self):
+        nodes, service, all_uuids = self._setup_mock_nodes()
+        self.testClass._get_disk_uuid_index = MagicMock(
+            return_value=self._disk_uuid_index(all_uuids))
+        self.mock_callback_api.query.return_value = nodes
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        snippets = [{'path': os.path.join(tmpdir, node.hostname),
+                     'node_hostname': node.hostname,
+                     'os_version': 'rhel7'} for node in nodes]
+
+        self.testClass.cb__write_snippets(self.mock_callback_api, snippets,
+                                          'bios')
+
+        # one snapshot of the model for all the nodes
+        self.assertEqual(1, self.mock_callback_api.query.call_count)
+        self.assertEqual(1, self.testClass._get_disk_uuid_index.call_count)
+        for node in nodes:
+            with open(os.path.join(tmpdir, node.hostname)) as f:
+                self.assertEqual(
+                    '\n'.join(self.testClass._iter_lvm_kickstart_config(
+                        node, self._disk_uuid_index(all_uuids), 'bios')),
+                    f.read())
+
+    def test_write_snippets_node_without_root_vg_disks(self):
+        nodes, service, all_uuids = self._setup_mock_nodes()
+        # the disk of node2 no longer backs the root VG
+        nodes[1].system.disks[0].name = 'hd1'
+        self.testClass._get_disk_uuid_index = MagicMock(
+            return_value=self._disk_uuid_index(all_uuids))
+        self.mock_callback_api.query.return_value = nodes
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        snippets = [{'path': os.path.join(tmpdir, node.hostname),
+                     'node_hostname': node.hostname,
+                     'os_version': 'rhel7'} for node in nodes]
+
+        try:
+            self.testClass.cb__write_snippets(self.mock_callback_api,
+                                              snippets, 'bios')
+            self.fail('CallbackExecutionException not raised')
+        except CallbackExecutionException as ex:
+            self.assertTrue('"node2"' in str(ex))
+        # no snippet is written, not even those of the good nodes
+        self.assertEqual([], os.listdir(tmpdir))
+
     def test_partition_snippet_matches_devices_case_insensitive(self):
         nodes, service, all_uuids = self._setup_mock_nodes()
 
@@ -682,7 +793,8 @@ class BootManagerPluginTest(unittest.TestCase):
         expected_snippet_1 = open(node1_part_snippet).read().strip()
         node1 = nodes[0]
         self.mock_callback_api.query.return_value = [node1]
-        self.testClass._get_all_disk_uuids = MagicMock(return_value=all_uuids)
+        self.testClass._get_disk_uuid_index = MagicMock(
+            return_value=self._disk_uuid_index(all_uuids))
         self.testClass._generate_lvm_kickstart(tasks, node1, service)
         snippet = self._extract_partition_snippet_from_tasks(tasks)
 
@@ -720,7 +832,8 @@ class BootManagerPluginTest(unittest.TestCase):
 
     def test_partition_snippet_matches_devices_case_insensitive_uefi(self):
         nodes, service, all_uuids = self._setup_mock_nodes()
-        self.testClass._get_all_disk_uuids = MagicMock(return_value=all_uuids)
+        self.testClass._get_disk_uuid_index = MagicMock(
+            return_value=self._disk_uuid_index(all_uuids))
 
         # Node1
         tasks = []
@@ -770,20 +883,57 @@ class BootManagerPluginTest(unittest.TestCase):
 declare -A disk_list
 # Loop through the data structure we have been passed in and build up a bash
 # hash of device paths based on uuid. Clear all disks in the model
-disk_list_item=\$(shopt -s nocaseglob; ls /dev/disk/by-id/scsi*DEFEC8EDCAFE)
-if [ ! -n "$disk_list_item" ]; then
-disk_list_item=\$(shopt -s nocaseglob; ls /dev/disk/by-id/cciss*DEFEC8EDCAFE)
+udevadm settle
+declare -A by_id
+for by_id_path in /dev/disk/by-id/*; do
+by_id_name=\${by_id_path#/dev/disk/by-id/}
+by_id_key=\${by_id_name,,}
+case "\$by_id_key" in
+dm-uuid-part*-mpath*)
+by_id["part/\${by_id_key#dm-uuid-part*-mpath-}"]+="disk/by-id/\$by_id_name,";;
+dm-uuid-mpath*)
+by_id["mpath/\${by_id_key#dm-uuid-mpath-}"]=\$by_id_name;;
+cciss*)
+by_id["cciss/\${by_id_key#cciss-}"]=\$by_id_name;;
+scsi*)
+by_id["scsi/\${by_id_key#scsi-}"]=\$by_id_name;;
+esac
+done
+by_id_lookup() {
+local uuid=\${1,,} type key
+shift
+by_id_match=
+by_id_type=
+for type in "\$@"; do
+by_id_match=\${by_id["\$type/\$uuid"]}
+if [ -z "\$by_id_match" ]; then
+for key in "\${!by_id[@]}"; do
+if [[ "\$key" == "\$type/"*"\$uuid" ]]; then
+by_id_match=\${by_id["\$key"]}
+break
+fi
+done
+fi
+if [ -n "\$by_id_match" ]; then
+by_id_type=\$type
+return
+fi
+done
+}
+by_id_lookup DEFEC8EDCAFE scsi cciss
+if [ -n "\$by_id_match" ]; then
+disk_list["disk1"]=/dev/disk/by-id/\$by_id_match
 fi
-disk_list["disk1"]=\$disk_list_item
 
 if [[ ! -b \${disk_list["disk1"]} ]]; then
 echo "ERROR: Could not find disk of UUID 'DEFEC8EDCAFE'" >> /dev/tty1;
 read;
 exit 1;
 fi
-drive_dev=\$(basename \$(find /dev/disk/by-id -iname scsi\*DEFEC8EDCAFE -printf "%l"))
-if [ ! -n "$drive_dev" ]; then
-drive_dev=\$(basename \$(find /dev/disk/by-id -iname cciss\*DEFEC8EDCAFE -printf "%l"))
+by_id_lookup DEFEC8EDCAFE scsi cciss
+drive_dev=
+if [ -n "\$by_id_match" ]; then
+drive_dev=\$(basename \$(readlink /dev/disk/by-id/\$by_id_match))
 fi
 clearpart_devs=\${clearpart_devs},\${drive_dev}
 echo "clearpart --initlabel --all --drives=\${clearpart_devs/#,/}">/tmp/partitioninfo
@@ -799,7 +949,8 @@ echo "logvol / --fstype=ext4 --name=rvg_root --vgname=vg_root --size=40960" >> /
 
         node1 = nodes[0]
         self.mock_callback_api.query.return_value = [node1]
-        self.testClass._get_all_disk_uuids = MagicMock(return_value=all_uuids)
+        self.testClass._get_disk_uuid_index = MagicMock(
+            return_value=self._disk_uuid_index(all_uuids))
         self.testClass._generate_lvm_kickstart(tasks, node1, service)
         snippet = self._extract_partition_snippet_from_tasks(tasks)
         self.assertEquals(expected_snippet, snippet)
@@ -809,20 +960,57 @@ echo "logvol / --fstype=ext4 --name=rvg_root --vgname=vg_root --size=40960" >> /
 declare -A disk_list
 # Loop through the data structure we have been passed in and build up a bash
 # hash of device paths based on uuid. Clear all disks in the model
-disk_list_item=\$(shopt -s nocaseglob; ls /dev/disk/by-id/scsi*defec8edcafe)
-if [ ! -n "$disk_list_item" ]; then
-disk_list_item=\$(shopt -s nocaseglob; ls /dev/disk/by-id/cciss*defec8edcafe)
+udevadm settle
+declare -A by_id
+for by_id_path in /dev/disk/by-id/*; do
+by_id_name=\${by_id_path#/dev/disk/by-id/}
+by_id_key=\${by_id_name,,}
+case "\$by_id_key" in
+dm-uuid-part*-mpath*)
+by_id["part/\${by_id_key#dm-uuid-part*-mpath-}"]+="disk/by-id/\$by_id_name,";;
+dm-uuid-mpath*)
+by_id["mpath/\${by_id_key#dm-uuid-mpath-}"]=\$by_id_name;;
+cciss*)
+by_id["cciss/\${by_id_key#cciss-}"]=\$by_id_name;;
+scsi*)
+by_id["scsi/\${by_id_key#scsi-}"]=\$by_id_name;;
+esac
+done
+by_id_lookup() {
+local uuid=\${1,,} type key
+shift
+by_id_match=
+by_id_type=
+for type in "\$@"; do
+by_id_match=\${by_id["\$type/\$uuid"]}
+if [ -z "\$by_id_match" ]; then
+for key in "\${!by_id[@]}"; do
+if [[ "\$key" == "\$type/"*"\$uuid" ]]; then
+by_id_match=\${by_id["\$key"]}
+break
+fi
+done
+fi
+if [ -n "\$by_id_match" ]; then
+by_id_type=\$type
+return
+fi
+done
+}
+by_id_lookup defec8edcafe scsi cciss
+if [ -n "\$by_id_match" ]; then
+disk_list["disk2"]=/dev/disk/by-id/\$by_id_match
 fi
-disk_list["disk2"]=\$disk_list_item
 
 if [[ ! -b \${disk_list["disk2"]} ]]; then
 echo "ERROR: Could not find disk of UUID 'defec8edcafe'" >> /dev/tty1;
 read;
 exit 1;
 fi
-drive_dev=\$(basename \$(find /dev/disk/by-id -iname scsi\*defec8edcafe -printf "%l"))
-if [ ! -n "$drive_dev" ]; then
-drive_dev=\$(basename \$(find /dev/disk/by-id -iname cciss\*defec8edcafe -printf "%l"))
+by_id_lookup defec8edcafe scsi cciss
+drive_dev=
+if [ -n "\$by_id_match" ]; then
+drive_dev=\$(basename \$(readlink /dev/disk/by-id/\$by_id_match))
 fi
 clearpart_devs=\${clearpart_devs},\${drive_dev}
 echo "clearpart --initlabel --all --drives=\${clearpart_devs/#,/}">/tmp/partitioninfo
@@ -848,20 +1036,57 @@ echo "logvol / --fstype=ext4 --name=rvg_root --vgname=vg_root --size=40960" >> /
 declare -A disk_list
 # Loop through the data structure we have been passed in and build up a bash
 # hash of device paths based on uuid. Clear all disks in the model
-disk_list_item=\$(shopt -s nocaseglob; ls /dev/disk/by-id/scsi*DeFec8EFCafE)
-if [ ! -n "$disk_list_item" ]; then
-disk_list_item=\$(shopt -s nocaseglob; ls /dev/disk/by-id/cciss*DeFec8EFCafE)
+udevadm settle
+declare -A by_id
+for by_id_path in /dev/disk/by-id/*; do
+by_id_name=\${by_id_path#/dev/disk/by-id/}
+by_id_key=\${by_id_name,,}
+case "\$by_id_key" in
+dm-uuid-part*-mpath*)
+by_id["part/\${by_id_key#dm-uuid-part*-mpath-}"]+="disk/by-id/\$by_id_name,";;
+dm-uuid-mpath*)
+by_id["mpath/\${by_id_key#dm-uuid-mpath-}"]=\$by_id_name;;
+cciss*)
+by_id["cciss/\${by_id_key#cciss-}"]=\$by_id_name;;
+scsi*)
+by_id["scsi/\${by_id_key#scsi-}"]=\$by_id_name;;
+esac
+done
+by_id_lookup() {
+local uuid=\${1,,} type key
+shift
+by_id_match=
+by_id_type=
+for type in "\$@"; do
+by_id_match=\${by_id["\$type/\$uuid"]}
+if [ -z "\$by_id_match" ]; then
+for key in "\${!by_id[@]}"; do
+if [[ "\$key" == "\$type/"*"\$uuid" ]]; then
+by_id_match=\${by_id["\$key"]}
+break
+fi
+done
+fi
+if [ -n "\$by_id_match" ]; then
+by_id_type=\$type
+return
+fi
+done
+}
+by_id_lookup DeFec8EFCafE scsi cciss
+if [ -n "\$by_id_match" ]; then
+disk_list["disk3"]=/dev/disk/by-id/\$by_id_match
 fi
-disk_list["disk3"]=\$disk_list_item
 
 if [[ ! -b \${disk_list["disk3"]} ]]; then
 echo "ERROR: Could not find disk of UUID 'DeFec8EFCafE'" >> /dev/tty1;
 read;
 exit 1;
 fi
-drive_dev=\$(basename \$(find /dev/disk/by-id -iname scsi\*DeFec8EFCafE -printf "%l"))
-if [ ! -n "$drive_dev" ]; then
-drive_dev=\$(basename \$(find /dev/disk/by-id -iname cciss\*DeFec8EFCafE -printf "%l"))
+by_id_lookup DeFec8EFCafE scsi cciss
+drive_dev=
+if [ -n "\$by_id_match" ]; then
+drive_dev=\$(basename \$(readlink /dev/disk/by-id/\$by_id_match))
 fi
 clearpart_devs=\${clearpart_devs},\${drive_dev}
 echo "clearpart --initlabel --all --drives=\${clearpart_devs/#,/}">/tmp/partitioninfo
@@ -969,7 +1194,8 @@ echo "logvol / --fstype=ext4 --name=rvg_root --vgname=vg_root --size=40960" >> /
         tasks = []
         node = nodes[0]
         self.mock_callback_api.query.return_value = nodes
-        self.testClass._get_all_disk_uuids = MagicMock(return_value=all_uuids)
+        self.testClass._get_disk_uuid_index = MagicMock(
+            return_value=self._disk_uuid_index(all_uuids))
         self.testClass._generate_lvm_kickstart(tasks, node, service)
         snippet = self._extract_partition_snippet_from_tasks(tasks)
 
@@ -985,7 +1211,8 @@ echo "logvol / --fstype=ext4 --name=rvg_root --vgname=vg_root --size=40960" >> /
         tasks = []
         node = nodes[0]
         self.mock_callback_api.query.return_value = nodes
-        self.testClass._get_all_disk_uuids = MagicMock(return_value=all_uuids)
+        self.testClass._get_disk_uuid_index = MagicMock(
+            return_value=self._disk_uuid_index(all_uuids))
         self.testClass._generate_lvm_kickstart(tasks, node, service)
         snippet = self._extract_partition_snippet_from_tasks(tasks)
 
@@ -1001,68 +1228,105 @@ echo "logvol / --fstype=ext4 --name=rvg_root --vgname=vg_root --size=40960" >> /
 declare -A disk_list
 # Loop through the data structure we have been passed in and build up a bash
 # hash of device paths based on uuid. Clear all disks in the model
-disk_list_item=\$(shopt -s nocaseglob; ls /dev/disk/by-id/scsi*DeFec8EFCafE)
-if [ ! -n "$disk_list_item" ]; then
-disk_list_item=\$(shopt -s nocaseglob; ls /dev/disk/by-id/cciss*DeFec8EFCafE)
+udevadm settle
+declare -A by_id
+for by_id_path in /dev/disk/by-id/*; do
+by_id_name=\${by_id_path#/dev/disk/by-id/}
+by_id_key=\${by_id_name,,}
+case "\$by_id_key" in
+dm-uuid-part*-mpath*)
+by_id["part/\${by_id_key#dm-uuid-part*-mpath-}"]+="disk/by-id/\$by_id_name,";;
+dm-uuid-mpath*)
+by_id["mpath/\${by_id_key#dm-uuid-mpath-}"]=\$by_id_name;;
+cciss*)
+by_id["cciss/\${by_id_key#cciss-}"]=\$by_id_name;;
+scsi*)
+by_id["scsi/\${by_id_key#scsi-}"]=\$by_id_name;;
+esac
+done
+by_id_lookup() {
+local uuid=\${1,,} type key
+shift
+by_id_match=
+by_id_type=
+for type in "\$@"; do
+by_id_match=\${by_id["\$type/\$uuid"]}
+if [ -z "\$by_id_match" ]; then
+for key in "\${!by_id[@]}"; do
+if [[ "\$key" == "\$type/"*"\$uuid" ]]; then
+by_id_match=\${by_id["\$key"]}
+break
+fi
+done
+fi
+if [ -n "\$by_id_match" ]; then
+by_id_type=\$type
+return
+fi
+done
+}
+by_id_lookup DeFec8EFCafE scsi cciss
+if [ -n "\$by_id_match" ]; then
+disk_list["disk1"]=/dev/disk/by-id/\$by_id_match
 fi
-disk_list["disk1"]=\$disk_list_item
 
 if [[ ! -b \${disk_list["disk1"]} ]]; then
 echo "ERROR: Could not find disk of UUID 'DeFec8EFCafE'" >> /dev/tty1;
 read;
 exit 1;
 fi
-drive_dev=\$(basename \$(find /dev/disk/by-id -iname scsi\*DeFec8EFCafE -printf "%l"))
-if [ ! -n "$drive_dev" ]; then
-drive_dev=\$(basename \$(find /dev/disk/by-id -iname cciss\*DeFec8EFCafE -printf "%l"))
+by_id_lookup DeFec8EFCafE scsi cciss
+drive_dev=
+if [ -n "\$by_id_match" ]; then
+drive_dev=\$(basename \$(readlink /dev/disk/by-id/\$by_id_match))
 fi
 clearpart_devs=\${clearpart_devs},\${drive_dev}
-disk_list_item=\$(shopt -s nocaseglob; ls /dev/disk/by-id/scsi*123456EFCAFE)
-if [ ! -n "$disk_list_item" ]; then
-disk_list_item=\$(shopt -s nocaseglob; ls /dev/disk/by-id/cciss*123456EFCAFE)
+by_id_lookup 123456EFCAFE scsi cciss
+if [ -n "\$by_id_match" ]; then
+disk_list["disk2"]=/dev/disk/by-id/\$by_id_match
 fi
-disk_list["disk2"]=\$disk_list_item
 
 if [[ ! -b \${disk_list["disk2"]} ]]; then
 echo "ERROR: Could not find disk of UUID '123456EFCAFE'" >> /dev/tty1;
 read;
 exit 1;
 fi
-drive_dev=\$(basename \$(find /dev/disk/by-id -iname scsi\*123456EFCAFE -printf "%l"))
-if [ ! -n "$drive_dev" ]; then
-drive_dev=\$(basename \$(find /dev/disk/by-id -iname cciss\*123456EFCAFE -printf "%l"))
+by_id_lookup 123456EFCAFE scsi cciss
+drive_dev=
+if [ -n "\$by_id_match" ]; then
+drive_dev=\$(basename \$(readlink /dev/disk/by-id/\$by_id_match))
 fi
 clearpart_devs=\${clearpart_devs},\${drive_dev}
-disk_list_item=\$(shopt -s nocaseglob; ls /dev/disk/by-id/scsi*123f2ec1a9f3)
-if [ ! -n "$disk_list_item" ]; then
-disk_list_item=\$(shopt -s nocaseglob; ls /dev/disk/by-id/cciss*123f2ec1a9f3)
+by_id_lookup 123f2ec1a9f3 scsi cciss
+if [ -n "\$by_id_match" ]; then
+disk_list["disk3"]=/dev/disk/by-id/\$by_id_match
 fi
-disk_list["disk3"]=\$disk_list_item
 
 if [[ ! -b \${disk_list["disk3"]} ]]; then
 echo "ERROR: Could not find disk of UUID '123f2ec1a9f3'" >> /dev/tty1;
 read;
 exit 1;
 fi
-drive_dev=\$(basename \$(find /dev/disk/by-id -iname scsi\*123f2ec1a9f3 -printf "%l"))
-if [ ! -n "$drive_dev" ]; then
-drive_dev=\$(basename \$(find /dev/disk/by-id -iname cciss\*123f2ec1a9f3 -printf "%l"))
+by_id_lookup 123f2ec1a9f3 scsi cciss
+drive_dev=
+if [ -n "\$by_id_match" ]; then
+drive_dev=\$(basename \$(readlink /dev/disk/by-id/\$by_id_match))
 fi
 clearpart_devs=\${clearpart_devs},\${drive_dev}
-disk_list_item=\$(shopt -s nocaseglob; ls /dev/disk/by-id/scsi*123f2ec1a9f4)
-if [ ! -n "$disk_list_item" ]; then
-disk_list_item=\$(shopt -s nocaseglob; ls /dev/disk/by-id/cciss*123f2ec1a9f4)
+by_id_lookup 123f2ec1a9f4 scsi cciss
+if [ -n "\$by_id_match" ]; then
+disk_list["disk4"]=/dev/disk/by-id/\$by_id_match
 fi
-disk_list["disk4"]=\$disk_list_item
 
 if [[ ! -b \${disk_list["disk4"]} ]]; then
 echo "ERROR: Could not find disk of UUID '123f2ec1a9f4'" >> /dev/tty1;
 read;
 exit 1;
 fi
-drive_dev=\$(basename \$(find /dev/disk/by-id -iname scsi\*123f2ec1a9f4 -printf "%l"))
-if [ ! -n "$drive_dev" ]; then
-drive_dev=\$(basename \$(find /dev/disk/by-id -iname cciss\*123f2ec1a9f4 -printf "%l"))
+by_id_lookup 123f2ec1a9f4 scsi cciss
+drive_dev=
+if [ -n "\$by_id_match" ]; then
+drive_dev=\$(basename \$(readlink /dev/disk/by-id/\$by_id_match))
 fi
 clearpart_devs=\${clearpart_devs},\${drive_dev}
 echo "clearpart --initlabel --all --drives=\${clearpart_devs/#,/}">/tmp/partitioninfo
@@ -1080,7 +1344,8 @@ echo "logvol / --fstype=ext4 --name=vg1_root --vgname=vg_root --size=40960" >> /
         tasks = []
         node = nodes[0]
         self.mock_callback_api.query.return_value = nodes
-        self.testClass._get_all_disk_uuids = MagicMock(return_value=all_uuids)
+        self.testClass._get_disk_uuid_index = MagicMock(
+            return_value=self._disk_uuid_index(all_uuids))
         self.testClass._generate_lvm_kickstart(tasks, node, service)
         snippet = self._extract_partition_snippet_from_tasks(tasks)
         self.assertEquals(expected_snippet, snippet)
@@ -1177,6 +1442,22 @@ echo "logvol / --fstype=ext4 --name=vg1_root --vgname=vg_root --size=40960" >> /
             result = test_obj._check_node("random_hostname")
             self.assertFalse(result)
 
+    @patch('bootmgr_plugin.bootmgr_plugin.run_rpc_command')
+    def test_ping_nodes(self, mock_rpc):
+        mock_rpc.return_value = {'n1': {'errors': '', 'data': {'pong': 1}},
+                                 'n2': {'errors': 'No answer from node',
+                                        'data': {}}}
+        self.assertEqual(set(['n1']),
+                         self.testClass._ping_nodes(['n1', 'n2', 'n3']))
+        mock_rpc.assert_called_once_with(
+            ['n1', 'n2', 'n3'], "rpcutil", "ping",
+            timeout=bootmgr_plugin.NODE_LIVENESS_PING_TIMEOUT)
+
+        mock_rpc.reset_mock()
+        self.testClass._check_node = MagicMock(return_value=True)
+        self.assertEqual(set(['n1']), self.testClass._ping_nodes(['n1']))
+        self.assertFalse(mock_rpc.called)
+
     def test_validate_cobbler_service_exists(self):
         res = self.testClass._validate_cobbler_service_exists(self.api)
         self.assertEqual([], res)
@@ -1269,36 +1550,90 @@ echo "logvol / --fstype=ext4 --name=vg1_root --vgname=vg_root --size=40960" >> /
         self.assertEqual("5", bm.convert_to_gigabytes("5"))
         self.assertEqual("5", bm.convert_to_gigabytes("G"))
 
-    def test_wait_for_callback(self):
+    def test_wait_with_backoff_stopped_and_timeout(self):
         bm = bootmgr_plugin.BootManagerPlugin()
+        backoff = ProbeBackoff(0, 1, 1, jitter=0)
 
         mock_api = MagicMock()
         test_callback = MagicMock(return_value=True)
         mock_api.is_running.return_value = False
-        bm._wait_for_callback(mock_api, "test_message", test_callback)
+        bm._wait_with_backoff(mock_api, "test_message", backoff,
+                              test_callback)
 
         test_callback = MagicMock(return_value=False)
-        mock_api.is_running.return_value = False
-        self.assertRaises(
-            PlanStoppedException,
-            bm._wait_for_callback,
-            mock_api,
-            "test_message",
-            test_callback)
-
-        bm._get_current_time = MagicMock()
-        bm._get_current_time.side_effect = [0.0, 36.0, 360.0, 3600.0]
-        old_time_sleep = time.sleep
-        time.sleep = MagicMock()
+        self.assertRaises(PlanStoppedException, bm._wait_with_backoff,
+                          mock_api, "test_message", backoff, test_callback)
+
+        bm._get_current_time = MagicMock(
+            side_effect=[0.0, 36.0, 360.0, 3600.0])
         mock_api.is_running.return_value = True
-        self.assertRaises(
-            CallbackExecutionException,
-            bm._wait_for_callback,
-            mock_api,
-            "test_message",
-            test_callback
-        )
-        time.sleep = old_time_sleep
+        with patch('time.sleep'):
+            self.assertRaises(CallbackExecutionException,
+                              bm._wait_with_backoff, mock_api,
+                              "test_message", backoff, test_callback)
+
+    def test_wait_with_backoff(self):
+        bm = bootmgr_plugin.BootManagerPlugin()
+        mock_api = MagicMock()
+        mock_api.is_running.return_value = True
+        test_callback = MagicMock(side_effect=[False, False, True])
+        # one tick per second, probes only at 300, 305 and 315
+        bm._get_current_time = MagicMock(side_effect=range(0, 1000))
+        with patch('time.sleep'):
+            bm._wait_with_backoff(mock_api, "test_message",
+                                  ProbeBackoff(300, 5, 60, jitter=0),
+                                  test_callback)
+        self.assertEqual(3, test_callback.call_count)
+        self.assertEqual(316, bm._get_current_time.call_count)
+
+    def test_install_node_backoff_from_cobbler_service(self):
+        bm = bootmgr_plugin.BootManagerPlugin()
+        service = MagicMock(node_min_install_time="600",
+                            node_probe_min_interval="10",
+                            node_probe_max_interval="120")
+        bm._get_cobbler_service = MagicMock(return_value=service)
+        backoff = bm._get_node_probe_backoff(None)
+        self.assertEqual((600, 10, 120), (backoff.min_install_time,
+                                          backoff.min_interval,
+                                          backoff.max_interval))
+
+        # the properties are unset in models created before they existed
+        bm._get_cobbler_service = MagicMock(
+            return_value=MagicMock(spec=['manage_dhcp']))
+        backoff = bm._get_node_probe_backoff(None)
+        self.assertEqual((bootmgr_plugin.NODE_MIN_INSTALL_TIME,
+                          bootmgr_plugin.NODE_PROBE_MIN_INTERVAL,
+                          bootmgr_plugin.NODE_PROBE_MAX_INTERVAL),
+                         (backoff.min_install_time,
+                          backoff.min_interval,
+                          backoff.max_interval))
+
+    def test_disk_wipe_jobs(self):
+        bm = bootmgr_plugin.BootManagerPlugin()
+        self.assertEqual(4, bm._get_disk_wipe_jobs(
+            MagicMock(disk_wipe_jobs="4")))
+        for value in (None, "0", "many"):
+            self.assertEqual(bootmgr_plugin.DISK_WIPE_JOBS,
+                             bm._get_disk_wipe_jobs(
+                                 MagicMock(disk_wipe_jobs=value)))
+        self.assertEqual(bootmgr_plugin.DISK_WIPE_JOBS,
+                         bm._get_disk_wipe_jobs(
+                             MagicMock(spec=['manage_dhcp'])))
+
+    def test_get_disks_to_clear_parallel_wipe(self):
+        bm = bootmgr_plugin.BootManagerPlugin()
+        node = MagicMock(spec=['system'])
+        node.system.disks = []
+
+        wipe = bm._get_disks_to_clear(node, DiskUuidIndex(), 'bios')[-1]
+        self.assertFalse('&\n' in wipe)
+        self.assertTrue('mklabel msdos' in wipe)
+
+        wipe = bm._get_disks_to_clear(node, DiskUuidIndex(), 'uefi', 3)[-1]
+        self.assertTrue('wipe_disk "$wipedisk" &\n' in wipe)
+        self.assertTrue('jobs -rp | wc -l) -ge 3 ]' in wipe)
+        self.assertTrue('mklabel gpt' in wipe)
+        self.assertTrue(wipe.endswith('wait\nudevadm settle\n'))
 
     def test_network_dict(self):
 
@@ -1366,8 +1701,8 @@ echo "logvol / --fstype=ext4 --name=vg1_root --vgname=vg_root --size=40960" >> /
         return mock
 
     def test_find_mac(self):
-        """ This method tests the results of "_find_mac" method of
-        BootManagerPlugin checking the macaddress retrieved comparing with the
+        """ This method tests the results of the "mac" method of
+        NicTopology checking the macaddress retrieved comparing with the
         interfaces dict definition respecting the following rules:
          1. eth interfaces always have macaddress;
          2. bond, vlans and bridges doesn't have macaddress attribute;
@@ -1384,7 +1719,6 @@ echo "logvol / --fstype=ext4 --name=vg1_root --vgname=vg_root --size=40960" >> /
          6. if the interface associated to a vlan is bond the macaddress will
          be considered as explained the rule number 3.
         """
-        bm = bootmgr_plugin.BootManagerPlugin()
         nodes, service, all_uuids = self._setup_mock_nodes()
         interfaces = dict([
             ('eth5', ('ee:ee:ee:ee:ee:ee', None, 'br0')),
@@ -1439,10 +1773,11 @@ echo "logvol / --fstype=ext4 --name=vg1_root --vgname=vg_root --size=40960" >> /
         for node in nodes:
             node.network_interfaces = [dev(i) for i in interfaces.items()]
             node.query = _mock_query
+            topology = NicTopology(node)
             for dev_name, mac_master in interfaces.items():
                 original_dev = dev_name
                 macaddress, master, bridge = mac_master
-                retrieved_mac = bm._find_mac(node, dev_name)
+                retrieved_mac = topology.mac(dev_name)
                 if '.' in dev_name:
                     dev_name = dev_name.split('.')[0]
                     macaddress = interfaces[dev_name][0]
@@ -1459,6 +1794,57 @@ echo "logvol / --fstype=ext4 --name=vg1_root --vgname=vg_root --size=40960" >> /
                       retrieved_mac, original_dev, macaddress)
                 self.assertEquals(retrieved_mac, macaddress, msg)
 
+    def _mock_topology_node(self, devices, networks):
+        node = BootMgrMockNode(item_id="n1", hostname="mn1")
+        node.network_interfaces = [self._mock_device(*device)
+                                   for device in devices]
+        for nic in node.network_interfaces:
+            nic.network_name = networks.get(nic.device_name)
+            nic.ipaddress = '10.10.10.%d' % (len(nic.device_name))
+            nic.pxe_boot_only = 'false'
+        node.query = lambda item_type_id: [
+            nic for nic in node.network_interfaces
+            if nic.item_type_id == item_type_id]
+        return node
+
+    def test_nic_topology(self):
+        devices = [('eth0', '08:00:27:5B:C1:3A', 'bond0'),
+                   ('eth1', 'aa:bb:cc:dd:ee:f1', 'bond0'),
+                   ('eth2', 'bb:bb:bb:bb:bb:bb', None, 'br0'),
+                   ('eth3', 'cc:cc:cc:cc:cc:cc'),
+                   ('bond0',),
+                   ('bond0.835', None, None, 'br1'),
+                   ('br0',),
+                   ('br1',)]
+        networks = {'br0': 'mgmt', 'br1': 'data', 'bond0.835': 'other',
+                    'eth3': 'backup'}
+        node = self._mock_topology_node(devices, networks)
+        topology = NicTopology(node)
+
+        self.assertEqual({'mgmt': 'eth2', 'data': 'eth0', 'other': 'eth0',
+                          'backup': 'eth3'},
+                         dict((network_name,
+                               topology.nic_name_for_network(network_name))
+                              for network_name in networks.values()))
+        self.assertEqual({'eth0': '08:00:27:5B:C1:3A',
+                          'eth1': 'aa:bb:cc:dd:ee:f1',
+                          'eth2': 'bb:bb:bb:bb:bb:bb',
+                          'eth3': 'cc:cc:cc:cc:cc:cc',
+                          'bond0': '08:00:27:5B:C1:3A',
+                          'bond0.835': '08:00:27:5B:C1:3A',
+                          'br0': 'bb:bb:bb:bb:bb:bb',
+                          'br1': '08:00:27:5B:C1:3A'},
+                         dict((device[0], topology.mac(device[0]))
+                              for device in devices))
+        self.assertEqual(('eth0', '08:00:27:5B:C1:3A'),
+                         topology.pxe_nic('data'))
+        self.assertEqual('10.10.10.3', topology.ip_address('mgmt'))
+        self.assertEqual(None, topology.nic_name_for_network('missing'))
+
+        node.network_interfaces[3].pxe_boot_only = 'true'
+        self.assertEqual(('eth3', 'cc:cc:cc:cc:cc:cc'),
+                         NicTopology(node).pxe_nic('data'))
+
     def _setup_UUIDless_mock_nodes(self, os_version='rhel6'):
         service = Mock(get_vpath=lambda: '/ms/cobbler_service')
 
@@ -1501,7 +1887,8 @@ echo "logvol / --fstype=ext4 --name=vg1_root --vgname=vg_root --size=40960" >> /
         node1.get_cluster = Mock(return_value=cluster)
         updated_nodes = [node1]
         self.mock_callback_api.query.return_value = updated_nodes
-        self.testClass._get_all_disk_uuids = MagicMock(return_value=all_uuids)
+        self.testClass._get_disk_uuid_index = MagicMock(
+            return_value=self._disk_uuid_index(all_uuids))
         self.testClass._generate_bootloader_fragments(self.mock_callback_api,
                                                       mock_ms, tasks,
                                                       updated_nodes, service)
@@ -1516,7 +1903,8 @@ echo "logvol / --fstype=ext4 --name=vg1_root --vgname=vg_root --size=40960" >> /
         tasks = []
         node = nodes[0]
         self.mock_callback_api.query.return_value = nodes
-        self.testClass._get_all_disk_uuids = MagicMock(return_value=all_uuids)
+        self.testClass._get_disk_uuid_index = MagicMock(
+            return_value=self._disk_uuid_index(all_uuids))
         self.testClass._generate_lvm_kickstart(tasks, node, service)
         snippet = self._extract_partition_snippet_from_tasks(tasks)
         self.assert_snippet_by_line(expected_snippet_1, snippet)
@@ -1564,10 +1952,11 @@ echo "logvol / --fstype=ext4 --name=vg1_root --vgname=vg_root --size=40960" >> /
         self.assertEqual('cobbler::bootloader', tasks[0].call_type)
         self.assertEqual(['123', '456', '789'], tasks[0].kwargs['shared_uuids'])
         self.assertEqual(patch_log.trace.debug.call_args_list, [
-            call("_generate_bootloader_fragments.  Nodes: " + str(nodes)),
-            call('Boot disk for node node3 is identified by uuid 123f2ec1a9f4'),
-            call(
-                'Passing shared_disks argument: "[\'123\', \'456\', \'789\']" to ConfigTask')]
+            call("_generate_bootloader_fragments.  Nodes: %s", nodes),
+            call('Boot disk for node %s is identified by uuid %s', 'node3',
+                 '123f2ec1a9f4'),
+            call('Passing shared_disks argument: "%s" to ConfigTask',
+                 ['123', '456', '789'])]
                          )
         patch_is_os_reinstall.return_value = True
         tasks = []
@@ -1580,10 +1969,11 @@ echo "logvol / --fstype=ext4 --name=vg1_root --vgname=vg_root --size=40960" >> /
         self.assertEqual(['shared_disk_uuid', '123', '456', '789'],
                          tasks[0].kwargs['shared_uuids'])
         self.assertEqual(patch_log.trace.debug.call_args_list, [
-            call("_generate_bootloader_fragments.  Nodes: " + str(nodes)),
-            call('Boot disk for node node3 is identified by uuid 123f2ec1a9f4'),
-            call(
-                'Passing shared_disks argument: "[\'shared_disk_uuid\', \'123\', \'456\', \'789\']" to ConfigTask')]
+            call("_generate_bootloader_fragments.  Nodes: %s", nodes),
+            call('Boot disk for node %s is identified by uuid %s', 'node3',
+                 '123f2ec1a9f4'),
+            call('Passing shared_disks argument: "%s" to ConfigTask',
+                 ['shared_disk_uuid', '123', '456', '789'])]
                          )
 
     def test_do_add_system_callback(self):
@@ -1598,25 +1988,22 @@ echo "logvol / --fstype=ext4 --name=vg1_root --vgname=vg_root --size=40960" >> /
                       'ip_address': u'10.10.10.102',
                       'mac_address': u'08:00:27:65:C8:B4'}
              },
-                    'hostname': 'node1', 'kickstart': 'file1.ks'}
+                    'hostname': 'node1', 'kickstart': 'file1.ks',
+                    'virt_data': {}}
         bmp._add_system_callback(cb_api, nodes, system_name, **all_args)
         call_list = bmp._do_cobbler_mco.call_args_list
+        # a single request registers the system, the sync is done by a
+        # separate task for all the systems of the plan
+        self.assertEquals(1, len(call_list))
         # skips first element, it's the cb_api above
-        self.assertEquals(call_list[0][0][1:3], (['ms1'], 'remove_system'))
-        self.assertEquals(call_list[1][0][1:3], (['ms1'], 'add_system'))
-        self.assertEquals(call_list[2][0][1:3], (['ms1'], 'edit_system'))
-        self.assertEquals(call_list[3][0][1:3], (['ms1'], 'sync'))
-        # first call: add
-        call_list_add = call_list[1]
-        self.assertTrue('profile' in call_list_add[0][3])
-        self.assertTrue('system' in call_list_add[0][3])
-        self.assertEquals(len(call_list_add[0][3]), 2)
-        # second call: edit
-        call_list_edit = call_list[2]
-        self.assertTrue('profile' in call_list_edit[0][3])
-        self.assertTrue('system' in call_list_edit[0][3])
-        self.assertTrue('interface' in call_list_edit[0][3])
-        self.assertEquals(call_list_edit[0][3]['interface'], 'eth0')
+        self.assertEquals(call_list[0][0][1:3], (['ms1'], 'register_system'))
+        register_args = call_list[0][0][3]
+        self.assertEquals({'system': 'node1', 'profile': 'profile1',
+                           'hostname': 'node1', 'kickstart': 'file1.ks',
+                           'sync': 'false',
+                           'interfaces': json.dumps(all_args['interfaces'],
+                                                    sort_keys=True)},
+                          register_args)
 
     def test_do_add_system_multiple_ifaces(self):
         _cobbler_mco_mock = Mock()
@@ -1633,32 +2020,279 @@ echo "logvol / --fstype=ext4 --name=vg1_root --vgname=vg_root --size=40960" >> /
                       'ip_address': u'10.10.20.2',
                       'mac_address': u'08:00:27:11:22:33'}
              },
-                    'hostname': 'node1', 'kickstart': 'file1.ks'}
+                    'hostname': 'node1', 'kickstart': 'file1.ks',
+                    'virt_data': {'virt_cpus': '2', 'power_type': 'virsh'}}
         bmp._add_system_callback(cb_api, nodes, system_name, **all_args)
         call_list = bmp._do_cobbler_mco.call_args_list
-        # skips first element, it's the cb_api above
-        self.assertEquals(call_list[0][0][1:3], (['ms1'], 'remove_system'))
-        self.assertEquals(call_list[1][0][1:3], (['ms1'], 'add_system'))
-        self.assertEquals(call_list[2][0][1:3], (['ms1'], 'edit_system'))
-        self.assertEquals(call_list[3][0][1:3], (['ms1'], 'edit_system'))
-        self.assertEquals(call_list[4][0][1:3], (['ms1'], 'sync'))
-        # first call: add
-        call_list_add = call_list[1]
-        self.assertTrue('profile' in call_list_add[0][3])
-        self.assertTrue('system' in call_list_add[0][3])
-        self.assertEquals(len(call_list_add[0][3]), 2)
-        # second/third call: edit
-        call_list_edit_all = call_list[2:4]
-        call_list_edit_all.sort(key=lambda k: k[0][3]['interface'])
-        call_list_edit = call_list_edit_all[0]
-        self.assertTrue('interface' in call_list_edit[0][3])
-        self.assertEquals(call_list_edit[0][3]['interface'], 'eth0')
-        self.assertEquals(call_list_edit[0][3]['ip_address'], '10.10.10.102')
-
-        call_list_edit = call_list_edit_all[1]
-        self.assertTrue('interface' in call_list_edit[0][3])
-        self.assertEquals(call_list_edit[0][3]['interface'], 'eth1')
-        self.assertEquals(call_list_edit[0][3]['ip_address'], '10.10.20.2')
+        self.assertEquals(1, len(call_list))
+        self.assertEquals(call_list[0][0][1:3], (['ms1'], 'register_system'))
+        register_args = call_list[0][0][3]
+        self.assertEquals('2', register_args['virt_cpus'])
+        self.assertEquals('virsh', register_args['power_type'])
+        interfaces = json.loads(register_args['interfaces'])
+        self.assertEquals(['eth0', 'eth1'], sorted(interfaces))
+        self.assertEquals('10.10.10.102', interfaces['eth0']['ip_address'])
+        self.assertEquals('10.10.20.2', interfaces['eth1']['ip_address'])
+
+    def test_generate_cobbler_sync(self):
+        service = self.api.query("cobbler-service")[0]
+        self.assertEqual(None, self.testClass._generate_cobbler_sync(
+            service, self.api, []))
+
+        tasks = []
+        self.testClass._generate_cobbler_records(service, self.api, tasks)
+        add_system_tasks = [task for task in tasks
+                            if task.description.startswith('Register')]
+        self.assertEqual(2, len(add_system_tasks))
+
+        sync_task = self.testClass._generate_cobbler_sync(service, self.api,
+                                                          add_system_tasks)
+        self.assertEqual(set(add_system_tasks), set(sync_task.requires))
+        self.assertEqual(['ms1'], sync_task.args[0])
+        self.assertEqual(['n1', 'n2'], sorted(sync_task.args[1]))
+
+    def test_generate_cobbler_sync_ignores_profile_tasks(self):
+        service = self.api.query("cobbler-service")[0]
+        ms = self.api.query("ms")[0]
+        profile_task = bootmgr_plugin.ConfigTask(
+            ms, service, 'Add profile', 'cobblerdata::add_profile',
+            'sample-profile-x86_64')
+        self.assertEqual(None, self.testClass._generate_cobbler_sync(
+            service, self.api, [profile_task]))
+
+        tasks = [profile_task]
+        self.testClass._generate_cobbler_records(service, self.api, tasks)
+        sync_task = self.testClass._generate_cobbler_sync(service, self.api,
+                                                          tasks)
+        self.assertFalse(profile_task in sync_task.requires)
+        self.assertEqual(['n1', 'n2'], sorted(sync_task.args[1]))
+
+    def test_generate_cobbler_sync_initial_os_profile(self):
+        service = self.api.query("cobbler-service")[0]
+        os_profile = self.api.query("os-profile")[0]
+        self.assertTrue(os_profile.is_initial())
+
+        tasks = []
+        self.testClass._generate_cobbler_records(service, self.api, tasks)
+        config_tasks = [task for task in tasks
+                        if task.call_type in ("cobblerdata::import_distro",
+                                              "cobblerdata::add_profile")]
+        self.assertEqual(2, len(config_tasks))
+        add_system_tasks = [task for task in tasks
+                            if task.description.startswith('Register')]
+
+        sync_task = self.testClass._generate_cobbler_sync(service, self.api,
+                                                          tasks)
+        self.assertEqual(['n1', 'n2'], sorted(sync_task.args[1]))
+        self.assertEqual(set(add_system_tasks), set(sync_task.requires))
+
+    def test_generate_cobbler_records_bulk(self):
+        service = self.api.query("cobbler-service")[0]
+        tasks = []
+        with patch.object(bootmgr_plugin.BootManagerPlugin,
+                          '_get_bulk_registration', return_value=True):
+            self.testClass._generate_cobbler_records(service, self.api,
+                                                     tasks)
+        add_system_tasks = [task for task in tasks
+                            if task.description.startswith('Register')]
+        self.assertEqual(1, len(add_system_tasks))
+        bulk_task = add_system_tasks[0]
+        self.assertTrue(bulk_task.description.startswith(
+            'Register systems "n'))
+        self.assertEqual(['ms1'], bulk_task.args[0])
+        self.assertEqual(['n1', 'n2'], sorted(bulk_task.args[1]))
+        systems = bulk_task.kwargs['systems']
+        self.assertEqual(['n1', 'n2'],
+                         sorted(system['name'] for system in systems))
+        for system in systems:
+            self.assertEqual('/var/lib/cobbler/kickstarts/%s.ks' %
+                             system['name'], system['kickstart'])
+        profile_task = [task for task in tasks
+                        if task.call_type == "cobblerdata::add_profile"][0]
+        self.assertTrue(profile_task in bulk_task.requires)
+
+        sync_task = self.testClass._generate_cobbler_sync(service, self.api,
+                                                          tasks)
+        self.assertEqual(set([bulk_task]), set(sync_task.requires))
+        self.assertEqual(['n1', 'n2'], sorted(sync_task.args[1]))
+
+    def test_create_configuration_bulk_registration(self):
+        with patch.object(bootmgr_plugin.BootManagerPlugin,
+                          '_get_bulk_registration', return_value=True):
+            tasks = self.testClass.create_configuration(self.api)
+        register_tasks = [task for task in tasks
+                          if task.description.startswith('Register')]
+        self.assertEqual(1, len(register_tasks))
+        kickstart_tasks = [task for task in tasks
+                           if 'Cobbler kickstart file' in task.description]
+        for kickstart_task in kickstart_tasks:
+            self.assertTrue(kickstart_task in register_tasks[0].requires)
+
+    def test_create_configuration_register_requires_own_kickstart(self):
+        with patch.object(bootmgr_plugin.BootManagerPlugin,
+                          '_get_bulk_registration', return_value=False):
+            tasks = self.testClass.create_configuration(self.api)
+        register_tasks = [task for task in tasks
+                          if task.description.startswith('Register')]
+        self.assertEqual(2, len(register_tasks))
+        kickstart_tasks = dict((task.call_id, task) for task in tasks
+                               if 'Cobbler kickstart file' in
+                               task.description)
+        self.assertEqual(['n1', 'n2'], sorted(kickstart_tasks))
+        for register_task in register_tasks:
+            system_name = register_task.args[1]
+            for hostname, kickstart_task in kickstart_tasks.items():
+                self.assertEqual(hostname == system_name,
+                                 kickstart_task in register_task.requires)
+
+    def test_get_bulk_registration(self):
+        bm = bootmgr_plugin.BootManagerPlugin
+        self.assertTrue(bm._get_bulk_registration(
+            MagicMock(bulk_registration="true")))
+        self.assertFalse(bm._get_bulk_registration(
+            MagicMock(bulk_registration="false")))
+        self.assertEqual(bootmgr_plugin.BULK_REGISTRATION,
+                         bm._get_bulk_registration(Mock(spec=[])))
+
+    def test_do_add_systems_callback(self):
+        bmp = bootmgr_plugin.BootManagerPlugin()
+        bmp._do_cobbler_mco = Mock()
+        bmp._backup_anamon_logs = Mock()
+        cb_api = type('MockCB', (object,), {'is_running': lambda s: True})()
+        systems = [{'name': 'node%d' % i, 'profile': 'profile1',
+                    'interfaces': {'eth0': {'dns_name': u'node%d' % i,
+                                            'ip_address': u'10.10.10.%d' % i,
+                                            'mac_address': None}},
+                    'hostname': 'node%d' % i,
+                    'kickstart': 'node%d.ks' % i,
+                    'virt_data': {'virt_cpus': '2'}}
+                   for i in (1, 2, 3)]
+        bmp._add_systems_callback(cb_api, ['ms1'],
+                                  ['node1', 'node2', 'node3'], systems)
+        # all the systems in a single request
+        call_list = bmp._do_cobbler_mco.call_args_list
+        self.assertEquals(1, len(call_list))
+        self.assertEquals(call_list[0][0][1:3], (['ms1'], 'register_systems'))
+        register_args = call_list[0][0][3]
+        self.assertEquals('false', register_args['sync'])
+        specs = json.loads(register_args['systems'])
+        self.assertEquals(['node1', 'node2', 'node3'],
+                          [spec['system'] for spec in specs])
+        self.assertEquals({'system': 'node2', 'profile': 'profile1',
+                           'hostname': 'node2', 'kickstart': 'node2.ks',
+                           'virt_cpus': '2',
+                           'interfaces': {'eth0': {
+                               'dns_name': 'node2',
+                               'ip_address': '10.10.10.2'}}},
+                          specs[1])
+        self.assertEquals(3, bmp._backup_anamon_logs.call_count)
+
+    def test_create_configuration_waits_for_sync(self):
+        tasks = self.testClass.create_configuration(self.api)
+        sync_tasks = [task for task in tasks
+                      if task.description.startswith('Sync Cobbler')]
+        self.assertEqual(1, len(sync_tasks))
+        pxe_tasks = [task for task in tasks
+                     if task.description.endswith('to PXE boot')]
+        self.assertEqual(2, len(pxe_tasks))
+        for task in pxe_tasks:
+            self.assertTrue(sync_tasks[0] in task.requires)
+
+    def test_create_configuration_model_queries(self):
+        queries = []
+        query = self.api.query
+
+        def _query(item_type_id, **kwargs):
+            queries.append(item_type_id)
+            return query(item_type_id, **kwargs)
+        self.api.query = _query
+
+        tasks = self.testClass.create_configuration(self.api)
+        self.assertTrue(tasks)
+        # resolved once per plan however many nodes there are
+        self.assertEqual(1, queries.count("ms"))
+        self.assertEqual(1, queries.count("os-profile"))
+
+    def test_planning_context(self):
+        api = MagicMock()
+        context = bootmgr_plugin.PlanningContext(self.testClass, api)
+        self.assertTrue(context is
+                        bootmgr_plugin.PlanningContext.of(self.testClass,
+                                                          context))
+        api.query.return_value = [MagicMock(libvirt=None)]
+        self.assertTrue(context.ms is context.ms)
+        self.assertEqual([], context.providers)
+        self.assertEqual(1, api.query.call_count)
+
+    def test_sync_cobbler_coalesces_concurrent_requests(self):
+        bmp = bootmgr_plugin.BootManagerPlugin()
+        first_sync_started = threading.Event()
+        release_first_sync = threading.Event()
+        synced = []
+
+        def _do_cobbler_mco(cb_api, nodes, cmd, cmd_args):
+            synced.append(cmd)
+            if len(synced) == 1:
+                first_sync_started.set()
+                release_first_sync.wait(5)
+        bmp._do_cobbler_mco = _do_cobbler_mco
+
+        first = threading.Thread(target=bmp._sync_cobbler,
+                                 args=(None, ['ms1'], ['n1']))
+        first.start()
+        first_sync_started.wait(5)
+        # these arrive while the first sync runs and share the next one
+        others = [threading.Thread(target=bmp._sync_cobbler,
+                                   args=(None, ['ms1'], [name]))
+                  for name in ('n2', 'n3', 'n4')]
+        for thread in others:
+            thread.start()
+        time.sleep(0.2)
+        release_first_sync.set()
+        for thread in [first] + others:
+            thread.join(5)
+
+        self.assertEqual(['sync', 'sync'], synced)
+
+    def test_sync_cobbler_systems_only(self):
+        bmp = bootmgr_plugin.BootManagerPlugin()
+        calls = []
+        bmp._do_cobbler_mco = lambda cb_api, nodes, cmd, cmd_args: \
+            calls.append((cmd, cmd_args))
+
+        bmp._sync_cobbler(None, ['ms1'], ['n2', 'n1'], full_sync=False)
+        self.assertEqual([('sync_systems', {'systems': 'n1,n2'})], calls)
+
+        calls[:] = []
+        bmp._sync_cobbler(None, ['ms1'], ['n1'], full_sync=True)
+        self.assertEqual([('sync', [])], calls)
+
+    def test_sync_cobbler_callback_resets_pxe_events(self):
+        bmp = bootmgr_plugin.BootManagerPlugin()
+        bmp._sync_cobbler = Mock()
+        bmp._needs_full_sync = Mock(return_value=False)
+        with patch.object(bootmgr_plugin.PxeEventLog,
+                          'truncate') as mock_truncate:
+            bmp._sync_cobbler_callback(None, ['ms1'], ['n1'])
+        mock_truncate.assert_called_once_with()
+        bmp._sync_cobbler.assert_called_once_with(None, ['ms1'], ['n1'],
+                                                  False)
+
+    def test_needs_full_sync(self):
+        service = MagicMock(manage_dhcp="true", manage_dns="false")
+        self.testClass._get_cobbler_service = MagicMock(return_value=service)
+        self.assertTrue(self.testClass._needs_full_sync(None))
+        service.manage_dhcp = "false"
+        self.assertFalse(self.testClass._needs_full_sync(None))
+        self.testClass._get_cobbler_service = MagicMock(return_value=None)
+        self.assertTrue(self.testClass._needs_full_sync(None))
+
+    def test_needs_full_sync_manage_dns(self):
+        service = MagicMock(manage_dhcp="false", manage_dns="true")
+        self.testClass._get_cobbler_service = MagicMock(return_value=service)
+        self.assertTrue(self.testClass._needs_full_sync(None))
+        service.manage_dns = "false"
+        self.assertFalse(self.testClass._needs_full_sync(None))
 
     def test__validate_no_disk_base_items(self):
 
@@ -1897,84 +2531,59 @@ echo "logvol / --fstype=ext4 --name=vg1_root --vgname=vg_root --size=40960" >> /
         res = self.plugin._get_bridge(providers, sys)
         self.assertEqual("my_bridge", res)
 
-    def test__get_bridge_macaddress(self):
-        br = MagicMock()
-        br.device_name = "my.bridge"
-        node = BootMgrMockNode(item_id="n1",
-                               hostname="mn1")
-        self.plugin = bootmgr_plugin.BootManagerPlugin()
-        res = self.plugin._get_bridge_macaddress(node, br)
-        self.assertEqual(res, None)
-        nic = MagicMock(spec=[u'bridge'])
-        nic.item_type_id = "bond"
-        nic.macaddress = "MY:MA:CA:AD:DR:ES:S"
-        nic.bridge = "my.bridge"
-        node.network_interfaces.append(nic)
-        self.plugin._get_bond_macaddress = lambda *x: nic.macaddress
-        res = self.plugin._get_bridge_macaddress(node, br)
-        self.assertEqual(res, "MY:MA:CA:AD:DR:ES:S")
-
-        nic.item_type_id = "vlan"
-        nic.device_name = "my.bridge"
-
-        iface = MagicMock()
-        iface.item_type_id = "eth"
-        iface.macaddress = "MY:MA:CA:AD:DR:ES:S"
-        self.plugin._get_interface_by_name = lambda *x: iface
-        res = self.plugin._get_bridge_macaddress(node, br)
-        self.assertEqual(res, "MY:MA:CA:AD:DR:ES:S")
-
-        iface.item_type_id = "bond"
-        self.plugin._get_bond_macaddress = lambda *x: "MY:MA:CA:AD:DR:ES:S"
-        res = self.plugin._get_bridge_macaddress(node, br)
-        self.assertEqual(res, "MY:MA:CA:AD:DR:ES:S")
-
-    def test__get_bond_eth_slaves(self):
-        node = BootMgrMockNode(item_id="n1",
-                               hostname="mn1")
-        bond_interface = MagicMock("bond_interface")
-        bond_interface.item_type_id = "not_bond"
-        self.plugin = bootmgr_plugin.BootManagerPlugin()
-        try:
-            self.plugin._get_bond_eth_slaves(node, bond_interface)
-        except Exception as e:
-            self.assertEqual(bootmgr_plugin.BootManagerException, type(e))
-            print "Failing!", str(e)
-
-    def test__get_matching_nic_name(self):
-        node = BootMgrMockNode(item_id="n1",
-                               hostname="mn1")
-        expected_network = MagicMock()
-        expected_network.name = "my_network_name"
-        self.plugin = bootmgr_plugin.BootManagerPlugin()
-        res = self.plugin._get_matching_nic_name(node, expected_network)
-        self.assertEqual(res, None)
-
-        nic = MagicMock(spec=[u'bridge', u'network_name'])
-        nic.item_type_id = "bridge"
-        nic.device_name = "device.name"
-        nic.network_name = "my_network_name"
-        node.network_interfaces.append(nic)
-
-        self.plugin._get_bridge_matching_nic = lambda *x: nic
-        res = self.plugin._get_matching_nic_name(node, expected_network)
-        self.assertEqual(res, nic.device_name)
-
-        nic.item_type_id = "vlan"
-        iface = MagicMock()
-        iface.item_type_id = "bond"
-        slave = MagicMock()
-        slave.device_name = "slave_name"
-        self.plugin._get_interface_by_name = lambda *x: iface
-        self.plugin._get_bond_eth_slaves = lambda *x: [slave]
-        res = self.plugin._get_matching_nic_name(node, expected_network)
-        self.assertEqual(slave.device_name, res)
-
-        iface.item_type_id = "not_bond"
-        iface.device_name = "iface_name"
-        self.plugin._get_interface_by_name = lambda *x: iface
-        res = self.plugin._get_matching_nic_name(node, expected_network)
-        self.assertEqual(iface.device_name, res)
+    def test_nic_topology_bridge_mac(self):
+        node = self._mock_topology_node([('br0',)], {})
+        self.assertEqual(None, NicTopology(node).mac('br0'))
+
+        # a bond, a vlan on an eth and a vlan on a bond under a bridge
+        devices = [('eth0', 'aa:aa:aa:aa:aa:aa', 'bond0'),
+                   ('eth1', 'bb:bb:bb:bb:bb:bb'),
+                   ('eth2', 'cc:cc:cc:cc:cc:cc', 'bond1'),
+                   ('bond0', None, None, 'br0'),
+                   ('bond1',),
+                   ('eth1.10', None, None, 'br1'),
+                   ('bond1.20', None, None, 'br2'),
+                   ('br0',), ('br1',), ('br2',)]
+        topology = NicTopology(self._mock_topology_node(devices, {}))
+        self.assertEqual('aa:aa:aa:aa:aa:aa', topology.mac('br0'))
+        self.assertEqual('bb:bb:bb:bb:bb:bb', topology.mac('br1'))
+        self.assertEqual('cc:cc:cc:cc:cc:cc', topology.mac('br2'))
+
+    def test_nic_topology_bond_slaves(self):
+        devices = [('eth1', 'bb:bb:bb:bb:bb:bb', 'bond0'),
+                   ('eth0', 'aa:aa:aa:aa:aa:aa', 'bond0'),
+                   ('bond0',)]
+        node = self._mock_topology_node(devices, {})
+        node.network_interfaces[0].is_for_removal = lambda: True
+        node.network_interfaces.append(self._mock_device('eth2', None,
+                                                         'bond0'))
+        topology = NicTopology(node)
+        # ordered by device name, without the eths for removal
+        self.assertEqual(['eth0', 'eth2'],
+                         [eth.device_name
+                          for eth in topology.bond_slaves('bond0')])
+        self.assertEqual([], topology.bond_slaves('eth0'))
+
+    def test_nic_topology_nic_name_for_network(self):
+        node = self._mock_topology_node([], {})
+        self.assertEqual(None,
+                         NicTopology(node).nic_name_for_network('mgmt'))
+
+        devices = [('eth0', 'aa:aa:aa:aa:aa:aa', 'bond0'),
+                   ('eth1', 'bb:bb:bb:bb:bb:bb'),
+                   ('bond0',),
+                   ('bond0.10',),
+                   ('eth1.20',),
+                   ('eth2', 'cc:cc:cc:cc:cc:cc', None, 'br0'),
+                   ('br0',)]
+        networks = {'bond0.10': 'vlan_on_bond', 'eth1.20': 'vlan_on_eth',
+                    'br0': 'bridged', 'bond0': 'bonded'}
+        topology = NicTopology(self._mock_topology_node(devices, networks))
+        self.assertEqual('eth0',
+                         topology.nic_name_for_network('vlan_on_bond'))
+        self.assertEqual('eth1', topology.nic_name_for_network('vlan_on_eth'))
+        self.assertEqual('eth2', topology.nic_name_for_network('bridged'))
+        self.assertEqual('eth0', topology.nic_name_for_network('bonded'))
 
     def test_timeout(self):
         test_time = 1
@@ -1988,7 +2597,7 @@ echo "logvol / --fstype=ext4 --name=vg1_root --vgname=vg_root --size=40960" >> /
     def test_wait_for_pxe_boot(self):
 
         system_name = 'SYS1'
-        test_result = ['found']
+        test_result = ['mn1']
 
         timeouts = {'success': 10,
                     'failed': 1}
@@ -2027,6 +2636,139 @@ echo "logvol / --fstype=ext4 --name=vg1_root --vgname=vg_root --size=40960" >> /
                 PlanStoppedException, bm._wait_for_pxe_boot,
                 self.api, node.hostname, system_name, timeout)
 
+    def test_wait_for_pxe_boot_event(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        events_file = os.path.join(tmp_dir, 'litp_pxe_events')
+        with open(events_file, 'w') as f:
+            # events from before the wait started are ignored
+            f.write('900 mn1\n')
+
+        cobbler = MagicMock()
+        cobbler.find_system.return_value = []
+
+        bm = bootmgr_plugin.BootManagerPlugin()
+        bm._create_cobbler_client = lambda: cobbler
+        bm._create_pxe_event_log = lambda: PxeEventLog(events_file)
+        self.api.is_running = lambda: True
+
+        def _pxe_boot(seconds):
+            with open(events_file, 'a') as f:
+                f.write('1000 mn2\n1000 mn1\n')
+
+        with patch.object(bootmgr_plugin.Timeout, 'sleep',
+                          side_effect=_pxe_boot) as mock_sleep:
+            self.assertTrue(bm._wait_for_pxe_boot(self.api, 'mn1', 'SYS1',
+                                                  600))
+        self.assertEqual(1, mock_sleep.call_count)
+        # Cobbler is only asked once, before any event is received
+        self.assertEqual(1, cobbler.find_system.call_count)
+
+    @patch('bootmgr_plugin.pxe_events.time.time')
+    def test_pxe_status_poller(self, mock_time):
+        mock_time.return_value = 1000
+        cobbler = MagicMock()
+        cobbler.find_system.return_value = ['mn2', 'other']
+        client_factory = MagicMock(return_value=cobbler)
+        poller = PxeStatusPoller(client_factory, 30)
+
+        poller.register('mn1')
+        poller.register('mn2')
+        self.assertFalse(poller.has_booted('mn1'))
+        self.assertTrue(poller.has_booted('mn2'))
+        # one Cobbler call per interval, whatever the number of nodes
+        self.assertFalse(poller.has_booted('mn1'))
+        self.assertEqual(1, cobbler.find_system.call_count)
+        cobbler.find_system.assert_called_once_with({'comment': 'PXE_BOOTED'})
+
+        cobbler.find_system.return_value = ['mn1', 'mn2']
+        mock_time.return_value = 1030
+        self.assertTrue(poller.has_booted('mn1'))
+        self.assertEqual(2, cobbler.find_system.call_count)
+
+        # the status table is dropped once nothing is waiting
+        poller.unregister('mn1')
+        poller.unregister('mn2')
+        cobbler.find_system.return_value = []
+        poller.register('mn1')
+        self.assertFalse(poller.has_booted('mn1'))
+        self.assertEqual(2, client_factory.call_count)
+
+    @patch('bootmgr_plugin.pxe_events.time.time')
+    def test_pxe_status_poller_register(self, mock_time):
+        mock_time.return_value = 1000
+        cobbler = MagicMock()
+        cobbler.find_system.return_value = []
+        poller = PxeStatusPoller(MagicMock(return_value=cobbler), 30)
+
+        # nodes starting to wait together share one poll
+        for name in ('mn1', 'mn2', 'mn3'):
+            poller.register(name)
+            self.assertFalse(poller.has_booted(name))
+        self.assertEqual(1, cobbler.find_system.call_count)
+
+        # a node joining later gets a fresh poll
+        mock_time.return_value = 1010
+        poller.register('mn4')
+        self.assertFalse(poller.has_booted('mn4'))
+        self.assertEqual(2, cobbler.find_system.call_count)
+
+    @patch('bootmgr_plugin.pxe_events.time.time')
+    def test_pxe_status_poller_socket_error(self, mock_time):
+        mock_time.return_value = 1000
+        cobbler = MagicMock()
+        cobbler.find_system.side_effect = socket.error(111, 'refused')
+        client_factory = MagicMock(return_value=cobbler)
+        poller = PxeStatusPoller(client_factory, 30)
+
+        poller.register('mn1')
+        self.assertFalse(poller.has_booted('mn1'))
+
+        # retried on the next interval with a new connection
+        cobbler.find_system.side_effect = None
+        cobbler.find_system.return_value = ['mn1']
+        mock_time.return_value = 1030
+        self.assertTrue(poller.has_booted('mn1'))
+        self.assertEqual(2, client_factory.call_count)
+
+    def test_pxe_event_log(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        events_file = os.path.join(tmp_dir, 'litp_pxe_events')
+
+        pxe_events = PxeEventLog(events_file)
+        self.assertFalse(pxe_events.has_booted('mn1'))
+
+        with open(events_file, 'a') as f:
+            f.write('1000 mn1\n1000 mn')
+        self.assertTrue(pxe_events.has_booted('mn1'))
+        self.assertFalse(pxe_events.has_booted('mn'))
+
+        with open(events_file, 'a') as f:
+            f.write('2\n')
+        self.assertTrue(pxe_events.has_booted('mn2'))
+
+    def test_pxe_event_log_truncate(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        events_file = os.path.join(tmp_dir, 'litp_pxe_events')
+        with open(events_file, 'w') as f:
+            f.write('900 mn1\n900 mn2\n')
+
+        pxe_events = PxeEventLog(events_file)
+        PxeEventLog.truncate(events_file)
+        self.assertEqual(0, os.path.getsize(events_file))
+
+        # the reader picks up what is written after the truncation
+        with open(events_file, 'a') as f:
+            f.write('1000 mn3\n')
+        self.assertTrue(pxe_events.has_booted('mn3'))
+        self.assertFalse(pxe_events.has_booted('mn1'))
+
+        # a missing file is left alone
+        PxeEventLog.truncate(os.path.join(tmp_dir, 'missing'))
+        self.assertFalse(os.path.exists(os.path.join(tmp_dir, 'missing')))
+
     def test_get_keyboard(self):
         read_data = ['System Locale: LANG=en_IE.UTF-8\n',
                      'VC Keymap: es\n',
@@ -2071,13 +2813,13 @@ echo "logvol / --fstype=ext4 --name=vg1_root --vgname=vg_root --size=40960" >> /
         eth0 = MagicMock(item_type_id='eth', device_name='eth0')
         eth5 = MagicMock(item_type_id='eth', device_name='eth5')
         node.network_interfaces.extend([eth0, eth5])
+        node.query = lambda item_type_id: []
 
-        plugin = bootmgr_plugin.BootManagerPlugin()
-        dev_name = plugin._get_dedicated_pxe_boot_only_nic(node)
+        dev_name = NicTopology(node).pxe_boot_only_nic
         self.assertTrue(dev_name is None)
 
         eth5.pxe_boot_only = 'true'
-        dev_name = plugin._get_dedicated_pxe_boot_only_nic(node)
+        dev_name = NicTopology(node).pxe_boot_only_nic
         self.assertEquals('eth5', dev_name)
 
     def test__validate_boot_mode_on_cloud(self):
@@ -2102,3 +2844,625 @@ echo "logvol / --fstype=ext4 --name=vg1_root --vgname=vg_root --size=40960" >> /
         expected = ValidationError(item_path=node3.get_vpath(),
                                    error_message=msg)
         self.assertEqual(expected, errors[0])
+
+
+class DiskUuidIndexTest(unittest.TestCase):
+
+    def _node(self, hostname, uuids):
+        node = BootMgrMockNode(item_id=hostname, hostname=hostname)
+        for i, uuid in enumerate(uuids):
+            node.system.disks.append(
+                BootMgrMockDisk('disk%d' % i, 'hd%d' % i, '10G', uuid,
+                                'false'))
+        return node
+
+    def test_from_nodes(self):
+        nodes = [self._node('n1', ['a', 'shared']),
+                 self._node('n2', ['b', 'shared'])]
+        disk_index = DiskUuidIndex.from_nodes(nodes)
+
+        self.assertEqual(3, len(disk_index))
+        self.assertEqual(2, disk_index.count('shared'))
+        self.assertTrue(disk_index.is_shared('shared'))
+        self.assertFalse(disk_index.is_unique('shared'))
+        self.assertTrue(disk_index.is_unique('a'))
+        self.assertFalse(disk_index.is_shared('a'))
+        self.assertEqual(0, disk_index.count('unknown'))
+
+    def test_fencing_uuids(self):
+        fen_disks = [Mock(uuid='f1'), Mock(uuid='f2')]
+        vcs_cluster = Mock(item_type=Mock(item_type_id='vcs-cluster'),
+                           fencing_disks=fen_disks,
+                           get_vpath=lambda: '/deployments/d1/clusters/c1')
+        cluster = Mock(item_type=Mock(item_type_id='cluster'),
+                       get_vpath=lambda: '/deployments/d1/clusters/c2')
+        disk_index = DiskUuidIndex()
+
+        self.assertEqual(['f1', 'f2'],
+                         disk_index.fencing_uuids([vcs_cluster, cluster]))
+
+        # the fencing disks of a cluster are only read once
+        vcs_cluster.fencing_disks = []
+        self.assertEqual(['f1', 'f2'],
+                         disk_index.fencing_uuids([vcs_cluster, cluster]))
+
+
+class ProbeBackoffTest(unittest.TestCase):
+
+    def _delays(self, backoff, count):
+        delays = iter(backoff)
+        return [next(delays) for _ in range(count)]
+
+    def test_doubles_up_to_max_interval(self):
+        backoff = ProbeBackoff(300, 5, 60, jitter=0)
+        self.assertEqual([300, 5, 10, 20, 40, 60, 60],
+                         self._delays(backoff, 7))
+
+    def test_jitter(self):
+        backoff = ProbeBackoff(0, 10, 10, jitter=0.1)
+        for delay in self._delays(backoff, 50)[1:]:
+            self.assertTrue(9 <= delay <= 11)
+
+    def test_bounds(self):
+        backoff = ProbeBackoff(-1, 0, 0)
+        self.assertEqual((0, 1, 1), (backoff.min_install_time,
+                                     backoff.min_interval,
+                                     backoff.max_interval))
+
+
+class NodeLivenessMonitorTest(unittest.TestCase):
+
+    def test_one_ping_for_all_waiting_nodes(self):
+        ping = MagicMock(return_value=set(['n2']))
+        monitor = NodeLivenessMonitor(ping, 3600)
+        for hostname in ('n1', 'n2', 'n3'):
+            monitor.register(hostname)
+
+        self.assertFalse(monitor.is_alive('n1'))
+        self.assertTrue(monitor.is_alive('n2'))
+        self.assertFalse(monitor.is_alive('n3'))
+        ping.assert_called_once_with(['n1', 'n2', 'n3'])
+
+    def test_alive_nodes_are_not_pinged_again(self):
+        ping = MagicMock(side_effect=[set(['n1']), set(['n2'])])
+        monitor = NodeLivenessMonitor(ping, 0)
+        monitor.register('n1')
+        monitor.register('n2')
+
+        self.assertTrue(monitor.is_alive('n1'))
+        self.assertTrue(monitor.is_alive('n2'))
+        self.assertEqual([call(['n1', 'n2']), call(['n2'])],
+                         ping.call_args_list)
+
+    def test_unregister(self):
+        ping = MagicMock(return_value=set(['n1', 'n2']))
+        monitor = NodeLivenessMonitor(ping, 3600)
+        monitor.register('n1')
+        self.assertTrue(monitor.is_alive('n1'))
+        monitor.unregister('n1')
+
+        # answers from nodes nobody is waiting for are ignored
+        monitor.register('n2')
+        self.assertTrue(monitor.is_alive('n2'))
+        self.assertFalse(monitor.is_alive('n1'))
+        self.assertEqual(2, ping.call_count)
+
+
+class SnippetWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'n1.ks.partition.snippet')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_write_snippet(self):
+        self.assertTrue(write_snippet(self.path, 'part /boot'))
+        with open(self.path) as f:
+            self.assertEqual('part /boot', f.read())
+        self.assertEqual(0644, os.stat(self.path).st_mode & 0777)
+
+    def test_unchanged_snippet_is_not_written(self):
+        write_snippet(self.path, 'part /boot')
+        os.utime(self.path, (1000, 1000))
+
+        self.assertFalse(write_snippet(self.path, 'part /boot'))
+        self.assertEqual(1000, os.stat(self.path).st_mtime)
+
+        self.assertTrue(write_snippet(self.path, 'part /boot --size=500'))
+        self.assertNotEqual(1000, os.stat(self.path).st_mtime)
+        with open(self.path) as f:
+            self.assertEqual('part /boot --size=500', f.read())
+
+    def test_write_snippet_fragments(self):
+        fragments = (line for line in ['declare -A disk_list', 'zerombr'])
+        self.assertTrue(write_snippet(self.path, fragments))
+        with open(self.path) as f:
+            self.assertEqual('declare -A disk_list\nzerombr', f.read())
+        self.assertFalse(write_snippet(self.path,
+                                       ['declare -A disk_list', 'zerombr']))
+        self.assertEqual([os.path.basename(self.path)],
+                         os.listdir(self.tmpdir))
+
+    def test_write_snippets(self):
+        other = os.path.join(self.tmpdir, 'n2.ks.partition.snippet')
+        write_snippet(other, 'part /')
+
+        self.assertEqual([self.path], write_snippets(
+            [(self.path, 'part /boot'), (other, 'part /')]))
+        # nothing but the snippets is left in the directory
+        self.assertEqual(sorted([os.path.basename(self.path),
+                                 os.path.basename(other)]),
+                         sorted(os.listdir(self.tmpdir)))
+
+    def test_write_snippets_failure(self):
+        missing = os.path.join(self.tmpdir, 'missing', 'n2.snippet')
+        self.assertRaises(OSError, write_snippets,
+                          [(self.path, 'part /boot'), (missing, 'part /')])
+        # the snippets are replaced all together or not at all
+        self.assertEqual([], os.listdir(self.tmpdir))
+
+
+class ShellTemplateTest(unittest.TestCase):
+
+    def test_render(self):
+        template = ShellTemplate('disk_list["{disk_id}"]=\\${{dev}}/{uuid}')
+        self.assertEqual('disk_list["disk0"]=\\${dev}/ab12',
+                         template.render(disk_id='disk0', uuid='ab12'))
+        self.assertEqual('disk_list["disk1"]=\\${dev}/5',
+                         template.render(disk_id='disk1', uuid=5))
+
+    def test_render_matches_format(self):
+        for template in (snippet_templates.DISK_LIST_ITEM,
+                         snippet_templates.UUID_CHECK,
+                         snippet_templates.BIOSBOOT_PARTITION):
+            values = {'uuid': 'ab12', 'disk_id': 'disk0'}
+            self.assertEqual(template.template.format(**values),
+                             template.render(**values))
+
+    def test_unsupported_field(self):
+        self.assertRaises(ValueError, ShellTemplate, 'size={size:>4}')
+
+
+class InstallTimingsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'litp_install_timings.jsonl')
+        self.timings = InstallTimings(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _records(self):
+        with open(self.path) as f:
+            return [json.loads(line) for line in f]
+
+    @patch('time.time', Mock(return_value=1000))
+    def test_phase(self):
+        with self.timings.phase(['node1', 'node2'], 'cobbler_sync'):
+            pass
+        self.assertEqual(
+            [{'time': 1000, 'node': 'node1', 'phase': 'cobbler_sync',
+              'event': 'start'},
+             {'time': 1000, 'node': 'node2', 'phase': 'cobbler_sync',
+              'event': 'start'},
+             {'time': 1000, 'node': 'node1', 'phase': 'cobbler_sync',
+              'event': 'end', 'seconds': 0, 'status': 'success'},
+             {'time': 1000, 'node': 'node2', 'phase': 'cobbler_sync',
+              'event': 'end', 'seconds': 0, 'status': 'success'}],
+            self._records())
+
+    def test_phase_failure(self):
+        def _fail():
+            with self.timings.phase(['node1'], 'pxe_wait'):
+                raise CallbackExecutionException('timeout')
+        self.assertRaises(CallbackExecutionException, _fail)
+        self.assertEqual(['start', 'end'],
+                         [r['event'] for r in self._records()])
+        self.assertEqual('failed', self._records()[-1]['status'])
+
+    def test_unwritable_file(self):
+        timings = InstallTimings(os.path.join(self.tmpdir, 'no', 'file'))
+        with timings.phase(['node1'], 'register'):
+            pass
+        self.assertEqual([], os.listdir(self.tmpdir))
+
+    def test_plugin_records_phases(self):
+        bm = bootmgr_plugin.BootManagerPlugin()
+        bm._install_timings = self.timings
+        bm._sync_cobbler = MagicMock()
+        bm._needs_full_sync = MagicMock(return_value=False)
+        bm._do_cobbler_remove_system = MagicMock()
+
+        bm._sync_cobbler_callback(None, ['ms1'], ['node1'])
+        bm._remove_from_cobbler(None, ['ms1'], 'node1')
+        self.assertEqual([('cobbler_sync', 'start'), ('cobbler_sync', 'end'),
+                          ('deregister', 'start'), ('deregister', 'end')],
+                         [(r['phase'], r['event'])
+                          for r in self._records()])
+
+
+class MsLocaleCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.timedatectl_out = os.path.join(self.tmpdir, 'timedatectl.out')
+        self.localectl_out = os.path.join(self.tmpdir, 'localectl.out')
+        self._write(self.timedatectl_out,
+                    'Time zone: Europe/Gijon (IST, +0100)\n')
+        self._write(self.localectl_out, 'VC Keymap: es\n')
+        self.cache = MsLocaleCache(self.timedatectl_out, self.localectl_out)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, path, content, mtime=None):
+        with open(path, 'w') as f:
+            f.write(content)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def test_files_parsed_once(self):
+        with patch('bootmgr_plugin.ms_locale.read_timezone',
+                   return_value='--utc GMT') as read_timezone:
+            cache = MsLocaleCache(self.timedatectl_out, self.localectl_out)
+            for _ in range(3):
+                self.assertEqual('--utc GMT', cache.timezone())
+        self.assertEqual(1, read_timezone.call_count)
+        self.assertEqual('--utc Europe/Gijon', self.cache.timezone())
+        self.assertEqual('es', self.cache.keyboard())
+
+    def test_changed_file_parsed_again(self):
+        self.assertEqual('es', self.cache.keyboard())
+        self._write(self.localectl_out, 'VC Keymap: de\n', mtime=1000)
+        self.assertEqual('de', self.cache.keyboard())
+        self._write(self.timedatectl_out, 'Time zone: UTC (UTC, +0000)\n',
+                    mtime=1000)
+        self.assertEqual('--utc UTC', self.cache.timezone())
+
+    def test_missing_file(self):
+        os.unlink(self.localectl_out)
+        with patch('bootmgr_plugin.ms_locale.log') as log:
+            self.assertEqual('uk', self.cache.keyboard())
+            self.assertEqual('uk', self.cache.keyboard())
+        self.assertEqual(1, log.trace.error.call_count)
+        self._write(self.localectl_out, 'VC Keymap: fr\n')
+        self.assertEqual('fr', self.cache.keyboard())
+
+    def test_kickstarts_share_locale(self):
+        bm = bootmgr_plugin.BootManagerPlugin()
+        bm._get_timezone = MagicMock(return_value='--utc GMT')
+        bm._get_keyboard = MagicMock(return_value='ie')
+        ms = MagicMock(hostname='ms1')
+        ms.query.return_value = []
+        nodes = [BootMgrMockNode(item_id='n%d' % i, hostname='mn%d' % i,
+                                 os='rhel7') for i in range(3)]
+        tasks = []
+        bm._generate_cobbler_kickstart(ms, tasks, nodes, MagicMock())
+        self.assertEqual(3, len(tasks))
+        self.assertEqual(1, bm._get_timezone.call_count)
+        self.assertEqual(1, bm._get_keyboard.call_count)
+        self.assertEqual(['ie'] * 3, [t.kwargs['keyboard'] for t in tasks])
+
+
+class BootMgrLoggerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.litp_logger = Mock()
+        self.litp_logger.trace.isEnabledFor.return_value = True
+        self.litp_logger.event.isEnabledFor.return_value = True
+        self.log = BootMgrLogger(self.litp_logger, summary_mode=True)
+
+    def test_lazy(self):
+        compute = Mock(return_value=['n1', 'n2'])
+        arg = lazy(compute)
+        self.assertEqual(0, compute.call_count)
+        self.assertEqual("nodes ['n1', 'n2']", 'nodes %s' % arg)
+        self.assertEqual(1, compute.call_count)
+
+    def test_detail_without_summary(self):
+        self.log.event_detail.info('Disk %s', 'd1')
+        self.litp_logger.event.info.assert_called_once_with('Disk %s', 'd1')
+
+        log = BootMgrLogger(self.litp_logger, summary_mode=False)
+        with log.plan_summary():
+            log.summarize_as('n1')
+            log.trace_detail.debug('Nic %s', 'eth0')
+        self.litp_logger.trace.debug.assert_called_once_with('Nic %s',
+                                                             'eth0')
+
+    def test_plan_summary(self):
+        with self.log.plan_summary():
+            self.log.summarize_as('n1')
+            for disk in ('d1', 'd2', 'd3'):
+                self.log.event_detail.info('Disk %s', disk)
+            self.log.event_detail.info('Disk %s has no uuid', 'd3')
+            self.log.summarize_as('n2')
+            self.log.event_detail.info('Disk %s', 'd1')
+            self.assertEqual(0, self.litp_logger.event.info.call_count)
+        self.assertEqual(2, self.litp_logger.event.info.call_count)
+        summaries = [c[0][0] % c[0][1:]
+                     for c in self.litp_logger.event.info.call_args_list]
+        self.assertEqual(['Summary for n1: 3 x "Disk %s" [d1, d2, d3], '
+                          '1 x "Disk %s has no uuid" [d3]',
+                          'Summary for n2: 1 x "Disk %s" [d1]'], summaries)
+
+    def test_plan_summary_args(self):
+        with self.log.plan_summary():
+            self.log.summarize_as('n1')
+            for i in range(bootmgr_logging.SUMMARY_MAX_ARGS + 2):
+                self.log.event_detail.info('Disk %s on %s', 'd%d' % i, 'sda')
+                self.log.event_detail.info('Disk %s on %s', 'd%d' % i, 'sda')
+            self.log.event_detail.info('No disks')
+        summary = self.litp_logger.event.info.call_args[0]
+        shown = ', '.join('(d%d, sda)' % i for i in
+                          range(bootmgr_logging.SUMMARY_MAX_ARGS))
+        self.assertEqual('Summary for n1: %d x "Disk %%s on %%s" [%s, ...], '
+                         '1 x "No disks"' %
+                         (2 * (bootmgr_logging.SUMMARY_MAX_ARGS + 2), shown),
+                         summary[0] % summary[1:])
+
+    def test_plan_summary_disabled_level(self):
+        self.litp_logger.event.isEnabledFor.return_value = False
+        with self.log.plan_summary():
+            self.log.event_detail.info('Disk %s', 'd1')
+        self.assertEqual(0, self.litp_logger.event.info.call_count)
+
+    def test_write_snippets_summary(self):
+        bm = bootmgr_plugin.BootManagerPlugin()
+        nodes = {}
+        for hostname in ('n1', 'n2'):
+            node = Mock(hostname=hostname)
+            node.system.disks = [Mock(item_id='d%d' % i) for i in range(3)]
+            nodes[hostname] = node
+
+        def _render(node, disk_index, os_version, boot_mode, wipe_jobs):
+            def _emit():
+                bootmgr_plugin._log.summarize_as(node.hostname)
+                for disk in node.system.disks:
+                    bootmgr_plugin._log.event_detail.info('Disk %s',
+                                                          disk.item_id)
+                    yield disk.item_id
+            return _emit()
+        bm._render_partition_snippet = _render
+        bm._get_disk_uuid_index = Mock()
+        api = Mock()
+        api.query.return_value = nodes.values()
+        snippets = [{'path': 'p%d' % i, 'node_hostname': hostname,
+                     'os_version': 'rhel7'}
+                    for i, hostname in enumerate(('n1', 'n2'))]
+
+        with patch.object(bootmgr_plugin, '_log', self.log):
+            with patch.object(bootmgr_plugin, 'write_snippets',
+                              lambda configs: [list(config)
+                                               for _, config in configs]):
+                bm.cb__write_snippets(api, snippets, 'bios')
+        self.assertEqual(
+            [call('Summary for %s: %s', 'n1', ANY),
+             call('Summary for %s: %s', 'n2', ANY)],
+            self.litp_logger.event.info.call_args_list)
+
+    def test_create_configuration_summary(self):
+        bm = bootmgr_plugin.BootManagerPlugin()
+
+        def _plan(api):
+            for hostname in ('n1', 'n2'):
+                bootmgr_plugin._log.summarize_as(hostname)
+                for nic in ('eth0', 'eth1'):
+                    bootmgr_plugin._log.trace_detail.debug(
+                        'Device name "%s"', nic)
+                # nothing is logged per NIC while planning
+                self.assertEqual(0, self.litp_logger.trace.debug.call_count)
+            return ['task']
+        bm._create_configuration = _plan
+
+        with patch.object(bootmgr_plugin, '_log', self.log):
+            self.assertEqual(['task'], bm.create_configuration(Mock()))
+        self.assertEqual(
+            [call('Summary for %s: %s', 'n1', ANY),
+             call('Summary for %s: %s', 'n2', ANY)],
+            self.litp_logger.trace.debug.call_args_list)
+
+
+class ProfilingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.conf_file = os.path.join(self.tmpdir, 'bootmgr_plugin.conf')
+        with open(self.conf_file, 'w') as f:
+            f.write('[plugin]\nname=bootmgr_plugin\n\n'
+                    '[profiling]\nmode=wallclock\ndirectory=%s\n' %
+                    self.tmpdir)
+
+        self.profile_dir = os.path.join(self.tmpdir, 'profiles')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _plugin(self, mode):
+        bm = bootmgr_plugin.BootManagerPlugin()
+        bm._profiler = Profiler(ProfilingSettings(mode, self.profile_dir))
+        return bm
+
+    @staticmethod
+    def _api():
+        api = Mock()
+        api.query.side_effect = lambda item_type_id, **kwargs: \
+            [Mock(libvirt=None)] if item_type_id == 'ms' else []
+        return api
+
+    def _records(self):
+        records = []
+        for name in sorted(os.listdir(self.profile_dir)):
+            if name.endswith('.json'):
+                with open(os.path.join(self.profile_dir, name)) as f:
+                    records.append(json.load(f))
+        return records
+
+    def test_settings(self):
+        settings = ProfilingSettings.load(self.conf_file, {})
+        self.assertEqual('wallclock', settings.mode)
+        self.assertEqual(self.tmpdir, settings.directory)
+
+        settings = ProfilingSettings.load(
+            self.conf_file, {'LITP_BOOTMGR_PROFILE': 'cProfile',
+                             'LITP_BOOTMGR_PROFILE_DIR': '/tmp/profiles'})
+        self.assertEqual('cprofile', settings.mode)
+        self.assertEqual('/tmp/profiles', settings.directory)
+
+        for environ in ({'LITP_BOOTMGR_PROFILE': 'off'},
+                        {'LITP_BOOTMGR_PROFILE': 'bogus'}):
+            self.assertFalse(
+                ProfilingSettings.load(self.conf_file, environ).enabled)
+        missing = os.path.join(self.tmpdir, 'missing.conf')
+        self.assertFalse(ProfilingSettings.load(missing, {}).enabled)
+
+    def test_disabled(self):
+        bm = self._plugin(None)
+        bm._get_cobbler_service = Mock(return_value=None)
+        bm._nodes_in_the_deployment = Mock(return_value=[])
+        bm._validate_br_in_libvirt = Mock(return_value=[])
+        bm._validate_os_profile = Mock(return_value=[])
+        api = Mock()
+        self.assertEqual([], bm.validate_model(api))
+        bm._get_cobbler_service.assert_called_once_with(api)
+        self.assertFalse(os.path.exists(self.profile_dir))
+
+    def test_wallclock(self):
+        bm = self._plugin('wallclock')
+        api = self._api()
+        self.assertEqual([], bm.validate_model(api))
+        self.assertEqual('validate_model', bm.validate_model.__name__)
+
+        records = self._records()
+        self.assertEqual(1, len(records))
+        self.assertEqual('validate_model', records[0]['entry_point'])
+        self.assertEqual('success', records[0]['status'])
+        self.assertEqual(api.query.call_count, records[0]['queries'])
+        self.assertEqual({'cobbler-service': 1, 'ms': 1, 'node': 2,
+                          'os-profile': 1},
+                         records[0]['queries_by_type'])
+
+    def test_cprofile_failed_callback(self):
+        bm = self._plugin('cprofile')
+        bm._do_cobbler_remove_system = Mock()
+        bm._install_node = Mock(side_effect=CallbackExecutionException('x'))
+        self.assertRaises(CallbackExecutionException, bm._wait_for_node,
+                          Mock(), '10.10.10.1', 'node1', ['ms1'])
+        records = self._records()
+        self.assertEqual(['failed'], [r['status'] for r in records])
+        self.assertEqual(['.json', '.prof', '.txt'],
+                         sorted(os.path.splitext(name)[1]
+                                for name in os.listdir(self.profile_dir)))
+
+    def test_unwritable_directory(self):
+        bm = bootmgr_plugin.BootManagerPlugin()
+        bm._profiler = Profiler(ProfilingSettings(
+            'wallclock', os.path.join(self.conf_file, 'profiles')))
+        self.assertEqual([], bm.validate_model(self._api()))
+
+
+class LocalCobblerClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.secret_file = os.path.join(self.tmpdir, 'web.ss')
+        with open(self.secret_file, 'w') as f:
+            f.write('SECRET\n')
+        self.server = Mock()
+        self.server.login.return_value = 'TOKEN'
+        self.server.find_system.return_value = []
+        self.server.new_system.return_value = 'HANDLE'
+        self.client = LocalCobblerClient(lambda: self.server,
+                                         self.secret_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    @staticmethod
+    def _spec(name):
+        return {'system': name, 'profile': 'profile1', 'hostname': name,
+                'kickstart': '%s.ks' % name, 'virt_cpus': '2',
+                'interfaces': {'eth0': {'mac_address': '08:00:27:65:C8:B4',
+                                        'ip_address': '10.10.10.2'}}}
+
+    def test_available(self):
+        self.assertTrue(self.client.available())
+        self.assertFalse(LocalCobblerClient(
+            lambda: self.server,
+            os.path.join(self.tmpdir, 'missing')).available())
+
+    def test_register_systems(self):
+        self.server.find_system.side_effect = [[], [{'name': 'node2'}]]
+        self.client.register_systems([self._spec('node1'),
+                                      self._spec('node2')])
+        self.server.login.assert_called_once_with('', 'SECRET')
+        self.server.remove_system.assert_called_once_with('node2', 'TOKEN')
+        self.assertEqual(2, self.server.new_system.call_count)
+        self.assertEqual(2, self.server.save_system.call_count)
+        self.assertTrue(call('HANDLE', 'virt_cpus', '2', 'TOKEN') in
+                        self.server.modify_system.call_args_list)
+        self.assertTrue(call('HANDLE', 'modify_interface',
+                             {'macaddress-eth0': '08:00:27:65:C8:B4',
+                              'ipaddress-eth0': '10.10.10.2'}, 'TOKEN') in
+                        self.server.modify_system.call_args_list)
+
+    def test_token_reuse(self):
+        self.client.register_systems([self._spec('node1')])
+        self.client.register_systems([self._spec('node2')])
+        self.assertEqual(1, self.server.login.call_count)
+
+        # an expired token is replaced once
+        self.server.new_system.side_effect = [
+            xmlrpclib.Fault(1, 'invalid token'), 'HANDLE']
+        self.server.login.return_value = 'TOKEN2'
+        self.client.register_systems([self._spec('node3')])
+        self.assertEqual(2, self.server.login.call_count)
+        self.server.save_system.assert_called_with('HANDLE', 'TOKEN2')
+
+    def test_register_systems_fault(self):
+        # a fault that is not about the token is not retried
+        self.server.new_system.side_effect = xmlrpclib.Fault(
+            1, 'invalid profile')
+        self.assertRaises(LocalCobblerError, self.client.register_systems,
+                          [self._spec('node1')])
+        self.assertEqual(1, self.server.login.call_count)
+        self.assertEqual(1, self.server.new_system.call_count)
+
+    def test_register_systems_error(self):
+        self.server.login.side_effect = socket.error('refused')
+        self.assertRaises(LocalCobblerError, self.client.register_systems,
+                          [self._spec('node1')])
+        self.server.login.side_effect = None
+        self.client.register_systems([self._spec('node1')])
+        self.assertEqual(2, self.server.login.call_count)
+
+    def test_plugin_falls_back_to_mco(self):
+        bmp = bootmgr_plugin.BootManagerPlugin()
+        bmp._do_cobbler_mco = Mock()
+        bmp._backup_anamon_logs = Mock()
+        bmp._local_cobbler = Mock()
+        cb_api = Mock()
+        args = {'profile': 'profile1', 'hostname': 'node1',
+                'kickstart': 'node1.ks', 'interfaces': {}, 'virt_data': {}}
+
+        bmp._add_system_callback(cb_api, ['ms1'], 'node1', **args)
+        bmp._local_cobbler.register_systems.assert_called_once_with(
+            [{'system': 'node1', 'profile': 'profile1', 'hostname': 'node1',
+              'kickstart': 'node1.ks'}])
+        self.assertFalse(bmp._do_cobbler_mco.called)
+
+        bmp._local_cobbler.register_systems.side_effect = \
+            LocalCobblerError('refused')
+        bmp._add_system_callback(cb_api, ['ms1'], 'node1', **args)
+        self.assertEqual('register_system',
+                         bmp._do_cobbler_mco.call_args[0][2])
+
+        bmp._do_cobbler_mco.reset_mock()
+        bmp._local_cobbler.available.return_value = False
+        bmp._add_systems_callback(cb_api, ['ms1'], ['node1'],
+                                  [dict(args, name='node1')])
+        self.assertEqual('register_systems',
+                         bmp._do_cobbler_mco.call_args[0][2])
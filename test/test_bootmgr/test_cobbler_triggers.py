@@ -1,6 +1,11 @@
 from triggers.cobbler import sync_pre_trigger
 from triggers.cobbler import install_pre_pxe
+from triggers.cobbler import install_post_timing
 
+import json
+import os
+import shutil
+import tempfile
 import unittest
 import subprocess
 
@@ -196,10 +201,18 @@ class CobblerPreSyncTriggerTest(unittest.TestCase):
 class CobblerInstallPrePxeTriggerTest(unittest.TestCase):
     def setUp(self):
         self.test_class = install_pre_pxe
+        self.tmp_dir = tempfile.mkdtemp()
+        self.events_file = os.path.join(self.tmp_dir, 'litp_pxe_events')
+        self.test_class.PXE_EVENTS_FILE = self.events_file
+        self.timings_file = os.path.join(self.tmp_dir,
+                                         'litp_install_timings.jsonl')
+        self.test_class.INSTALL_TIMINGS_FILE = self.timings_file
 
     def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
         reload(install_pre_pxe)
 
+    @patch('time.time', Mock(return_value=1000))
     def test_run(self):
 
         args = ["system", "node1"]
@@ -210,7 +223,86 @@ class CobblerInstallPrePxeTriggerTest(unittest.TestCase):
 
         self.assertEqual(0, self.test_class.run(api, args, None))
         system.set_comment.assert_called_once_with("PXE_BOOTED")
+        self.assertEqual(0, self.test_class.run(api, ["system", "node2"],
+                                                None))
+        with open(self.events_file) as f:
+            self.assertEqual("1000 node1\n1000 node2\n", f.read())
+        with open(self.timings_file) as f:
+            self.assertEqual(
+                [{"time": 1000, "node": "node1", "phase": "install",
+                  "event": "start"},
+                 {"time": 1000, "node": "node2", "phase": "install",
+                  "event": "start"}],
+                [json.loads(line) for line in f])
+
+    def test_run_not_a_system(self):
+        api = MagicMock()
+        api.find_system.return_value = None
+
+        self.assertEqual(0, self.test_class.run(api, ["system", "node1"],
+                                                None))
+        self.assertFalse(os.path.exists(self.events_file))
+
+    def test_run_event_file_not_writable(self):
+        self.test_class.PXE_EVENTS_FILE = os.path.join(self.tmp_dir, 'no',
+                                                       'such_dir')
+        system = MagicMock()
+        api = MagicMock()
+        api.find_system.return_value = system
+        logger = MagicMock()
+
+        self.assertEqual(0, self.test_class.run(api, ["system", "node1"],
+                                                logger))
+        system.set_comment.assert_called_once_with("PXE_BOOTED")
+        self.assertEqual(1, logger.info.call_count)
 
     def test_register(self):
         expected = "/var/lib/cobbler/triggers/install/pre/*"
         self.assertEqual(expected, self.test_class.register())
+
+
+class CobblerInstallPostTimingTriggerTest(unittest.TestCase):
+    def setUp(self):
+        self.test_class = install_post_timing
+        self.tmp_dir = tempfile.mkdtemp()
+        self.timings_file = os.path.join(self.tmp_dir,
+                                         'litp_install_timings.jsonl')
+        self.test_class.INSTALL_TIMINGS_FILE = self.timings_file
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        reload(install_post_timing)
+
+    @patch('time.time', Mock(return_value=1000))
+    def test_run(self):
+        api = MagicMock()
+        api.find_system.return_value = MagicMock()
+
+        self.assertEqual(0, self.test_class.run(api, ["system", "node1"],
+                                                None))
+        with open(self.timings_file) as f:
+            self.assertEqual({"time": 1000, "node": "node1",
+                              "phase": "install", "event": "end"},
+                             json.loads(f.read()))
+
+    def test_run_not_a_system(self):
+        api = MagicMock()
+        api.find_system.return_value = None
+
+        self.assertEqual(0, self.test_class.run(api, ["system", "node1"],
+                                                None))
+        self.assertFalse(os.path.exists(self.timings_file))
+
+    def test_run_timings_file_not_writable(self):
+        self.test_class.INSTALL_TIMINGS_FILE = os.path.join(
+            self.tmp_dir, 'no', 'such_dir')
+        api = MagicMock()
+        logger = MagicMock()
+
+        self.assertEqual(0, self.test_class.run(api, ["system", "node1"],
+                                                logger))
+        self.assertEqual(1, logger.debug.call_count)
+
+    def test_register(self):
+        expected = "/var/lib/cobbler/triggers/install/post/*"
+        self.assertEqual(expected, self.test_class.register())